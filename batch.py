@@ -0,0 +1,335 @@
+"""Headless batch embed/extract over directories or manifests.
+
+    python -m batch embed --covers covers/ --message-file note.txt --output-dir out/
+    python -m batch extract --stegos out/ --output-dir messages/ --aes --key-file key.b64
+
+Each finished item is appended to a JSON Lines results file (timings,
+sizes, PSNR; never message text), so an interrupted run can be continued
+with --resume, which skips items already recorded as successful.
+
+Exit codes: 0 every item succeeded (or nothing was left to do), 1 some
+items failed, 2 invalid arguments or inputs, 130 interrupted.
+"""
+import os
+import sys
+import csv
+import json
+import time
+import base64
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+EXIT_OK = 0
+EXIT_FAILURES = 1
+EXIT_USAGE = 2
+EXIT_INTERRUPTED = 130
+
+
+class BatchError(Exception):
+    pass
+
+
+def load_key(args):
+    """AES key bytes from --key, --key-file or STEGO_KEY (Base64, as shown by the Encrypt page)."""
+    if not args.aes:
+        return None
+    if args.key:
+        text = args.key
+    elif args.key_file:
+        with open(args.key_file) as f:
+            text = f.read().strip()
+    else:
+        text = os.environ.get('STEGO_KEY', '')
+    if not text:
+        raise BatchError("--aes needs a key: pass --key, --key-file or set STEGO_KEY")
+    try:
+        key = base64.b64decode(text, validate=True)
+    except ValueError:
+        raise BatchError("Invalid Base64 key format")
+    if len(key) != 32:
+        raise BatchError(f"AES key must decode to 32 bytes, got {len(key)}")
+    return key
+
+
+def read_manifest(path):
+    """Rows of a .jsonl or .csv manifest as dicts, with paths resolved relative to the manifest."""
+    base = os.path.dirname(os.path.abspath(path))
+    with open(path, newline='') as f:
+        if path.endswith('.csv'):
+            rows = list(csv.DictReader(f))
+        else:
+            rows = [json.loads(line) for line in f if line.strip()]
+
+    for row in rows:
+        for field in ('cover', 'stego', 'message_file', 'output'):
+            if row.get(field):
+                row[field] = os.path.join(base, row[field])
+    return rows
+
+
+def list_images(directory):
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                  if name.lower().endswith(IMAGE_EXTENSIONS))
+
+
+def build_items(args):
+    """Work items as dicts with an `id`, the input image and the output path."""
+    if args.manifest:
+        rows = read_manifest(args.manifest)
+    else:
+        directory = args.covers if args.command == 'embed' else args.stegos
+        if not directory or not os.path.isdir(directory):
+            raise BatchError(f"Input directory not found: {directory}")
+        key = 'cover' if args.command == 'embed' else 'stego'
+        rows = [{key: path} for path in list_images(directory)]
+
+    items = []
+    for row in rows:
+        source = row.get('cover') if args.command == 'embed' else row.get('stego')
+        if not source:
+            raise BatchError(f"Manifest row has no {'cover' if args.command == 'embed' else 'stego'} image: {row}")
+        stem = os.path.splitext(os.path.basename(source))[0]
+        suffix = '.png' if args.command == 'embed' else '.txt'
+        item = {
+            'id': f"{args.command}:{os.path.abspath(source)}",
+            'input': source,
+            'output': row.get('output') or os.path.join(args.output_dir, stem + suffix)
+        }
+        if args.command == 'embed':
+            if row.get('message') is not None:
+                item['message'] = row['message']
+            elif row.get('message_file'):
+                item['message_file'] = row['message_file']
+            elif args.message is not None:
+                item['message'] = args.message
+            elif args.message_file:
+                item['message_file'] = args.message_file
+            else:
+                raise BatchError(f"No message for {source}: use --message, --message-file or a manifest column")
+        items.append(item)
+    return items
+
+
+def completed_ids(results_path):
+    """Ids recorded as successful in an existing results file."""
+    done = set()
+    if not os.path.exists(results_path):
+        return done
+    with open(results_path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # a line cut short by an interrupted run
+            if record.get('status') == 'ok':
+                done.add(record['id'])
+    return done
+
+
+def write_atomic(path, write):
+    """Write through a temp file in the same directory, then rename it into place."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    temp_path = os.path.join(directory, f".{os.path.basename(path)}.{os.getpid()}.tmp")
+    try:
+        write(temp_path)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def make_cipher(key):
+    from utils.dna_encryption import DNAEncryption, AES256DNAEncryption
+
+    return AES256DNAEncryption(key=key) if key is not None else DNAEncryption()
+
+
+def embed_item(item, key, compute_ssim):
+    from utils.lsb_steganography import LSBSteganography
+    from utils.metrics import ImageMetrics
+
+    start = time.perf_counter()
+    if 'message' in item:
+        message = item['message']
+    else:
+        with open(item['message_file'], encoding='utf-8') as f:
+            message = f.read()
+
+    cipher = make_cipher(key)
+    encryption = cipher.encrypt(message, use_aes=True) if key is not None else cipher.encrypt(message)
+    embedding = LSBSteganography().embed(item['input'], encryption['encrypted_dna'])
+
+    write_start = time.perf_counter()
+    write_atomic(item['output'], lambda path: embedding['stego_image'].save(path, format='PNG'))
+    write_time = time.perf_counter() - write_start
+
+    record = {
+        'message_length': len(message),
+        'dna_length': encryption['dna_length'],
+        'image_size': list(embedding['image_size']),
+        'output_bytes': os.path.getsize(item['output']),
+        'encryption_time': encryption['encryption_time'],
+        'embedding_time': embedding['embedding_time'],
+        'write_time': write_time,
+        'psnr': ImageMetrics.calculate_psnr(item['input'], item['output'])
+    }
+    if compute_ssim:
+        record['ssim'] = ImageMetrics.calculate_ssim(item['input'], item['output'])
+    record['total_time'] = time.perf_counter() - start
+    return record
+
+
+def extract_item(item, key):
+    from utils.lsb_steganography import LSBSteganography
+
+    start = time.perf_counter()
+    extraction = LSBSteganography().extract(item['input'])
+    cipher = make_cipher(key)
+    decryption = cipher.decrypt(extraction['extracted_data'], use_aes=True) if key is not None \
+        else cipher.decrypt(extraction['extracted_data'])
+
+    text = decryption['decrypted_text']
+    write_start = time.perf_counter()
+
+    def write(path):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+    write_atomic(item['output'], write)
+
+    return {
+        'message_length': len(text),
+        'binary_length': extraction['binary_length'],
+        'extraction_time': extraction['extraction_time'],
+        'decryption_time': decryption['decryption_time'],
+        'write_time': time.perf_counter() - write_start,
+        'total_time': time.perf_counter() - start
+    }
+
+
+def run_item(command, item, key, compute_ssim):
+    """Process one item; failures become an error record instead of raising."""
+    record = {'id': item['id'], 'command': command, 'input': item['input'], 'output': item['output']}
+    try:
+        if command == 'embed':
+            record.update(embed_item(item, key, compute_ssim))
+        else:
+            record.update(extract_item(item, key))
+        record['status'] = 'ok'
+    except Exception as e:
+        record['status'] = 'error'
+        record['error'] = f"{type(e).__name__}: {e}"
+    record['finished_at'] = time.time()
+    return record
+
+
+class Progress:
+    def __init__(self, total, quiet=False, stream=sys.stderr):
+        self.total = total
+        self.quiet = quiet
+        self.stream = stream
+        self.done = 0
+        self.failed = 0
+        self.start = time.perf_counter()
+
+    def update(self, record):
+        self.done += 1
+        self.failed += record['status'] != 'ok'
+        if self.quiet:
+            return
+        elapsed = time.perf_counter() - self.start
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        eta = (self.total - self.done) / rate if rate > 0 else 0.0
+        detail = f"{record.get('total_time', 0):.2f}s" if record['status'] == 'ok' else record['error']
+        print(f"[{self.done}/{self.total}] {record['status']:5} {os.path.basename(record['input'])} {detail} "
+              f"({rate:.2f} items/s, ETA {eta:.0f}s)", file=self.stream, flush=True)
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog="python -m batch",
+                                     description="Batch DNA encryption + LSB steganography without the web UI")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    def add_common(sub):
+        sub.add_argument("--manifest", help=".jsonl or .csv manifest of items instead of a directory")
+        sub.add_argument("--output-dir", default="batch_output", help="where outputs go unless a manifest row sets one")
+        sub.add_argument("--results", help="JSON Lines results file (default: <output-dir>/results.jsonl)")
+        sub.add_argument("--resume", action="store_true", help="skip items already recorded as ok in --results")
+        sub.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="parallel worker processes")
+        sub.add_argument("--aes", action="store_true", help="use the AES-256 layer")
+        sub.add_argument("--key", help="Base64 AES key")
+        sub.add_argument("--key-file", help="file containing the Base64 AES key")
+        sub.add_argument("--quiet", action="store_true", help="no per-item progress on stderr")
+
+    embed = subparsers.add_parser("embed", help="encrypt messages and embed them into cover images")
+    embed.add_argument("--covers", help="directory of cover images")
+    embed.add_argument("--message", help="message embedded into every cover")
+    embed.add_argument("--message-file", help="file whose text is embedded into every cover")
+    embed.add_argument("--ssim", action="store_true", help="also compute SSIM (slower)")
+    add_common(embed)
+
+    extract = subparsers.add_parser("extract", help="extract and decrypt messages from stego images")
+    extract.add_argument("--stegos", help="directory of stego images")
+    add_common(extract)
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        key = load_key(args)
+        items = build_items(args)
+    except (BatchError, OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return EXIT_USAGE
+
+    results_path = args.results or os.path.join(args.output_dir, 'results.jsonl')
+    os.makedirs(os.path.dirname(os.path.abspath(results_path)), exist_ok=True)
+    if args.resume:
+        done = completed_ids(results_path)
+        skipped = sum(item['id'] in done for item in items)
+        items = [item for item in items if item['id'] not in done]
+    else:
+        skipped = 0
+
+    progress = Progress(len(items), args.quiet)
+    if not args.quiet:
+        print(f"{args.command}: {len(items)} items, {skipped} already done, {args.workers} workers",
+              file=sys.stderr, flush=True)
+
+    compute_ssim = getattr(args, 'ssim', False)
+    try:
+        with open(results_path, 'a') as results:
+            def finish(record):
+                results.write(json.dumps(record) + "\n")
+                results.flush()
+                progress.update(record)
+
+            if args.workers <= 1:
+                for item in items:
+                    finish(run_item(args.command, item, key, compute_ssim))
+            else:
+                pool = ProcessPoolExecutor(max_workers=args.workers)
+                try:
+                    futures = [pool.submit(run_item, args.command, item, key, compute_ssim) for item in items]
+                    for future in as_completed(futures):
+                        finish(future.result())
+                finally:
+                    pool.shutdown(cancel_futures=True)
+    except KeyboardInterrupt:
+        print(f"Interrupted after {progress.done} items; rerun with --resume to continue", file=sys.stderr)
+        return EXIT_INTERRUPTED
+
+    elapsed = time.perf_counter() - progress.start
+    if not args.quiet:
+        print(f"Done: {progress.done - progress.failed} ok, {progress.failed} failed, {skipped} skipped "
+              f"in {elapsed:.1f}s. Results: {results_path}", file=sys.stderr)
+    return EXIT_FAILURES if progress.failed else EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""Render calls and bytes pushed to the frontend while streaming a chat answer.
+
+    python -m benchmarks.chat_render --chars 4000 --chunk-interval 0.02
+
+Feeds a fake streamed answer (chunks arriving every --chunk-interval
+seconds on a simulated clock, so nothing sleeps) into a placeholder that
+counts markdown calls and bytes. Compares drawing every chunk with the
+page's StreamingMarkdown at a few intervals, checks that the final text
+is complete and drawn without the cursor, and that the number of draws
+stays within the rate bound. Exits 1 if a check fails.
+"""
+import os
+import sys
+import json
+import math
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.display import StreamingMarkdown, STREAM_RENDER_INTERVAL, STREAM_CURSOR
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class CountingPlaceholder:
+    """Stands in for st.empty(): records what each markdown call would send."""
+
+    def __init__(self):
+        self.calls = 0
+        self.bytes = 0
+        self.last = None
+
+    def markdown(self, text):
+        self.calls += 1
+        self.bytes += len(text.encode('utf-8'))
+        self.last = text
+
+
+def fake_answer(chars):
+    sentence = "LSB steganography hides each bit of the DNA sequence in the lowest bit of a pixel channel. "
+    return (sentence * (chars // len(sentence) + 1))[:chars]
+
+
+def fake_stream(answer, chunk_chars):
+    for start in range(0, len(answer), chunk_chars):
+        yield answer[start:start + chunk_chars]
+
+
+def run_naive(answer, chunk_chars):
+    """The page before throttling: one draw per chunk plus the final one."""
+    placeholder = CountingPlaceholder()
+    text = ""
+    for delta in fake_stream(answer, chunk_chars):
+        text += delta
+        placeholder.markdown(text + STREAM_CURSOR)
+    placeholder.markdown(text)
+    return placeholder, text
+
+
+def run_throttled(answer, chunk_chars, chunk_interval, interval, max_pending_chars=None):
+    placeholder = CountingPlaceholder()
+    clock = FakeClock()
+    stream = StreamingMarkdown(placeholder, interval=interval, max_pending_chars=max_pending_chars, clock=clock)
+    for delta in fake_stream(answer, chunk_chars):
+        clock.now += chunk_interval
+        stream.add(delta)
+    text = stream.close()
+    assert stream.renders == placeholder.calls and stream.bytes_sent == placeholder.bytes
+    return placeholder, text, clock.now
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Count redraws of a streamed chat answer with and without throttling")
+    parser.add_argument("--chars", type=int, default=4000, help="answer length")
+    parser.add_argument("--chunk-chars", type=int, default=4, help="characters per streamed chunk (about a token)")
+    parser.add_argument("--chunk-interval", type=float, default=0.02, help="seconds between chunks")
+    parser.add_argument("--intervals", default=f"0.05,{STREAM_RENDER_INTERVAL},0.25",
+                        help="comma-separated render intervals to try")
+    parser.add_argument("--json", dest="json_path", help="write results to this JSON file")
+    args = parser.parse_args(argv)
+
+    answer = fake_answer(args.chars)
+    chunks = math.ceil(len(answer) / args.chunk_chars)
+    placeholder, _ = run_naive(answer, args.chunk_chars)
+    results = [{'mode': 'every chunk', 'renders': placeholder.calls, 'bytes': placeholder.bytes}]
+    print(f"{args.chars}-char answer in {chunks} chunks, one every {args.chunk_interval * 1000:.0f} ms")
+    print(f"  every chunk          {placeholder.calls:6d} renders  {placeholder.bytes / 1e6:8.2f} MB")
+
+    failures = []
+    for interval in [float(value) for value in args.intervals.split(',')]:
+        placeholder, text, duration = run_throttled(answer, args.chunk_chars, args.chunk_interval, interval)
+        # One draw per interval, the first chunk's immediate draw and the final flush
+        bound = math.ceil(duration / interval) + 2
+        results.append({'mode': f'throttled {interval}s', 'interval': interval, 'renders': placeholder.calls,
+                        'bytes': placeholder.bytes, 'max_renders': bound})
+        print(f"  throttled {interval:5.2f}s     {placeholder.calls:6d} renders  {placeholder.bytes / 1e6:8.2f} MB"
+              f"  (bound {bound})")
+        if text != answer or placeholder.last != answer:
+            failures.append(f"interval {interval}: final text incomplete or still has the cursor")
+        if placeholder.calls > bound:
+            failures.append(f"interval {interval}: {placeholder.calls} renders exceed the bound of {bound}")
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({'chars': args.chars, 'chunks': chunks, 'chunk_interval': args.chunk_interval,
+                       'results': results, 'failures': failures}, f, indent=2)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,194 @@
+import io
+import os
+import sys
+import json
+import time
+import base64
+import asyncio
+import argparse
+import subprocess
+from urllib.parse import urlsplit
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from PIL import Image
+
+from utils.streaming_stats import RunningStats
+
+SERVICE_START_TIMEOUT = 30.0
+DEFAULT_REQUEST_TIMEOUT = 60.0
+
+
+def make_cover(width, height, seed=0):
+    buffer = io.BytesIO()
+    rng = np.random.default_rng(seed)
+    Image.fromarray(rng.integers(0, 256, (height, width, 3), dtype=np.uint8)).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+class Connection:
+    """One keep-alive HTTP/1.1 connection issuing requests sequentially."""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def request(self, method, path, payload=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+        self.writer.write(f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Type: application/json\r\n"
+                          f"Content-Length: {len(body)}\r\n\r\n".encode('latin-1') + body)
+        await self.writer.drain()
+
+        head = (await self.reader.readuntil(b'\r\n\r\n')).decode('latin-1').split('\r\n')
+        status = int(head[0].split(' ', 2)[1])
+        headers = {name.strip().lower(): value.strip()
+                   for name, value in (line.split(':', 1) for line in head[1:] if ':' in line)}
+        data = await self.reader.readexactly(int(headers.get('content-length', 0)))
+        if headers.get('connection', '').lower() == 'close':
+            self.close()
+        return status, json.loads(data) if data else None
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+async def run_load(host, port, payloads, total, concurrency, rate=None, timeout=DEFAULT_REQUEST_TIMEOUT):
+    """Send `total` requests from `concurrency` connections; optionally pace them to `rate` per second."""
+    latency = RunningStats()
+    statuses = {}
+    errors = []
+    next_index = 0
+    start = time.perf_counter()
+
+    async def worker():
+        nonlocal next_index
+        connection = Connection(host, port)
+        try:
+            while next_index < total:
+                index = next_index
+                next_index += 1
+                if rate:
+                    delay = start + index / rate - time.perf_counter()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                path, payload = payloads[index % len(payloads)]
+                sent = time.perf_counter()
+                try:
+                    status, body = await asyncio.wait_for(connection.request('POST', path, payload), timeout)
+                except asyncio.TimeoutError:
+                    connection.close()
+                    status, body = 'timeout', {'error': f"no response within {timeout}s"}
+                except (ConnectionError, asyncio.IncompleteReadError) as e:
+                    connection.close()
+                    status, body = 'connection_error', {'error': str(e)}
+                statuses[status] = statuses.get(status, 0) + 1
+                if status == 200:
+                    latency.add(time.perf_counter() - sent)
+                elif len(errors) < 5:
+                    errors.append(body)
+        finally:
+            connection.close()
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {
+        'requests': total,
+        'concurrency': concurrency,
+        'elapsed_s': elapsed,
+        'requests_per_s': total / elapsed,
+        'ok_per_s': statuses.get(200, 0) / elapsed,
+        'statuses': {str(status): count for status, count in statuses.items()},
+        'latency_ms': {key: value * 1000 if isinstance(value, float) else value
+                       for key, value in latency.summary().items()},
+        'sample_errors': errors
+    }
+
+
+def start_service(port, workers, max_queue):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    process = subprocess.Popen([sys.executable, "-m", "service", "--port", str(port), "--workers", str(workers),
+                                "--max-queue", str(max_queue)], cwd=root)
+    deadline = time.monotonic() + SERVICE_START_TIMEOUT
+    while time.monotonic() < deadline and process.poll() is None:
+        try:
+            status, _ = asyncio.run(Connection('127.0.0.1', port).request('GET', '/health'))
+            if status == 200:
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"Exchange service did not start on port {port}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the HTTP exchange service (python -m service)")
+    parser.add_argument("--url", help="running service, e.g. http://127.0.0.1:8600 (default: start one locally)")
+    parser.add_argument("--port", type=int, default=8611, help="port for the locally started service")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="workers of the local service")
+    parser.add_argument("--max-queue", type=int, default=32, help="queue bound of the local service")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--rate", type=float, help="target requests per second (default: as fast as possible)")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_REQUEST_TIMEOUT, help="seconds per request")
+    parser.add_argument("--size", type=int, default=512, help="cover width and height in pixels")
+    parser.add_argument("--message-bytes", type=int, default=256)
+    parser.add_argument("--mix", choices=["send", "receive", "both"], default="both")
+    parser.add_argument("--aes", action="store_true", help="use the AES-256 layer")
+    parser.add_argument("--json", dest="json_path", help="write results to this JSON file")
+    args = parser.parse_args(argv)
+
+    process = None
+    if args.url:
+        parts = urlsplit(args.url)
+        host, port = parts.hostname, parts.port or 80
+    else:
+        host, port = '127.0.0.1', args.port
+        print(f"Starting exchange service on port {port} with {args.workers} workers...")
+        process = start_service(port, args.workers, args.max_queue)
+
+    try:
+        key = base64.b64encode(os.urandom(32)).decode('ascii') if args.aes else None
+        message = ("Patient 12345: " * (args.message_bytes // 15 + 1))[:args.message_bytes]
+        send = {'message': message, 'cover': base64.b64encode(make_cover(args.size, args.size)).decode('ascii'),
+                'aes': args.aes, 'key': key}
+
+        status, sent = asyncio.run(Connection(host, port).request('POST', '/send', send))
+        if status != 200:
+            raise RuntimeError(f"/send failed with {status}: {sent}")
+        receive = {'stego': sent['stego'], 'aes': args.aes, 'key': key}
+        payloads = {'send': [('/send', send)], 'receive': [('/receive', receive)],
+                    'both': [('/send', send), ('/receive', receive)]}[args.mix]
+
+        print(f"{args.requests} requests ({args.mix}), concurrency {args.concurrency}, "
+              f"{args.size}x{args.size} cover, {args.message_bytes}-byte message")
+        results = asyncio.run(run_load(host, port, payloads, args.requests, args.concurrency, args.rate,
+                                       args.timeout))
+        results.update({'mix': args.mix, 'size': args.size, 'message_bytes': args.message_bytes, 'aes': args.aes})
+        _, results['service'] = asyncio.run(Connection(host, port).request('GET', '/health'))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    latency = results['latency_ms']
+    print(f"Throughput: {results['requests_per_s']:.1f} req/s ({results['ok_per_s']:.1f} ok/s) "
+          f"in {results['elapsed_s']:.1f}s")
+    if latency['count']:
+        print(f"Latency (ms): p50 {latency['p50']:.1f}  p95 {latency['p95']:.1f}  "
+              f"p99 {latency['p99']:.1f}  max {latency['max']:.1f}")
+    print(f"Responses: {results['statuses']}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import io
+import os
+import sys
+import json
+import time
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pydicom
+from pydicom.dataset import Dataset, FileMetaDataset
+from pydicom.uid import ExplicitVRLittleEndian, RLELossless, generate_uid
+
+from utils.dicom_loader import DicomLoader
+from utils.frame_decoder import FrameDecoder
+
+
+def make_rle_multiframe(frames, rows, columns, seed=0):
+    """Build a synthetic 16-bit CT-like multi-frame file and compress it with RLE Lossless."""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:rows, 0:columns]
+    phantom = (1000 * np.exp(-((x - columns / 2) ** 2 + (y - rows / 2) ** 2) / (rows * columns / 8))).astype(np.int16)
+    volume = np.stack([phantom + rng.integers(-50, 50, (rows, columns), dtype=np.int16) for _ in range(frames)])
+
+    ds = Dataset()
+    ds.file_meta = FileMetaDataset()
+    ds.file_meta.TransferSyntaxUID = ExplicitVRLittleEndian
+    ds.file_meta.MediaStorageSOPClassUID = '1.2.840.10008.5.1.4.1.1.2'
+    ds.file_meta.MediaStorageSOPInstanceUID = generate_uid()
+    ds.SOPClassUID = ds.file_meta.MediaStorageSOPClassUID
+    ds.SOPInstanceUID = ds.file_meta.MediaStorageSOPInstanceUID
+    ds.Modality = 'CT'
+    ds.Rows, ds.Columns, ds.NumberOfFrames = rows, columns, frames
+    ds.SamplesPerPixel = 1
+    ds.PhotometricInterpretation = 'MONOCHROME2'
+    ds.BitsAllocated, ds.BitsStored, ds.HighBit, ds.PixelRepresentation = 16, 16, 15, 1
+    ds.PixelData = volume.tobytes()
+    ds.compress(RLELossless)
+
+    buffer = io.BytesIO()
+    ds.save_as(buffer, enforce_file_format=True)
+    return buffer.getvalue(), volume
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark RLE multi-frame decoding")
+    parser.add_argument("--frames", type=int, default=64)
+    parser.add_argument("--size", type=int, default=512, help="rows and columns per frame")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--view-time", type=float, default=0.05,
+                        help="seconds spent looking at each slice in the scrolling test")
+    parser.add_argument("--json", dest="json_path", help="write results to this JSON file")
+    args = parser.parse_args(argv)
+
+    print(f"Generating {args.frames} x {args.size}x{args.size} RLE frames...")
+    data, volume = make_rle_multiframe(args.frames, args.size, args.size)
+    print(f"File size: {len(data) / 1e6:.1f} MB")
+
+    results = {'frames': args.frames, 'size': args.size, 'workers': args.workers, 'file_mb': len(data) / 1e6}
+
+    pixels, results['serial_full_decode_s'] = timed(lambda: pydicom.dcmread(io.BytesIO(data)).pixel_array)
+    assert np.array_equal(pixels, volume)
+
+    _, results['first_frame_s'] = timed(
+        lambda: FrameDecoder(DicomLoader(io.BytesIO(data)), prefetch=0).frame(args.frames // 2)
+    )
+
+    for kind in ('thread', 'process'):
+        decoder = FrameDecoder(DicomLoader(io.BytesIO(data)), executor=kind, max_workers=args.workers)
+        frames, elapsed = timed(lambda: list(decoder.iter_frames()))
+        assert all(np.array_equal(frame, volume[i]) for i, frame in enumerate(frames))
+        results[f'{kind}_all_frames_s'] = elapsed
+
+    # Scroll through the volume with a pause per slice; prefetch should hide decode latency
+    for prefetch in (0, 4):
+        decoder = FrameDecoder(DicomLoader(io.BytesIO(data)), prefetch=prefetch, max_workers=args.workers)
+        decoder.frame(0)
+        waits = []
+        for index in range(1, args.frames):
+            time.sleep(args.view_time)
+            _, wait = timed(lambda: decoder.frame(index))
+            waits.append(wait)
+        results[f'scroll_prefetch{prefetch}_mean_wait_ms'] = float(np.mean(waits) * 1000)
+        results[f'scroll_prefetch{prefetch}_p95_wait_ms'] = float(np.percentile(waits, 95) * 1000)
+
+    for name, value in results.items():
+        print(f"{name:<34} {value:.4f}" if isinstance(value, float) else f"{name:<34} {value}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cold-start budgets in milliseconds of cumulative import time
+TARGETS = [
+    ("app.py startup", "import runpy; runpy.run_path('app.py')", 1500),
+    ("utils.dna_encryption", "import utils.dna_encryption", 60),
+    ("utils.lsb_steganography", "import utils.lsb_steganography", 250),
+    ("utils.tiled_metrics", "import utils.tiled_metrics", 200),
+    ("utils.metrics", "import utils.metrics", 250),
+    ("utils.display", "import utils.display", 1500),
+    ("utils.metrics_store", "import utils.metrics_store", 250),
+    ("utils.jobs", "import utils.jobs", 200),
+    ("utils.pipeline", "import utils.pipeline", 300),
+    ("utils.result_cache", "import utils.result_cache", 250),
+    # The chat modules stay light: openai is only imported when a client is made
+    ("utils.knowledge_index", "import utils.knowledge_index", 40),
+    ("utils.response_cache", "import utils.response_cache", 40),
+    ("utils.chat", "import utils.chat", 20),
+]
+
+
+def parse_importtime(stderr):
+    """Parse `python -X importtime` output into (module, self_us, cumulative_us, depth) rows."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        stripped = name.lstrip()
+        depth = (len(name) - len(stripped) - 1) // 2
+        rows.append((stripped, int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def measure(code, baseline=frozenset()):
+    env = dict(os.environ, STREAMLIT_LOGGER_LEVEL="error")
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+    if proc.returncode != 0:
+        raise RuntimeError(f"`{code}` failed:\n{proc.stderr[-2000:]}")
+
+    # Modules every interpreter imports at startup (site, encodings, ...) are excluded
+    rows = [row for row in parse_importtime(proc.stderr) if row[0] not in baseline]
+    top_level = [row for row in rows if row[3] == 0]
+    return {
+        'wall_ms': wall_ms,
+        'import_ms': sum(row[2] for row in top_level) / 1000,
+        'modules': {row[0] for row in rows},
+        'slowest': sorted([row for row in rows if row[3] <= 1], key=lambda row: row[2], reverse=True)[:8]
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cold-start import time report with budgets")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per target; the fastest is reported")
+    parser.add_argument("--json", dest="json_path", help="write the report to this JSON file")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every budget (for slow machines)")
+    args = parser.parse_args(argv)
+
+    baseline = frozenset(measure("pass")['modules'])
+
+    # Warm the bytecode cache so the first run doesn't pay for compilation
+    for _, code, _ in TARGETS:
+        measure(code, baseline)
+
+    report = []
+    failed = False
+    for name, code, budget_ms in TARGETS:
+        runs = [measure(code, baseline) for _ in range(args.repeat)]
+        best = min(runs, key=lambda run: run['import_ms'])
+        budget_ms *= args.scale
+        ok = best['import_ms'] <= budget_ms
+        failed = failed or not ok
+
+        print(f"{'OK  ' if ok else 'OVER'} {name:<26} imports {best['import_ms']:8.1f} ms"
+              f"  (budget {budget_ms:.0f} ms, wall {best['wall_ms']:.0f} ms)")
+        for module, _, cumulative_us, _ in best['slowest']:
+            print(f"       {cumulative_us / 1000:8.1f} ms  {module}")
+
+        report.append({
+            'target': name,
+            'import_ms': best['import_ms'],
+            'wall_ms': best['wall_ms'],
+            'budget_ms': budget_ms,
+            'within_budget': ok,
+            'slowest': [{'module': m, 'cumulative_ms': c / 1000} for m, _, c, _ in best['slowest']]
+        })
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,223 @@
+"""Throughput and peak memory of LSB embed/extract and the image-quality metrics.
+
+    python -m benchmarks.lsb_metrics                      # compare against the committed baseline
+    python -m benchmarks.lsb_metrics --sizes 0.3,1,4,16,100 --no-memory --json results.json
+    python -m benchmarks.lsb_metrics --update-baseline
+
+Runs every operation over a matrix of synthetic cover sizes (megapixels),
+payload fill ratios (share of the cover's LSB capacity) and PNG image
+modes. Embed and extract read the cover/stego PNG, as batch and the spool
+do, so the mode conversion is included; the metrics get the decoded RGB
+arrays, as the app's pipeline passes them, and since those are the same
+for every mode they only run for the first one.
+
+Throughput is the decoded RGB cover size over the best of the timed runs.
+Peak memory is the tracemalloc peak of one extra, untimed run, which
+covers NumPy buffers but not OpenCV's internal scratch memory. Tracing
+slows the per-bit loops a lot, so use --no-memory for the large sizes.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from PIL import Image
+
+from utils.lsb_steganography import LSBSteganography
+from utils.metrics import ImageMetrics
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines', 'lsb_metrics.json')
+DEFAULT_SIZES = "0.3,1"
+DEFAULT_FILLS = "0.01,0.1,1.0"
+DEFAULT_MODES = "RGB,L,RGBA"
+DEFAULT_THRESHOLD = 0.3
+DNA_BASES = np.frombuffer(b'ATCG', dtype=np.uint8)
+OPERATIONS = ['embed', 'extract', 'psnr', 'ssim', 'diff_stats', 'heatmap']
+FILE_OPERATIONS = {'embed', 'extract'}
+
+
+def cover_shape(megapixels):
+    """4:3 width and height with roughly `megapixels` million pixels."""
+    width = int(round((megapixels * 1e6 * 4 / 3) ** 0.5))
+    return width, max(1, int(round(megapixels * 1e6 / width)))
+
+
+def make_cover(width, height, mode, seed=0):
+    """Smooth gradient plus noise, so the PNG and the metrics see something photo-like."""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width]
+    base = (x * 255 // max(1, width - 1) + y * 255 // max(1, height - 1)) // 2
+    rgb = np.clip(base[..., None] + rng.integers(-20, 21, (height, width, 3)), 0, 255).astype(np.uint8)
+    image = Image.fromarray(rgb)
+    if mode == 'RGBA':
+        image.putalpha(255)
+        return image
+    return image.convert(mode)
+
+
+def make_payload(width, height, fill, seed=0):
+    """DNA text filling `fill` of the cover's capacity, leaving room for the end marker."""
+    capacity_bits = width * height * 3 - len(LSBSteganography().end_marker)
+    length = max(1, int(capacity_bits * fill) // 8)
+    rng = np.random.default_rng(seed)
+    return DNA_BASES[rng.integers(0, 4, length)].tobytes().decode('ascii')
+
+
+def best_time(func, repeat, min_time):
+    """Fastest of up to `repeat` runs; stops early once `min_time` seconds have been spent."""
+    times = []
+    while not times or (len(times) < repeat and sum(times) < min_time):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times), len(times)
+
+
+def peak_memory(func):
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_case(directory, megapixels, fill, mode, operations, repeat, min_time, memory):
+    width, height = cover_shape(megapixels)
+    cover_path = os.path.join(directory, f"cover-{megapixels}-{mode}.png")
+    if not os.path.exists(cover_path):
+        make_cover(width, height, mode).save(cover_path)
+    payload = make_payload(width, height, fill)
+
+    lsb = LSBSteganography()
+    embedding = lsb.embed(cover_path, payload)
+    stego_path = os.path.join(directory, 'stego.png')
+    embedding['stego_image'].save(stego_path)
+    extracted = lsb.extract(stego_path)['extracted_data']
+    if extracted != payload:
+        raise RuntimeError(f"{megapixels} MP {mode} at {fill:.0%}: extracted payload does not match")
+
+    cover = np.asarray(Image.open(cover_path).convert('RGB'))
+    stego = np.asarray(embedding['stego_image'])
+    benchmarks = {
+        'embed': lambda: lsb.embed(cover_path, payload),
+        'extract': lambda: lsb.extract(stego_path),
+        'psnr': lambda: ImageMetrics.calculate_psnr(cover, stego),
+        'ssim': lambda: ImageMetrics.calculate_ssim(cover, stego),
+        'diff_stats': lambda: ImageMetrics.calculate_difference_stats(cover, stego),
+        'heatmap': lambda: ImageMetrics.create_difference_heatmap(cover, stego)
+    }
+
+    cover_mb = width * height * 3 / 1e6
+    results = []
+    for operation in operations:
+        seconds, runs = best_time(benchmarks[operation], repeat, min_time)
+        results.append({
+            'operation': operation,
+            'megapixels': megapixels,
+            'fill': fill,
+            'mode': mode,
+            'width': width,
+            'height': height,
+            'payload_bytes': len(payload),
+            'runs': runs,
+            'seconds': seconds,
+            'mb_per_s': cover_mb / seconds,
+            'peak_mb': peak_memory(benchmarks[operation]) / 1e6 if memory else None
+        })
+    return results
+
+
+def case_key(case):
+    return f"{case['operation']}/{case['megapixels']}MP/{case['fill']}/{case['mode']}"
+
+
+def compare(results, baseline, threshold):
+    """Cases that got more than `threshold` slower, or used that much more memory, than the baseline."""
+    reference = {case_key(case): case for case in baseline['cases']}
+    regressions = []
+    for case in results:
+        base = reference.get(case_key(case))
+        if base is None:
+            continue
+        if case['mb_per_s'] < base['mb_per_s'] * (1 - threshold):
+            regressions.append(f"{case_key(case)}: {case['mb_per_s']:.2f} MB/s, baseline {base['mb_per_s']:.2f} MB/s")
+        if case['peak_mb'] is not None and base.get('peak_mb') is not None \
+                and case['peak_mb'] > base['peak_mb'] * (1 + threshold) + 1:
+            regressions.append(f"{case_key(case)}: peak {case['peak_mb']:.1f} MB, baseline {base['peak_mb']:.1f} MB")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark LSB steganography and image-quality metrics")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="comma-separated cover sizes in megapixels")
+    parser.add_argument("--fills", default=DEFAULT_FILLS, help="comma-separated payload fill ratios (0-1]")
+    parser.add_argument("--modes", default=DEFAULT_MODES, help="comma-separated PIL modes of the cover PNG")
+    parser.add_argument("--operations", default=",".join(OPERATIONS), help="subset of " + ",".join(OPERATIONS))
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs per case at most; the fastest is kept")
+    parser.add_argument("--min-time", type=float, default=1.0,
+                        help="stop repeating a case once this many seconds were spent on it")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc peak-memory runs")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed slowdown (and memory growth) relative to the baseline")
+    parser.add_argument("--update-baseline", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--json", dest="json_path", help="write results to this JSON file")
+    args = parser.parse_args(argv)
+
+    operations = args.operations.split(',')
+    unknown = set(operations) - set(OPERATIONS)
+    if unknown:
+        parser.error(f"unknown operations: {', '.join(sorted(unknown))}")
+
+    cases = []
+    with tempfile.TemporaryDirectory() as directory:
+        for megapixels in [float(value) for value in args.sizes.split(',')]:
+            for index, mode in enumerate(args.modes.split(',')):
+                mode_operations = [op for op in operations if index == 0 or op in FILE_OPERATIONS]
+                for fill in [float(value) for value in args.fills.split(',')]:
+                    for case in run_case(directory, megapixels, fill, mode, mode_operations, args.repeat,
+                                         args.min_time, not args.no_memory):
+                        cases.append(case)
+                        memory = f"  peak {case['peak_mb']:8.1f} MB" if case['peak_mb'] is not None else ""
+                        print(f"{case['operation']:<10} {megapixels:6.1f} MP {mode:<4} fill {fill:5.0%}  "
+                              f"{case['mb_per_s']:9.2f} MB/s  {case['seconds'] * 1000:9.1f} ms{memory}")
+
+    results = {
+        'machine': {'python': platform.python_version(), 'numpy': np.__version__,
+                    'processor': platform.machine(), 'cpus': os.cpu_count()},
+        'cases': cases
+    }
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.update_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update-baseline to create one")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(cases, baseline, args.threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    print(f"{len(regressions)} regressions against {args.baseline} (threshold {args.threshold:.0%})")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
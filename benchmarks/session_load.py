@@ -0,0 +1,270 @@
+"""Simulate concurrent Streamlit sessions running the Encrypt & Embed and Extract & Decrypt pages.
+
+    python -m benchmarks.session_load --sessions 1,2,4,8 --rounds 3
+
+Every session is an AppTest (no browser or server) on its own thread, all
+sharing this process's caches and job queue the way sessions share one app
+instance. AppTest installs a process-global mock runtime for each script
+run, so the (short) script runs are serialized; the jobs they submit still
+run concurrently on the shared queue, which is where the time goes.
+
+A round embeds a message unique to the session and round, then uploads the
+resulting stego image to the extract page and checks that the same message
+comes back.
+"""
+import io
+import os
+import sys
+import json
+import time
+import base64
+import argparse
+import tempfile
+import threading
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from PIL import Image
+
+from utils.streaming_stats import RunningStats
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENCRYPT_PAGE = os.path.join(ROOT, 'pages', 'encrypt_embed.py')
+EXTRACT_PAGE = os.path.join(ROOT, 'pages', 'extract_decrypt.py')
+UPLOAD_STATE_KEY = 'load_test_upload'
+DEFAULT_FLOW_TIMEOUT = 120.0
+
+_script_lock = threading.Lock()
+
+
+def page_script(page_path, upload_state_key):
+    """AppTest script: run a page with st.file_uploader returning the upload stored in session state."""
+    import io
+    import hashlib
+    import streamlit as st
+
+    def file_uploader(*args, **kwargs):
+        upload = st.session_state.get(upload_state_key)
+        if upload is None:
+            return None
+        name, data = upload
+        uploaded = io.BytesIO(data)
+        uploaded.name = name
+        uploaded.file_id = hashlib.blake2b(data, digest_size=8).hexdigest()
+        return uploaded
+
+    st.file_uploader = file_uploader
+    with open(page_path) as f:
+        code = compile(f.read(), page_path, 'exec')
+    exec(code, {'__file__': page_path, '__name__': '__main__'})
+
+
+def make_cover(width, height, seed):
+    buffer = io.BytesIO()
+    rng = np.random.default_rng(seed)
+    Image.fromarray(rng.integers(0, 256, (height, width, 3), dtype=np.uint8)).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+class FlowError(Exception):
+    pass
+
+
+class Session:
+    """One simulated clinician: an Encrypt & Embed and an Extract & Decrypt page with their own session state."""
+
+    def __init__(self, index, cover, aes, timeout, poll_interval):
+        from streamlit.testing.v1 import AppTest
+
+        self.index = index
+        self.cover = cover
+        self.key = base64.b64encode(os.urandom(32)).decode('ascii') if aes else None
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.encrypt = AppTest.from_function(page_script, args=(ENCRYPT_PAGE, UPLOAD_STATE_KEY),
+                                             default_timeout=timeout)
+        self.extract = AppTest.from_function(page_script, args=(EXTRACT_PAGE, UPLOAD_STATE_KEY),
+                                             default_timeout=timeout)
+
+    @staticmethod
+    def _run(at):
+        with _script_lock:
+            at.run()
+
+    @staticmethod
+    def _check(at, flow):
+        if at.exception:
+            raise FlowError(f"{flow}: {at.exception[0].value}")
+        if at.error:
+            raise FlowError(f"{flow}: {at.error[0].value}")
+
+    def _wait(self, at, state_key, flow):
+        """Rerun the page until its submitted job has finished, the way the status fragment would."""
+        from utils.display import job_queue
+
+        deadline = time.monotonic() + self.timeout
+        while True:
+            self._check(at, flow)
+            submitted = at.session_state[state_key] if state_key in at.session_state else None
+            job_id = submitted['id'] if isinstance(submitted, dict) else submitted
+            job = job_queue().get(job_id) if job_id else None
+            if job is None:
+                raise FlowError(f"{flow}: no job was submitted")
+            if job.finished:
+                self._run(at)
+                self._check(at, flow)
+                return job
+            if time.monotonic() > deadline:
+                job.cancel()
+                raise FlowError(f"{flow}: no result within {self.timeout}s")
+            time.sleep(self.poll_interval)
+            self._run(at)
+
+    def _click(self, at, label):
+        [button for button in at.button if label in button.label][0].click()
+        self._run(at)
+
+    def embed(self, message):
+        at = self.encrypt
+        at.session_state[UPLOAD_STATE_KEY] = ('cover.png', self.cover)
+        if not at.text_area:
+            self._run(at)
+        if self.key:
+            at.checkbox[0].check()
+            self._run(at)
+            at.text_input[0].input(self.key)
+        at.text_area[0].input(message)
+        self._click(at, 'Encrypt and Embed')
+        job = self._wait(at, 'encrypt_job', 'encrypt')
+        if job.result is None:
+            raise FlowError(f"encrypt: job ended {job.state}")
+        return job.result['png']
+
+    def recover(self, stego):
+        at = self.extract
+        at.session_state[UPLOAD_STATE_KEY] = ('stego.png', stego)
+        self._run(at)
+        if self.key:
+            at.checkbox[0].check()
+            self._run(at)
+            at.text_input[0].input(self.key)
+        self._click(at, 'Extract and Decrypt')
+        self._wait(at, 'extract_job', 'extract')
+        if not at.text_area:
+            raise FlowError("extract: no decrypted message shown")
+        return at.text_area[0].value
+
+
+def run_level(sessions, rounds, covers, message_bytes, aes, timeout, poll_interval):
+    """Run `rounds` round trips in each of `sessions` concurrent sessions."""
+    from utils.display import job_queue
+
+    encrypt_latency = RunningStats()
+    extract_latency = RunningStats()
+    round_trip_latency = RunningStats()
+    errors = []
+    lock = threading.Lock()
+    completed = 0
+    barrier = threading.Barrier(sessions)
+
+    def run_session(index):
+        nonlocal completed
+        session = Session(index, covers[index % len(covers)], aes, timeout, poll_interval)
+        barrier.wait()
+        for round_index in range(rounds):
+            tag = f"Patient {index}-{round_index}: "
+            message = (tag * (message_bytes // len(tag) + 1))[:max(message_bytes, len(tag))]
+            try:
+                started = time.perf_counter()
+                stego = session.embed(message)
+                embedded = time.perf_counter()
+                recovered = session.recover(stego)
+                finished = time.perf_counter()
+                if recovered != message:
+                    raise FlowError(f"session {index} round {round_index}: recovered {recovered[:40]!r}, "
+                                    f"expected {message[:40]!r}")
+            except Exception as e:
+                with lock:
+                    errors.append(f"{type(e).__name__}: {e}")
+                continue
+            with lock:
+                completed += 1
+                encrypt_latency.add(embedded - started)
+                extract_latency.add(finished - embedded)
+                round_trip_latency.add(finished - started)
+
+    threads = [threading.Thread(target=run_session, args=(index,), name=f"session-{index}")
+               for index in range(sessions)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    attempted = sessions * rounds
+    return {
+        'sessions': sessions,
+        'round_trips': attempted,
+        'completed': completed,
+        'elapsed_s': elapsed,
+        'round_trips_per_s': completed / elapsed,
+        'error_rate': (attempted - completed) / attempted,
+        'encrypt_s': encrypt_latency.summary(),
+        'extract_s': extract_latency.summary(),
+        'round_trip_s': round_trip_latency.summary(),
+        'queue': job_queue().stats(),
+        'sample_errors': errors[:5]
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the Streamlit pages with concurrent AppTest sessions")
+    parser.add_argument("--sessions", default="1,2,4,8", help="comma-separated concurrent session counts")
+    parser.add_argument("--rounds", type=int, default=3, help="embed/extract round trips per session")
+    parser.add_argument("--size", type=int, default=512, help="cover width and height in pixels")
+    parser.add_argument("--message-bytes", type=int, default=256)
+    parser.add_argument("--aes", action="store_true", help="use the AES-256 layer")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_FLOW_TIMEOUT, help="seconds per page flow")
+    parser.add_argument("--poll-interval", type=float, help="seconds between reruns while a job runs "
+                                                             "(default: the page's status poll interval)")
+    parser.add_argument("--metrics-db", help="metrics database the runs record into (default: a temporary file)")
+    parser.add_argument("--json", dest="json_path", help="write results to this JSON file")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Keep synthetic runs out of the real analytics; read when the store is first imported
+        os.environ['STEGO_METRICS_DB'] = args.metrics_db or os.path.join(tmp, 'metrics.db')
+        from utils.display import JOB_POLL_INTERVAL, job_queue
+
+        poll_interval = args.poll_interval or JOB_POLL_INTERVAL
+        levels = [int(value) for value in args.sessions.split(',')]
+        covers = [make_cover(args.size, args.size, seed) for seed in range(max(levels))]
+        stats = job_queue().stats()
+        print(f"{args.rounds} round trips per session, {args.size}x{args.size} covers, "
+              f"{args.message_bytes}-byte messages, {stats['workers']} job workers")
+
+        results = []
+        for sessions in levels:
+            result = run_level(sessions, args.rounds, covers, args.message_bytes, args.aes, args.timeout,
+                               poll_interval)
+            results.append(result)
+            latency = result['round_trip_s']
+            line = (f"{sessions:3d} sessions: {result['round_trips_per_s']:.2f} round trips/s, "
+                    f"error rate {result['error_rate']:.1%}")
+            if latency['count']:
+                line += (f", round trip p50 {latency['p50']:.2f}s  p95 {latency['p95']:.2f}s  "
+                         f"p99 {latency['p99']:.2f}s")
+            print(line)
+            for error in result['sample_errors']:
+                print(f"    {error}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({'rounds': args.rounds, 'size': args.size, 'message_bytes': args.message_bytes,
+                       'aes': args.aes, 'levels': results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
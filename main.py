@@ -8,7 +8,14 @@ def main():
 
     This uses `python -m streamlit run app.py ...` which is more reliable than
     calling a platform-specific `streamlit` executable.
+
+    `python main.py service [options]` starts the HTTP exchange service
+    (`service.py`) instead.
     """
+    if sys.argv[1:2] == ["service"]:
+        from service import main as service_main
+        return service_main(sys.argv[2:])
+
     app_file = "app.py"
     if not os.path.exists(app_file):
         print(f"Error: '{app_file}' not found in {os.getcwd()}")
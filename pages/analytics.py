@@ -1,56 +1,125 @@
+import time
+
 import streamlit as st
-import plotly.graph_objects as go
-import plotly.express as px
-import pandas as pd
-import numpy as np
+
+from utils.display import session_id, job_queue, show_queue_stats
+from utils.metrics_store import shared_store, MEMORY_STAGES
+from utils.result_cache import shared_result_cache
+
+TIME_RANGES = {
+    "Last hour": 3600,
+    "Last 24 hours": 24 * 3600,
+    "Last 7 days": 7 * 24 * 3600,
+    "Last 30 days": 30 * 24 * 3600,
+    "All time": None
+}
+CHART_POINTS = 300
+RECENT_OPERATIONS = 200
+LATENCY_STAGES = [
+    ('encryption', 'encryption_time', 'Encryption'),
+    ('encryption', 'embedding_time', 'Embedding'),
+    ('decryption', 'extraction_time', 'Extraction'),
+    ('decryption', 'decryption_time', 'Decryption'),
+    ('decryption', 'total_time', 'Extraction + Decryption'),
+    ('encryption', 'queue_wait', 'Queue Wait (Encrypt)'),
+    ('decryption', 'queue_wait', 'Queue Wait (Extract)')
+]
+MEMORY_STAGE_LABELS = {
+    'encrypt': 'Encryption',
+    'embed': 'Embedding',
+    'psnr': 'PSNR',
+    'ssim': 'SSIM',
+    'difference_stats': 'Difference Stats',
+    'heatmap': 'Heatmap',
+    'extract': 'Extraction',
+    'decrypt': 'Decryption'
+}
+MB = 1024 * 1024
 
 st.title("📊 Analytics Dashboard")
 st.markdown("### Performance Metrics and System Statistics")
 
 st.markdown("---")
 
-if 'encryption_history' not in st.session_state:
-    st.session_state.encryption_history = []
+store = shared_store()
+
+col1, col2 = st.columns(2)
+with col1:
+    range_label = st.selectbox("Time range", list(TIME_RANGES), index=1)
+with col2:
+    scope = st.radio("Scope", ["All sessions", "This session"], horizontal=True)
+
+until = time.time()
+since = until - TIME_RANGES[range_label] if TIME_RANGES[range_label] else None
+session = session_id() if scope == "This session" else None
 
-if 'decryption_history' not in st.session_state:
-    st.session_state.decryption_history = []
+enc_summary = store.summary('encryption', since, until, session)
+dec_summary = store.summary('decryption', since, until, session)
+summaries = {'encryption': enc_summary, 'decryption': dec_summary}
 
-if len(st.session_state.encryption_history) > 0 or len(st.session_state.decryption_history) > 0:
+if enc_summary['count'] > 0 or dec_summary['count'] > 0:
+    import plotly.graph_objects as go
+    import plotly.express as px
+    import pandas as pd
     
-    tabs = st.tabs(["📈 Encryption Metrics", "📉 Decryption Metrics", "🔬 Quality Analysis", "⚡ Performance"])
+    def load_series(kind, primary):
+        df = pd.DataFrame(store.timeseries(kind, since, until, session, points=CHART_POINTS, primary=primary))
+        if not df.empty:
+            df['time'] = pd.to_datetime(df['ts'], unit='s')
+        return df
+    
+    tabs = st.tabs(["📈 Encryption Metrics", "📉 Decryption Metrics", "🔬 Quality Analysis", "⚡ Performance", "💾 Memory"])
     
     with tabs[0]:
         st.subheader("Encryption & Embedding Statistics")
         
-        if len(st.session_state.encryption_history) > 0:
-            enc_df = pd.DataFrame(st.session_state.encryption_history)
+        if enc_summary['count'] > 0:
+            enc_mean = enc_summary['mean']
+            enc_df = load_series('encryption', 'embedding_time')
+            recent_df = pd.DataFrame(store.recent('encryption', RECENT_OPERATIONS, session))
             
             col1, col2, col3, col4 = st.columns(4)
             with col1:
-                st.metric("Total Operations", len(st.session_state.encryption_history))
+                st.metric("Total Operations", enc_summary['count'])
             with col2:
-                st.metric("Avg Encryption Time", f"{enc_df['encryption_time'].mean():.4f}s")
+                st.metric("Avg Encryption Time", f"{enc_mean['encryption_time']:.4f}s")
             with col3:
-                st.metric("Avg Embedding Time", f"{enc_df['embedding_time'].mean():.4f}s")
+                st.metric("Avg Embedding Time", f"{enc_mean['embedding_time']:.4f}s")
             with col4:
-                st.metric("Avg Message Length", f"{enc_df['message_length'].mean():.0f} chars")
+                st.metric("Avg Message Length", f"{enc_mean['message_length']:.0f} chars")
             
             fig_time = go.Figure()
             fig_time.add_trace(go.Scatter(
+                x=enc_df['time'],
                 y=enc_df['encryption_time'],
                 mode='lines+markers',
                 name='Encryption Time',
                 line=dict(color='#FF6B6B')
             ))
             fig_time.add_trace(go.Scatter(
+                x=enc_df['time'],
                 y=enc_df['embedding_time'],
                 mode='lines+markers',
                 name='Embedding Time',
                 line=dict(color='#4ECDC4')
             ))
+            fig_time.add_trace(go.Scatter(
+                x=enc_df['time'],
+                y=enc_df['encryption_time_p95'],
+                mode='lines',
+                name='Encryption Time (p95)',
+                line=dict(color='#FF6B6B', dash='dot')
+            ))
+            fig_time.add_trace(go.Scatter(
+                x=enc_df['time'],
+                y=enc_df['embedding_time_p95'],
+                mode='lines',
+                name='Embedding Time (p95)',
+                line=dict(color='#4ECDC4', dash='dot')
+            ))
             fig_time.update_layout(
-                title="Processing Time Over Operations",
-                xaxis_title="Operation Number",
+                title="Processing Time Over Time",
+                xaxis_title="Time",
                 yaxis_title="Time (seconds)",
                 hovermode='x unified'
             )
@@ -60,9 +129,9 @@ if len(st.session_state.encryption_history) > 0 or len(st.session_state.decrypti
             
             with col1:
                 fig_msg = px.bar(
-                    enc_df,
+                    recent_df,
                     y='message_length',
-                    title="Message Lengths",
+                    title=f"Message Lengths (last {len(recent_df)} operations)",
                     labels={'message_length': 'Characters', 'index': 'Operation'},
                     color='message_length',
                     color_continuous_scale='Viridis'
@@ -71,9 +140,9 @@ if len(st.session_state.encryption_history) > 0 or len(st.session_state.decrypti
             
             with col2:
                 fig_dna = px.bar(
-                    enc_df,
+                    recent_df,
                     y='dna_length',
-                    title="DNA Sequence Lengths",
+                    title=f"DNA Sequence Lengths (last {len(recent_df)} operations)",
                     labels={'dna_length': 'DNA Bases', 'index': 'Operation'},
                     color='dna_length',
                     color_continuous_scale='Blues'
@@ -86,33 +155,36 @@ if len(st.session_state.encryption_history) > 0 or len(st.session_state.decrypti
     with tabs[1]:
         st.subheader("Decryption & Extraction Statistics")
         
-        if len(st.session_state.decryption_history) > 0:
-            dec_df = pd.DataFrame(st.session_state.decryption_history)
+        if dec_summary['count'] > 0:
+            dec_mean = dec_summary['mean']
+            dec_df = load_series('decryption', 'total_time')
             
             col1, col2, col3, col4 = st.columns(4)
             with col1:
-                st.metric("Total Operations", len(st.session_state.decryption_history))
+                st.metric("Total Operations", dec_summary['count'])
             with col2:
-                st.metric("Avg Extraction Time", f"{dec_df['extraction_time'].mean():.4f}s")
+                st.metric("Avg Extraction Time", f"{dec_mean['extraction_time']:.4f}s")
             with col3:
-                st.metric("Avg Decryption Time", f"{dec_df['decryption_time'].mean():.4f}s")
+                st.metric("Avg Decryption Time", f"{dec_mean['decryption_time']:.4f}s")
             with col4:
-                st.metric("Avg Total Time", f"{dec_df['total_time'].mean():.4f}s")
+                st.metric("Avg Total Time", f"{dec_mean['total_time']:.4f}s")
             
             fig_dec = go.Figure()
             fig_dec.add_trace(go.Bar(
+                x=dec_df['time'],
                 y=dec_df['extraction_time'],
                 name='Extraction Time',
                 marker_color='#95E1D3'
             ))
             fig_dec.add_trace(go.Bar(
+                x=dec_df['time'],
                 y=dec_df['decryption_time'],
                 name='Decryption Time',
                 marker_color='#F38181'
             ))
             fig_dec.update_layout(
                 title="Decryption Process Breakdown",
-                xaxis_title="Operation Number",
+                xaxis_title="Time",
                 yaxis_title="Time (seconds)",
                 barmode='stack'
             )
@@ -120,9 +192,10 @@ if len(st.session_state.encryption_history) > 0 or len(st.session_state.decrypti
             
             fig_total = px.line(
                 dec_df,
+                x='time',
                 y='total_time',
                 title="Total Processing Time Trend",
-                labels={'total_time': 'Time (seconds)', 'index': 'Operation'},
+                labels={'total_time': 'Time (seconds)', 'time': 'Time'},
                 markers=True
             )
             st.plotly_chart(fig_total, use_container_width=True)
@@ -133,19 +206,18 @@ if len(st.session_state.encryption_history) > 0 or len(st.session_state.decrypti
     with tabs[2]:
         st.subheader("Image Quality Metrics")
         
-        if len(st.session_state.encryption_history) > 0:
-            enc_df = pd.DataFrame(st.session_state.encryption_history)
-            
+        if enc_summary['count'] > 0:
             col1, col2 = st.columns(2)
             with col1:
-                st.metric("Avg PSNR", f"{enc_df['psnr'].mean():.2f} dB", 
+                st.metric("Avg PSNR", f"{enc_mean['psnr']:.2f} dB", 
                          help="Peak Signal-to-Noise Ratio - Higher is better")
             with col2:
-                st.metric("Avg SSIM", f"{enc_df['ssim'].mean():.4f}",
+                st.metric("Avg SSIM", f"{enc_mean['ssim']:.4f}",
                          help="Structural Similarity Index - Closer to 1.0 is better")
             
             fig_psnr = go.Figure()
             fig_psnr.add_trace(go.Scatter(
+                x=enc_df['time'],
                 y=enc_df['psnr'],
                 mode='lines+markers',
                 name='PSNR',
@@ -157,14 +229,15 @@ if len(st.session_state.encryption_history) > 0 or len(st.session_state.decrypti
             fig_psnr.add_hline(y=30, line_dash="dash", line_color="orange",
                               annotation_text="Good (>30 dB)")
             fig_psnr.update_layout(
-                title="PSNR Values Across Operations",
-                xaxis_title="Operation Number",
+                title="PSNR Values Over Time",
+                xaxis_title="Time",
                 yaxis_title="PSNR (dB)"
             )
             st.plotly_chart(fig_psnr, use_container_width=True)
             
             fig_ssim = go.Figure()
             fig_ssim.add_trace(go.Scatter(
+                x=enc_df['time'],
                 y=enc_df['ssim'],
                 mode='lines+markers',
                 name='SSIM',
@@ -172,8 +245,8 @@ if len(st.session_state.encryption_history) > 0 or len(st.session_state.decrypti
                 line=dict(color='#00B894', width=3)
             ))
             fig_ssim.update_layout(
-                title="SSIM Values Across Operations",
-                xaxis_title="Operation Number",
+                title="SSIM Values Over Time",
+                xaxis_title="Time",
                 yaxis_title="SSIM (0-1)"
             )
             st.plotly_chart(fig_ssim, use_container_width=True)
@@ -198,14 +271,29 @@ if len(st.session_state.encryption_history) > 0 or len(st.session_state.decrypti
             st.info("📝 No quality metrics available. Perform encryption operations to generate quality data.")
     
     with tabs[3]:
+        st.subheader("Latency Percentiles")
+        
+        latency_rows = [
+            {
+                'Stage': label,
+                'Operations': summaries[kind]['count'],
+                'Mean (ms)': summaries[kind]['mean'][column] * 1000,
+                'p50 (ms)': summaries[kind]['p50'][column] * 1000,
+                'p95 (ms)': summaries[kind]['p95'][column] * 1000,
+                'p99 (ms)': summaries[kind]['p99'][column] * 1000,
+                'Max (ms)': summaries[kind]['max'][column] * 1000
+            }
+            for kind, column, label in LATENCY_STAGES
+            if summaries[kind]['count'] > 0 and summaries[kind]['mean'][column] is not None
+        ]
+        st.dataframe(pd.DataFrame(latency_rows).round(3), hide_index=True, use_container_width=True)
+        st.caption("Percentiles come from streaming sketches with 1% relative error.")
+        
         st.subheader("Performance Comparison")
         
-        if len(st.session_state.encryption_history) > 0 and len(st.session_state.decryption_history) > 0:
-            enc_df = pd.DataFrame(st.session_state.encryption_history)
-            dec_df = pd.DataFrame(st.session_state.decryption_history)
-            
-            avg_enc_total = (enc_df['encryption_time'] + enc_df['embedding_time']).mean()
-            avg_dec_total = dec_df['total_time'].mean()
+        if enc_summary['count'] > 0 and dec_summary['count'] > 0:
+            avg_enc_total = enc_mean['encryption_time'] + enc_mean['embedding_time']
+            avg_dec_total = dec_mean['total_time']
             
             fig_compare = go.Figure(data=[
                 go.Bar(name='Encryption + Embedding', x=['Average Time'], y=[avg_enc_total], marker_color='#FF6B6B'),
@@ -221,10 +309,10 @@ if len(st.session_state.encryption_history) > 0 or len(st.session_state.decrypti
             efficiency_data = {
                 'Process': ['Encryption', 'Embedding', 'Extraction', 'Decryption'],
                 'Avg Time (ms)': [
-                    enc_df['encryption_time'].mean() * 1000,
-                    enc_df['embedding_time'].mean() * 1000,
-                    dec_df['extraction_time'].mean() * 1000,
-                    dec_df['decryption_time'].mean() * 1000
+                    enc_mean['encryption_time'] * 1000,
+                    enc_mean['embedding_time'] * 1000,
+                    dec_mean['extraction_time'] * 1000,
+                    dec_mean['decryption_time'] * 1000
                 ]
             }
             efficiency_df = pd.DataFrame(efficiency_data)
@@ -240,15 +328,80 @@ if len(st.session_state.encryption_history) > 0 or len(st.session_state.decrypti
         else:
             st.info("📝 Perform both encryption and decryption operations to see performance comparisons.")
     
+    with tabs[4]:
+        st.subheader("Peak Memory per Stage")
+        
+        memory_rows = []
+        for kind, stages in MEMORY_STAGES.items():
+            summary = summaries[kind]
+            for prefix in stages.values():
+                peak, arrays = f'{prefix}_peak_bytes', f'{prefix}_array_bytes'
+                if summary['counts'].get(peak):
+                    memory_rows.append({
+                        'Stage': MEMORY_STAGE_LABELS[prefix],
+                        'Tracked Runs': summary['counts'][peak],
+                        'Mean Peak (MB)': summary['mean'][peak] / MB,
+                        'p95 Peak (MB)': summary['p95'][peak] / MB,
+                        'Max Peak (MB)': summary['max'][peak] / MB,
+                        'Max NumPy Buffers (MB)': summary['max'][arrays] / MB
+                    })
+        
+        if memory_rows:
+            memory_df = pd.DataFrame(memory_rows)
+            st.dataframe(memory_df.round(2), hide_index=True, use_container_width=True)
+            st.caption("Peak is the tracemalloc high-water mark above the memory in use when the stage started, "
+                       "NumPy buffers the arrays the stage and its sub-stages allocated.")
+            
+            fig_peak = go.Figure(data=[
+                go.Bar(name='Mean Peak', x=memory_df['Stage'], y=memory_df['Mean Peak (MB)'], marker_color='#74B9FF'),
+                go.Bar(name='Max Peak', x=memory_df['Stage'], y=memory_df['Max Peak (MB)'], marker_color='#E17055')
+            ])
+            fig_peak.update_layout(
+                title="Peak Memory by Stage",
+                yaxis_title="Memory (MB)",
+                barmode='group'
+            )
+            st.plotly_chart(fig_peak, use_container_width=True)
+            
+            fig_memory = go.Figure()
+            for kind, df in (('encryption', enc_df if enc_summary['count'] > 0 else None),
+                             ('decryption', dec_df if dec_summary['count'] > 0 else None)):
+                if df is None:
+                    continue
+                for prefix in MEMORY_STAGES[kind].values():
+                    column = f'{prefix}_peak_bytes'
+                    if summaries[kind]['counts'].get(column):
+                        fig_memory.add_trace(go.Scatter(
+                            x=df['time'],
+                            y=df[column] / MB,
+                            mode='lines+markers',
+                            name=MEMORY_STAGE_LABELS[prefix],
+                            connectgaps=True
+                        ))
+            fig_memory.update_layout(
+                title="Mean Peak Memory Over Time",
+                xaxis_title="Time",
+                yaxis_title="Memory (MB)",
+                hovermode='x unified'
+            )
+            st.plotly_chart(fig_memory, use_container_width=True)
+        else:
+            st.info("📝 No memory measurements yet. Enable 💾 Track peak memory on the Encrypt & Embed or "
+                    "Extract & Decrypt page to record them.")
+    
     st.markdown("---")
     
-    if st.button("🗑️ Clear All Analytics Data", type="secondary"):
-        st.session_state.encryption_history = []
-        st.session_state.decryption_history = []
+    st.caption(f"Metrics database: {store.path} · {len(store.recent('encryption')) + len(store.recent('decryption'))} "
+               f"recent operations held in memory · charts show at most {CHART_POINTS} points per series")
+    
+    clear_label = "🗑️ Clear All Analytics Data" if session is None else "🗑️ Clear This Session's Analytics Data"
+    if st.button(clear_label, type="secondary"):
+        store.clear(session)
         st.rerun()
 
 else:
-    st.info("📊 No analytics data available yet")
+    st.info(f"📊 No analytics data recorded in the {range_label.lower()}" if TIME_RANGES[range_label]
+            else "📊 No analytics data available yet")
     
     st.markdown("""
     ### 🚀 Get Started
@@ -283,3 +436,68 @@ else:
     - Comparative analysis
     - Efficiency trends
     """)
+
+st.markdown("---")
+st.subheader("🤖 AI Assistant")
+chat_summary = store.summary('chat', since, until, session)
+if chat_summary['count'] > 0:
+    import plotly.express as px
+    import pandas as pd
+    
+    col1, col2, col3, col4, col5 = st.columns(5)
+    with col1:
+        st.metric("Questions", chat_summary['count'])
+    with col2:
+        st.metric("Avg Tokens Sent", f"{chat_summary['mean']['prompt_tokens']:.0f}",
+                  help="Estimated prompt tokens per question; cached and locally answered questions send none")
+    with col3:
+        st.metric("p95 Tokens Sent", f"{chat_summary['p95']['prompt_tokens']:.0f}")
+    with col4:
+        st.metric("Answered from Cache", f"{chat_summary['mean']['cached'] * 100:.0f}%")
+    with col5:
+        # Questions recorded before the knowledge index have no value
+        answered_locally = chat_summary['mean'].get('local') or 0
+        st.metric("Answered Locally", f"{answered_locally * 100:.0f}%",
+                  help="Answered from the system's own documentation without calling the model")
+    
+    chat_df = pd.DataFrame(store.timeseries('chat', since, until, session, points=CHART_POINTS,
+                                            primary='prompt_tokens'))
+    chat_df['time'] = pd.to_datetime(chat_df['ts'], unit='s')
+    fig_tokens = px.line(
+        chat_df,
+        x='time',
+        y=['prompt_tokens', 'prompt_tokens_p95'],
+        title="Prompt Tokens per Question",
+        labels={'value': 'Tokens (estimated)', 'time': 'Time', 'variable': ''},
+        markers=True
+    )
+    st.plotly_chart(fig_tokens, use_container_width=True)
+    st.caption(f"Older turns are summarized once a conversation exceeds the context budget; "
+               f"{chat_summary['mean']['dropped_messages']:.1f} messages were left out per question on average.")
+else:
+    st.info("📝 No AI Assistant questions recorded yet.")
+
+st.markdown("---")
+st.subheader("⚙️ Job Queue")
+show_queue_stats(job_queue().stats())
+st.caption("Encrypt and Extract runs share this worker pool. A growing wait means more workers are needed.")
+
+st.markdown("---")
+st.subheader("♻️ Embed Result Cache")
+cache_stats = shared_result_cache().stats()
+col1, col2, col3, col4 = st.columns(4)
+with col1:
+    st.metric("Hit Rate", f"{cache_stats['hit_rate'] * 100:.0f}%",
+              help="Encrypt & Embed requests answered with the result of an identical earlier one")
+with col2:
+    st.metric("Hits (Memory / Disk)", f"{cache_stats['memory_hits']} / {cache_stats['disk_hits']}")
+with col3:
+    st.metric("Misses", cache_stats['misses'])
+with col4:
+    st.metric("Cached in Memory", f"{cache_stats['memory_bytes'] / 1e6:.1f} MB",
+              help=f"{cache_stats['memory_entries']} results")
+if cache_stats['disk_entries'] is not None:
+    st.caption(f"Disk tier: {cache_stats['disk_entries']} results, {cache_stats['disk_bytes'] / 1e6:.1f} MB. "
+               f"Counts are since this server started.")
+else:
+    st.caption("Counts are since this server started. Set STEGO_RESULT_CACHE_DB to keep AES results across restarts.")
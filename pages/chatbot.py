@@ -1,15 +1,21 @@
 import streamlit as st
 import os
-from openai import OpenAI
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.chat import ERROR_PREFIX, SYSTEM_PROMPT, build_context, chat_configured, chat_model, is_error, make_client, stream_completion, replay
+from utils.display import session_id, StreamingMarkdown
+from utils.knowledge_index import KnowledgeIndex, shared_knowledge_index, format_answer, format_snippets, format_offline_answer
+from utils.metrics_store import shared_store
+from utils.response_cache import shared_response_cache, cache_key
 
 st.title("🤖 AI Assistant")
 st.markdown("### Your intelligent guide for secure medical data encryption")
 
 st.markdown("---")
 
-OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
-
-if not OPENAI_API_KEY:
+if not chat_configured():
     st.warning("⚠️ OpenAI API key not configured")
     st.info("""
     To enable the AI Assistant, you need to provide an OpenAI API key:
@@ -17,8 +23,9 @@ if not OPENAI_API_KEY:
     1. Get your API key from [OpenAI Platform](https://platform.openai.com/api-keys)
     2. Add it to your Replit Secrets as `OPENAI_API_KEY`
     3. Refresh this page
+    
+    Until then, questions are answered from this system's own documentation only.
     """)
-    st.stop()
 
 if 'messages' not in st.session_state:
     st.session_state.messages = [
@@ -52,47 +59,55 @@ if prompt := st.chat_input("Ask me anything about encryption, steganography, or
         message_placeholder = st.empty()
         
         try:
-            client = OpenAI(api_key=OPENAI_API_KEY)
-            
-            system_prompt = """You are an expert AI assistant for a Secure Inter-Hospital Communication System that uses DNA encryption and LSB image steganography.
-
-Your knowledge includes:
-- DNA Encryption: Binary to DNA encoding (00→A, 01→T, 10→C, 11→G) with symmetric substitution cipher (A↔T, C↔G)
-- LSB Steganography: Embedding encrypted data in image pixels using Least Significant Bit manipulation
-- DICOM medical imaging format and standards
-- Image quality metrics: PSNR (Peak Signal-to-Noise Ratio) and SSIM (Structural Similarity Index)
-- Security best practices for medical data
-- HIPAA compliance considerations
-
-Provide clear, concise, and helpful responses. Use examples when appropriate. Be professional but friendly."""
-
-            from typing import cast
-            from openai.types.chat import ChatCompletionMessageParam
-            
-            messages_for_api: list[ChatCompletionMessageParam] = [
-                {"role": "system", "content": system_prompt}
-            ] + cast(list[ChatCompletionMessageParam], st.session_state.messages)
-            
-            # the newest OpenAI model is "gpt-5" which was released August 7, 2025.
-            # do not change this unless explicitly requested by the user
-            response = client.chat.completions.create(
-                model="gpt-5",
-                messages=messages_for_api,
-                stream=True
-            )
+            started = time.perf_counter()
+            # Questions the system's own pages answer are served locally; for
+            # the rest the closest passages ground the model's answer
+            results = shared_knowledge_index().search(prompt)
+            local = (bool(results) and KnowledgeIndex.is_confident(results[0])) or not chat_configured()
+            context = {'tokens': 0, 'kept': 0, 'dropped': 0}
+            cached_response = None
+            if local:
+                if results and KnowledgeIndex.is_confident(results[0]):
+                    deltas = replay(format_answer(results))
+                else:
+                    deltas = replay(format_offline_answer(results))
+            else:
+                system_prompt = SYSTEM_PROMPT + "\n\n" + format_snippets(results) if results else SYSTEM_PROMPT
+                # Recent turns within the token budget; older ones are summarized, errors left out
+                messages_for_api, context = build_context(st.session_state.messages, system_prompt=system_prompt)
+                
+                # Repeated questions (typically first questions from the sample
+                # list) are answered from the cache, replayed as a stream; a
+                # follow-up only matches after the same earlier turns
+                response_cache = shared_response_cache()
+                earlier_turns = [message for message in st.session_state.messages[1:-1] if not is_error(message)]
+                key = cache_key(chat_model(), SYSTEM_PROMPT, prompt, earlier_turns)
+                cached_response = response_cache.get(key)
+                if cached_response is not None:
+                    deltas = replay(cached_response)
+                else:
+                    deltas = stream_completion(make_client(), messages_for_api)
             
-            full_response = ""
-            for chunk in response:
-                if chunk.choices[0].delta.content is not None:
-                    full_response += chunk.choices[0].delta.content
-                    message_placeholder.markdown(full_response + "▌")
+            stream = StreamingMarkdown(message_placeholder)
+            for delta in deltas:
+                stream.add(delta)
+            full_response = stream.close()
+            if not local and cached_response is None:
+                response_cache.put(key, full_response)
             
-            message_placeholder.markdown(full_response)
+            shared_store().record('chat', {
+                'prompt_tokens': 0 if local or cached_response is not None else context['tokens'],
+                'context_messages': context['kept'],
+                'dropped_messages': context['dropped'],
+                'response_time': time.perf_counter() - started,
+                'cached': cached_response is not None,
+                'local': local
+            }, session=session_id())
             
             st.session_state.messages.append({"role": "assistant", "content": full_response})
             
         except Exception as e:
-            error_message = f"❌ Error: {str(e)}"
+            error_message = f"{ERROR_PREFIX}: {str(e)}"
             message_placeholder.markdown(error_message)
             st.session_state.messages.append({"role": "assistant", "content": error_message})
 
@@ -1,8 +1,190 @@
 import streamlit as st
-import pydicom
-from PIL import Image
-import numpy as np
-import io
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.display import upload_digest, show_pyramid
+
+DICOM_CACHE_ENTRIES = 2
+RENDERED_SLICE_CACHE_BYTES = 256 * 1024 * 1024
+IMAGE_VIEWPORT_WIDTH = 1024
+HEADER_PAGE_SIZES = [25, 50, 100, 250]
+
+
+@st.cache_resource(max_entries=DICOM_CACHE_ENTRIES, show_spinner=False)
+def load_dicom(file_hash, _uploaded_file):
+    import io
+    from utils.dicom_loader import DicomLoader
+    
+    return DicomLoader(io.BytesIO(_uploaded_file.getvalue()))
+
+
+@st.cache_resource(max_entries=DICOM_CACHE_ENTRIES, show_spinner=False)
+def frame_decoder(file_hash, _loader):
+    from utils.frame_decoder import FrameDecoder
+    
+    return FrameDecoder(_loader)
+
+
+@st.cache_data(max_entries=32, show_spinner="Decoding every frame for volume statistics...")
+def dicom_statistics(file_hash, _decoder):
+    from utils.dicom_loader import volume_statistics
+    
+    return volume_statistics(_decoder.iter_frames())
+
+
+@st.cache_resource
+def rendered_slice_cache():
+    from utils.lru_cache import LRUCache
+    
+    return LRUCache(max_bytes=RENDERED_SLICE_CACHE_BYTES)
+
+
+@st.cache_resource(max_entries=DICOM_CACHE_ENTRIES, show_spinner="Reading series headers...")
+def load_series(files_hash, _uploaded_files):
+    from utils.dicom_series import find_series
+    
+    return find_series(_uploaded_files)
+
+
+@st.cache_resource(max_entries=DICOM_CACHE_ENTRIES, show_spinner="Decoding series slices...")
+def load_series_volume(files_hash, series_uid, _series):
+    return _series.load_volume()
+
+
+@st.cache_data(max_entries=32, show_spinner="Computing volume statistics...")
+def series_statistics(files_hash, series_uid, _volume):
+    from utils.dicom_loader import volume_statistics
+    
+    return volume_statistics(_volume)
+
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def header_index(file_hash, _dicom_data):
+    from utils.dicom_header import build_tag_index
+    
+    return build_tag_index(_dicom_data)
+
+
+def show_header_browser(entries, dicom_data, key):
+    from utils.dicom_header import search_index, element_at, full_value
+    
+    col_a, col_b = st.columns([3, 1])
+    with col_a:
+        query = st.text_input("Search by keyword or tag", placeholder="e.g. PatientName or 0010,0010",
+                              key=f"{key}_query")
+    with col_b:
+        page_size = st.selectbox("Rows per page", HEADER_PAGE_SIZES, index=1, key=f"{key}_page_size")
+    
+    matches = search_index(entries, query)
+    page_count = max(1, -(-len(matches) // page_size))
+    page = st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, value=1,
+                           key=f"{key}_page")
+    rows = matches[(page - 1) * page_size:page * page_size]
+    
+    st.caption(f"{len(matches)} of {len(entries)} elements")
+    st.dataframe(
+        [{'Tag': e['tag'], 'Keyword': e['keyword'], 'VR': e['vr'], 'Value': e['value'], 'Path': e['path']}
+         for e in rows],
+        use_container_width=True, hide_index=True
+    )
+    
+    long_values = [e for e in rows if e['truncated']]
+    if long_values:
+        choice = st.selectbox("Show full value", [None] + list(range(len(long_values))),
+                              format_func=lambda i: "—" if i is None else
+                              f"{long_values[i]['path']}{long_values[i]['keyword']} {long_values[i]['tag']}",
+                              key=f"{key}_full_value")
+        if choice is not None:
+            st.code(full_value(element_at(dicom_data, long_values[choice]['location'])), language="text")
+
+
+def show_image(pixels, caption, aspect=1.0):
+    from PIL import Image
+    from utils.image_pyramid import downscale
+    
+    img = Image.fromarray(downscale(pixels, IMAGE_VIEWPORT_WIDTH))
+    if abs(aspect - 1.0) > 0.01:
+        img = img.resize((img.width, max(1, round(img.height * aspect))), Image.Resampling.BILINEAR)
+    st.image(img, caption=caption, use_container_width=True)
+
+
+def show_metadata(dicom_data, shape, dtype, nbytes):
+    st.subheader("📊 Metadata")
+    
+    metadata_items = [
+        ("Patient Name", "PatientName"),
+        ("Patient ID", "PatientID"),
+        ("Study Date", "StudyDate"),
+        ("Modality", "Modality"),
+        ("Body Part", "BodyPartExamined"),
+        ("Institution", "InstitutionName"),
+        ("Manufacturer", "Manufacturer"),
+        ("Rows", "Rows"),
+        ("Columns", "Columns"),
+    ]
+    
+    for label, tag in metadata_items:
+        try:
+            value = getattr(dicom_data, tag, "N/A")
+            st.text(f"{label}: {value}")
+        except:
+            st.text(f"{label}: N/A")
+    
+    st.markdown("---")
+    
+    st.subheader("🔍 Image Properties")
+    st.text(f"Shape: {shape}")
+    st.text(f"Data Type: {dtype}")
+    st.text(f"Size: {nbytes / 1024:.2f} KB")
+
+
+def show_statistics(stats, title):
+    st.markdown(f"#### {title}")
+    col_a, col_b, col_c, col_d = st.columns(4)
+    with col_a:
+        st.metric("Min Pixel Value", f"{stats['min']}")
+    with col_b:
+        st.metric("Max Pixel Value", f"{stats['max']}")
+    with col_c:
+        st.metric("Mean", f"{stats['mean']:.2f}")
+    with col_d:
+        st.metric("Std Dev", f"{stats['std']:.2f}")
+
+
+def show_windowing(dicom_data, stats, get_pixels, aspect=1.0, windowing=None):
+    from utils.windowing import Windowing, WINDOW_PRESETS
+    
+    st.markdown("Adjust window level and width for better visualization")
+    
+    if windowing is None:
+        windowing = Windowing.from_dataset(dicom_data)
+    low = windowing.to_modality(stats['min'])
+    high = windowing.to_modality(stats['max'])
+    low, high = int(min(low, high)), int(max(low, high))
+    
+    preset = st.selectbox("Window Preset", ["Custom"] + list(WINDOW_PRESETS),
+                          help="Standard CT windows in Hounsfield units")
+    
+    if preset == "Custom":
+        default_center = int(windowing.to_modality(stats['mean']))
+        default_width = max(1, int(stats['std'] * abs(windowing.slope) * 2))
+        
+        window_center = st.slider("Window Center", low, max(high, low + 1), 
+                                  min(max(default_center, low), high))
+        window_width = st.slider("Window Width", 1, 
+                                 max(default_width, high - low), 
+                                 default_width)
+    else:
+        window_center, window_width = WINDOW_PRESETS[preset]
+        st.caption(f"Center {window_center}, Width {window_width}")
+    
+    pixel_array = get_pixels()
+    
+    if len(pixel_array.shape) == 2:
+        show_image(windowing.apply(pixel_array, window_center, window_width),
+                   f"Windowed Image (C {window_center} / W {window_width})", aspect)
+
 
 st.title("🩺 DICOM Viewer")
 st.markdown("### View and analyze medical imaging files (CT/MRI scans)")
@@ -11,122 +193,151 @@ st.markdown("---")
 
 st.info("📋 **DICOM** (Digital Imaging and Communications in Medicine) is the standard format for medical images")
 
-uploaded_file = st.file_uploader(
-    "Upload a DICOM file (.dcm)",
-    type=['dcm'],
+uploaded_files = st.file_uploader(
+    "Upload a DICOM file (.dcm), several slices of a series, or a zip of a series",
+    type=['dcm', 'zip'],
+    accept_multiple_files=True,
     help="Upload CT, MRI, or other DICOM medical imaging files"
 )
 
+uploaded_file = None
+if len(uploaded_files) == 1 and not uploaded_files[0].name.lower().endswith('.zip'):
+    uploaded_file = uploaded_files[0]
+
 if uploaded_file is not None:
+    from utils.dicom_loader import to_uint8, volume_statistics
+    from utils.image_pyramid import ImagePyramid
+    
     try:
-        dicom_data = pydicom.dcmread(io.BytesIO(uploaded_file.read()))
+        file_hash = upload_digest(uploaded_file)
+        loader = load_dicom(file_hash, uploaded_file)
+        dicom_data = loader.metadata()
         
         st.success("✅ DICOM file loaded successfully!")
         
         col1, col2 = st.columns([2, 1])
         
+        # Metadata is filled in first so it shows while pixel data is still decoding
+        with col2:
+            show_metadata(dicom_data, loader.shape(), loader.dtype(), loader.nbytes())
+        
         with col1:
             st.subheader("🖼️ Image Visualization")
             
-            pixel_array = dicom_data.pixel_array
+            num_frames = loader.number_of_frames()
+            decoder = frame_decoder(file_hash, loader)
             
-            if len(pixel_array.shape) == 2:
-                normalized_image = ((pixel_array - pixel_array.min()) / 
-                                  (pixel_array.max() - pixel_array.min()) * 255).astype(np.uint8)
-                
-                img = Image.fromarray(normalized_image)
-                st.image(img, caption="DICOM Image", use_container_width=True)
-                
-                st.markdown("#### Image Statistics")
-                col_a, col_b, col_c, col_d = st.columns(4)
-                with col_a:
-                    st.metric("Min Pixel Value", f"{pixel_array.min()}")
-                with col_b:
-                    st.metric("Max Pixel Value", f"{pixel_array.max()}")
-                with col_c:
-                    st.metric("Mean", f"{pixel_array.mean():.2f}")
-                with col_d:
-                    st.metric("Std Dev", f"{pixel_array.std():.2f}")
-                
+            if num_frames == 1:
+                slice_idx = 0
             else:
-                st.info(f"ℹ️ Multi-dimensional image with shape: {pixel_array.shape}")
-                
-                if len(pixel_array.shape) == 3:
-                    slice_idx = st.slider("Select Slice", 0, pixel_array.shape[0] - 1, 0)
-                    slice_data = pixel_array[slice_idx]
-                    
-                    normalized_slice = ((slice_data - slice_data.min()) / 
-                                       (slice_data.max() - slice_data.min()) * 255).astype(np.uint8)
-                    
-                    img = Image.fromarray(normalized_slice)
-                    st.image(img, caption=f"Slice {slice_idx}", use_container_width=True)
-        
-        with col2:
-            st.subheader("📊 Metadata")
-            
-            metadata_items = [
-                ("Patient Name", "PatientName"),
-                ("Patient ID", "PatientID"),
-                ("Study Date", "StudyDate"),
-                ("Modality", "Modality"),
-                ("Body Part", "BodyPartExamined"),
-                ("Institution", "InstitutionName"),
-                ("Manufacturer", "Manufacturer"),
-                ("Rows", "Rows"),
-                ("Columns", "Columns"),
-            ]
-            
-            for label, tag in metadata_items:
-                try:
-                    value = getattr(dicom_data, tag, "N/A")
-                    st.text(f"{label}: {value}")
-                except:
-                    st.text(f"{label}: N/A")
+                st.info(f"ℹ️ Multi-frame image with shape: {loader.shape()}")
+                slice_idx = st.slider("Select Slice", 0, num_frames - 1, 0)
             
-            st.markdown("---")
+            pyramid = rendered_slice_cache().get_or_compute(
+                (file_hash, slice_idx), lambda: ImagePyramid(to_uint8(decoder.frame(slice_idx)))
+            )
+            show_pyramid(pyramid, "DICOM Image" if num_frames == 1 else f"Slice {slice_idx}",
+                         IMAGE_VIEWPORT_WIDTH, key="dicom")
             
-            st.subheader("🔍 Image Properties")
-            st.text(f"Shape: {pixel_array.shape}")
-            st.text(f"Data Type: {pixel_array.dtype}")
-            st.text(f"Size: {pixel_array.nbytes / 1024:.2f} KB")
+            # Only the slice on display is decoded; the whole volume on request
+            stats = volume_statistics([decoder.frame(slice_idx)])
+            show_statistics(stats, "Image Statistics" if num_frames == 1 else f"Slice {slice_idx} Statistics")
+            if num_frames > 1:
+                volume_key = f"volume_statistics_{file_hash}"
+                if st.session_state.get(volume_key) or st.button(
+                        "📈 Compute Volume Statistics", help=f"Decodes all {num_frames} frames once"):
+                    st.session_state[volume_key] = True
+                    stats = dicom_statistics(file_hash, decoder)
+                    show_statistics(stats, "Volume Statistics")
         
         st.markdown("---")
         
         with st.expander("📋 Full DICOM Header Information"):
-            st.text(str(dicom_data))
+            show_header_browser(header_index(file_hash, dicom_data), dicom_data, key="header")
         
         with st.expander("🎨 Windowing Controls (Advanced)"):
-            st.markdown("Adjust window level and width for better visualization")
-            
-            default_center = int(pixel_array.mean())
-            default_width = int(pixel_array.std() * 2)
+            show_windowing(dicom_data, stats, lambda: decoder.frame(slice_idx))
+        
+    except Exception as e:
+        st.error(f"❌ Error loading DICOM file: {str(e)}")
+        st.info("💡 Make sure you uploaded a valid DICOM (.dcm) file")
+
+elif uploaded_files:
+    import hashlib
+    from utils.dicom_loader import to_uint8
+    from utils.dicom_series import PLANES, reformat, plane_size
+    from utils.image_pyramid import ImagePyramid
+    
+    try:
+        files_hash = hashlib.blake2b(
+            "".join(sorted(upload_digest(f) for f in uploaded_files)).encode(), digest_size=16
+        ).hexdigest()
+        series_list, multi_frame = load_series(files_hash, uploaded_files)
+        
+        if multi_frame:
+            st.warning(f"⚠️ Skipped {len(multi_frame)} multi-frame file(s), which cannot be stacked into a "
+                       f"series: {', '.join(multi_frame)}. Upload each of them on its own to view it.")
+        
+        if not series_list:
+            st.error("❌ No single-frame DICOM slices found in the uploaded files")
+            st.stop()
+        
+        series = series_list[0]
+        if len(series_list) > 1:
+            descriptions = [s.description() for s in series_list]
+            series = series_list[st.selectbox("Series", range(len(series_list)),
+                                              format_func=lambda i: descriptions[i])]
+        
+        dicom_data = series.metadata()
+        volume_result = load_series_volume(files_hash, series.uid, series)
+        volume = volume_result['volume']
+        
+        st.success(f"✅ Loaded {series.description()} in {volume_result['load_time']:.2f}s "
+                   f"using {volume_result['workers']} workers")
+        
+        col1, col2 = st.columns([2, 1])
+        
+        with col2:
+            show_metadata(dicom_data, volume.shape, volume.dtype, volume.nbytes)
+            slice_spacing, row_spacing, column_spacing = series.spacing()
+            st.text(f"Spacing: {slice_spacing:.2f} x {row_spacing:.2f} x {column_spacing:.2f} mm")
+        
+        with col1:
+            st.subheader("🖼️ Multi-Planar Reformat")
             
-            window_center = st.slider("Window Center", 
-                                      int(pixel_array.min()), 
-                                      int(pixel_array.max()), 
-                                      default_center)
-            window_width = st.slider("Window Width", 1, 
-                                     int(pixel_array.max() - pixel_array.min()), 
-                                     default_width)
+            plane = st.radio("Plane", PLANES, horizontal=True)
+            count = plane_size(volume, plane)
+            slice_idx = st.slider("Select Slice", 0, count - 1, count // 2)
+            aspect = series.plane_aspect(plane)
             
-            min_val = window_center - window_width // 2
-            max_val = window_center + window_width // 2
+            pyramid = rendered_slice_cache().get_or_compute(
+                (files_hash, series.uid, plane, slice_idx),
+                lambda: ImagePyramid(to_uint8(reformat(volume, plane, slice_idx)))
+            )
+            show_pyramid(pyramid, f"{plane} slice {slice_idx}", IMAGE_VIEWPORT_WIDTH, aspect, key="series")
             
-            if len(pixel_array.shape) == 2:
-                windowed = np.clip(pixel_array, min_val, max_val)
-                windowed_normalized = ((windowed - min_val) / (max_val - min_val) * 255).astype(np.uint8)
-                windowed_img = Image.fromarray(windowed_normalized)
-                st.image(windowed_img, caption="Windowed Image", use_container_width=True)
+            stats = series_statistics(files_hash, series.uid, volume)
+            show_statistics(stats, "Volume Statistics")
+        
+        st.markdown("---")
+        
+        with st.expander("📋 Full DICOM Header Information (first slice)"):
+            show_header_browser(header_index(f"{files_hash}:{series.uid}", dicom_data), dicom_data,
+                                key="series_header")
+        
+        with st.expander("🎨 Windowing Controls (Advanced)"):
+            show_windowing(dicom_data, stats, lambda: reformat(volume, plane, slice_idx), aspect,
+                           series.windowing())
         
     except Exception as e:
-        st.error(f"❌ Error loading DICOM file: {str(e)}")
-        st.info("💡 Make sure you uploaded a valid DICOM (.dcm) file")
+        st.error(f"❌ Error loading DICOM series: {str(e)}")
+        st.info("💡 Upload the .dcm slices of one series, or a zip containing them")
 
 else:
     st.markdown("""
     ### 📝 Instructions
     
-    1. **Upload a DICOM file** using the file uploader above
+    1. **Upload a DICOM file**, the slices of a series, or a zip of a series using the file uploader above
     2. **View the medical image** with automatic normalization
     3. **Inspect metadata** including patient info, study details, and imaging parameters
     4. **Use windowing controls** to adjust image contrast and brightness
@@ -140,8 +351,9 @@ else:
     - ✅ MRI (Magnetic Resonance Imaging) scans  
     - ✅ X-Ray images
     - ✅ Multi-slice volume data
+    - ✅ Multi-file series with axial, coronal and sagittal reformats
     - ✅ Metadata extraction
-    - ✅ Window level/width adjustment
+    - ✅ Window level/width adjustment with CT presets (lung, bone, brain, ...)
     
     ---
     
@@ -1,13 +1,128 @@
 import streamlit as st
 import os
 import sys
-from io import BytesIO
-from PIL import Image
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from utils.dna_encryption import DNAEncryption, AES256DNAEncryption
-from utils.lsb_steganography import LSBSteganography
-from utils.metrics import ImageMetrics
+from utils.display import (upload_digest, decoded_upload, upload_pyramid, show_pyramid, encoded_result_image,
+                           session_id, show_trace, job_queue, job_status)
+from utils.jobs import QueueFull, DONE, FAILED
+from utils.pipeline import encrypt_embed
+from utils import tracing
+
+PREVIEW_WIDTH = 800
+COMPARISON_WIDTH = 512
+
+
+def show_result(job_id, result, use_aes, cover_pyramid):
+    encryption_result = result['encryption']
+    embedding_result = result['embedding']
+    stego_image = embedding_result['stego_image']
+    psnr, ssim = result['psnr'], result['ssim']
+    
+    with st.expander("🔬 DNA Encryption Process", expanded=True):
+        if use_aes:
+            st.success(f"🔐 AES-256 + DNA encryption applied")
+            st.code(f"Encryption Key (Base64): {result['key']}", language="text")
+            st.warning("⚠️ **IMPORTANT**: Save this key! You'll need it for decryption.")
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Original Length", f"{encryption_result['original_length']} chars")
+        with col2:
+            st.metric("Binary Length", f"{encryption_result['binary_length']} bits")
+        with col3:
+            st.metric("DNA Length", f"{encryption_result['dna_length']} bases")
+        
+        if 'encrypted_dna' in encryption_result:
+            st.code(encryption_result['encrypted_dna'][:200] + "..." if len(encryption_result['encrypted_dna']) > 200 else encryption_result['encrypted_dna'])
+        else:
+            st.caption("The DNA sequence is not kept for results reused from disk.")
+        st.caption(f"⏱️ Encryption time: {encryption_result['encryption_time']:.4f} seconds")
+    
+    with st.expander("🖼️ LSB Steganography Process", expanded=True):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Payload Size", f"{embedding_result['payload_size']} chars")
+        with col2:
+            st.metric("Binary Size", f"{embedding_result['binary_size']} bits")
+        with col3:
+            st.metric("Embedding Time", f"{embedding_result['embedding_time']:.4f}s")
+        
+        st.success(f"✅ Data successfully embedded into image of size {embedding_result['image_size']}")
+    
+    with st.expander("📊 Quality Analysis", expanded=True):
+        if psnr is not None and ssim is not None:
+            col1, col2 = st.columns(2)
+            with col1:
+                st.metric("PSNR", f"{psnr:.2f} dB", help="Higher is better (>40 dB is excellent)")
+            with col2:
+                st.metric("SSIM", f"{ssim:.4f}", help="Closer to 1.0 is better")
+            
+            if psnr > 40:
+                st.success("✅ Excellent image quality maintained!")
+            elif psnr > 30:
+                st.info("ℹ️ Good image quality")
+            else:
+                st.warning("⚠️ Image quality may be noticeably degraded")
+        else:
+            st.warning("⚠️ Could not calculate quality metrics")
+    
+    st.markdown("---")
+    st.subheader("🔍 Image Quality Comparison")
+    
+    diff_stats = result['diff_stats']
+    heatmap_image = result['heatmap']
+    
+    if diff_stats:
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Total Pixels", f"{diff_stats['total_pixels']:,}")
+        with col2:
+            st.metric("Changed Pixels", f"{diff_stats['changed_pixels']:,}")
+        with col3:
+            st.metric("Change %", f"{diff_stats['change_percentage']:.4f}%")
+        with col4:
+            st.metric("Max Diff", f"{diff_stats['max_difference']:.2f}")
+    
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        if cover_pyramid is not None:
+            show_pyramid(cover_pyramid, "Original Cover Image", COMPARISON_WIDTH)
+        else:
+            st.info("Upload the cover image again to compare it")
+    
+    with col2:
+        st.image(encoded_result_image(job_id, 'stego', COMPARISON_WIDTH, 'JPEG', stego_image),
+                 caption="Stego-Image (with hidden data)", use_container_width=True)
+    
+    with col3:
+        if heatmap_image:
+            st.image(encoded_result_image(job_id, 'heatmap', heatmap_image.width, 'PNG', heatmap_image),
+                     caption="Pixel Difference Heatmap", use_container_width=True)
+        else:
+            st.warning("Could not generate heatmap")
+    
+    st.markdown("---")
+    st.subheader("📥 Download Stego-Image")
+    
+    st.download_button(
+        label="💾 Download Stego-Image",
+        data=result['png'],
+        file_name="stego_image.png",
+        mime="image/png",
+        type="primary",
+        use_container_width=True
+    )
+    
+    st.success("✅ Encryption and embedding completed successfully!")
+    if result['cached']:
+        st.info("♻️ Same cover image, message and key as an earlier request: its result was reused. "
+                "The timings shown are from that run.")
+    
+    if result['trace'] is not None:
+        show_trace(result['trace'], "encrypt_embed_trace.json")
+
 
 st.title("🔐 Encrypt & Embed")
 st.markdown("### Secure your medical data using DNA encryption and LSB steganography")
@@ -56,7 +171,8 @@ with col1:
     )
     
     if cover_image:
-        st.image(cover_image, caption="Cover Image", use_container_width=True)
+        cover_pyramid = upload_pyramid(upload_digest(cover_image), cover_image)
+        show_pyramid(cover_pyramid, "Cover Image", PREVIEW_WIDTH, key="cover")
 
 with col2:
     st.subheader("🔄 Processing Pipeline")
@@ -88,6 +204,14 @@ with col2:
 
 st.markdown("---")
 
+col_trace, col_memory = st.columns(2)
+with col_trace:
+    record_trace = st.checkbox("🧭 Record performance trace", value=tracing.TRACE_BY_DEFAULT,
+                               help="Time every stage of the run and offer it as Chrome trace-event JSON")
+with col_memory:
+    track_memory = st.checkbox("💾 Track peak memory", value=tracing.TRACE_MEMORY_BY_DEFAULT,
+                               help="Record the tracemalloc peak and NumPy buffer sizes of each stage (slows the run)")
+
 if st.button("🚀 Encrypt and Embed", type="primary", use_container_width=True):
     if not secret_message:
         st.error("❌ Please enter a secret message")
@@ -96,160 +220,41 @@ if st.button("🚀 Encrypt and Embed", type="primary", use_container_width=True)
     elif use_aes and not encryption_key:
         st.error("❌ Please provide an encryption key or generate one")
     else:
-        with st.spinner("Processing encryption and embedding..."):
-            temp_cover_path = None
-            temp_stego_path = None
+        try:
+            decoded_key = None
+            if use_aes:
+                import base64
+                decoded_key = base64.b64decode(encryption_key)
+        except Exception:
+            st.error(f"❌ Invalid Base64 key format. Please check your key or generate a new one.")
+        else:
+            previous = st.session_state.get('encrypt_job')
+            if previous is not None:
+                previous_job = job_queue().get(previous['id'])
+                if previous_job is not None and not previous_job.finished:
+                    previous_job.cancel()
             try:
-                if use_aes:
-                    import base64
-                    try:
-                        decoded_key = base64.b64decode(encryption_key) if encryption_key else None
-                        dna_enc = AES256DNAEncryption(key=decoded_key)
-                        actual_key = dna_enc.get_key_base64()
-                    except Exception as e:
-                        st.error(f"❌ Invalid Base64 key format. Please check your key or generate a new one.")
-                        raise
-                else:
-                    dna_enc = DNAEncryption()
-                    actual_key = None
-                
-                lsb_steg = LSBSteganography()
-                
-                with st.expander("🔬 DNA Encryption Process", expanded=True):
-                    if use_aes:
-                        encryption_result = dna_enc.encrypt(secret_message, use_aes=True)
-                        st.success(f"🔐 AES-256 + DNA encryption applied")
-                        st.code(f"Encryption Key (Base64): {actual_key}", language="text")
-                        st.warning("⚠️ **IMPORTANT**: Save this key! You'll need it for decryption.")
-                    else:
-                        encryption_result = dna_enc.encrypt(secret_message)
-                    
-                    col1, col2, col3 = st.columns(3)
-                    with col1:
-                        st.metric("Original Length", f"{encryption_result['original_length']} chars")
-                    with col2:
-                        st.metric("Binary Length", f"{encryption_result['binary_length']} bits")
-                    with col3:
-                        st.metric("DNA Length", f"{encryption_result['dna_length']} bases")
-                    
-                    st.code(encryption_result['encrypted_dna'][:200] + "..." if len(encryption_result['encrypted_dna']) > 200 else encryption_result['encrypted_dna'])
-                    st.caption(f"⏱️ Encryption time: {encryption_result['encryption_time']:.4f} seconds")
-                
-                temp_cover_path = "temp_cover.png"
-                Image.open(cover_image).save(temp_cover_path)
-                
-                with st.expander("🖼️ LSB Steganography Process", expanded=True):
-                    embedding_result = lsb_steg.embed(temp_cover_path, encryption_result['encrypted_dna'])
-                    
-                    col1, col2, col3 = st.columns(3)
-                    with col1:
-                        st.metric("Payload Size", f"{embedding_result['payload_size']} chars")
-                    with col2:
-                        st.metric("Binary Size", f"{embedding_result['binary_size']} bits")
-                    with col3:
-                        st.metric("Embedding Time", f"{embedding_result['embedding_time']:.4f}s")
-                    
-                    st.success(f"✅ Data successfully embedded into image of size {embedding_result['image_size']}")
-                
-                stego_image = embedding_result['stego_image']
-                temp_stego_path = "temp_stego.png"
-                stego_image.save(temp_stego_path)
-                
-                with st.expander("📊 Quality Analysis", expanded=True):
-                    psnr = ImageMetrics.calculate_psnr(temp_cover_path, temp_stego_path)
-                    ssim = ImageMetrics.calculate_ssim(temp_cover_path, temp_stego_path)
-                    
-                    if psnr is not None and ssim is not None:
-                        col1, col2 = st.columns(2)
-                        with col1:
-                            st.metric("PSNR", f"{psnr:.2f} dB", help="Higher is better (>40 dB is excellent)")
-                        with col2:
-                            st.metric("SSIM", f"{ssim:.4f}", help="Closer to 1.0 is better")
-                        
-                        if psnr > 40:
-                            st.success("✅ Excellent image quality maintained!")
-                        elif psnr > 30:
-                            st.info("ℹ️ Good image quality")
-                        else:
-                            st.warning("⚠️ Image quality may be noticeably degraded")
-                    else:
-                        st.warning("⚠️ Could not calculate quality metrics")
-                
-                st.markdown("---")
-                st.subheader("🔍 Image Quality Comparison")
-                
-                diff_stats = ImageMetrics.calculate_difference_stats(temp_cover_path, temp_stego_path)
-                heatmap_image = ImageMetrics.create_difference_heatmap(temp_cover_path, temp_stego_path)
-                
-                if diff_stats:
-                    col1, col2, col3, col4 = st.columns(4)
-                    with col1:
-                        st.metric("Total Pixels", f"{diff_stats['total_pixels']:,}")
-                    with col2:
-                        st.metric("Changed Pixels", f"{diff_stats['changed_pixels']:,}")
-                    with col3:
-                        st.metric("Change %", f"{diff_stats['change_percentage']:.4f}%")
-                    with col4:
-                        st.metric("Max Diff", f"{diff_stats['max_difference']:.2f}")
-                
-                col1, col2, col3 = st.columns(3)
-                
-                with col1:
-                    st.image(cover_image, caption="Original Cover Image", use_container_width=True)
-                
-                with col2:
-                    st.image(stego_image, caption="Stego-Image (with hidden data)", use_container_width=True)
-                
-                with col3:
-                    if heatmap_image:
-                        st.image(heatmap_image, caption="Pixel Difference Heatmap", use_container_width=True)
-                    else:
-                        st.warning("Could not generate heatmap")
-                
-                st.markdown("---")
-                st.subheader("📥 Download Stego-Image")
-                
-                buf = BytesIO()
-                stego_image.save(buf, format='PNG')
-                byte_im = buf.getvalue()
-                
-                st.download_button(
-                    label="💾 Download Stego-Image",
-                    data=byte_im,
-                    file_name="stego_image.png",
-                    mime="image/png",
-                    type="primary",
-                    use_container_width=True
-                )
-                
-                if 'encryption_history' not in st.session_state:
-                    st.session_state.encryption_history = []
-                
-                st.session_state.encryption_history.append({
-                    'message_length': len(secret_message),
-                    'encryption_time': encryption_result['encryption_time'],
-                    'embedding_time': embedding_result['embedding_time'],
-                    'psnr': psnr if psnr else 0,
-                    'ssim': ssim if ssim else 0,
-                    'dna_length': encryption_result['dna_length'],
-                    'used_aes': use_aes
-                })
-                
-                st.success("✅ Encryption and embedding completed successfully!")
-                
-            except Exception as e:
-                st.error(f"❌ Error during processing: {str(e)}")
-            finally:
-                if temp_cover_path and os.path.exists(temp_cover_path):
-                    try:
-                        os.remove(temp_cover_path)
-                    except:
-                        pass
-                if temp_stego_path and os.path.exists(temp_stego_path):
-                    try:
-                        os.remove(temp_stego_path)
-                    except:
-                        pass
+                job = job_queue().submit('encrypt_embed', encrypt_embed, secret_message,
+                                         decoded_upload(upload_digest(cover_image), cover_image),
+                                         use_aes, decoded_key, record_trace, track_memory,
+                                         session=session_id())
+                st.session_state.encrypt_job = {'id': job.id, 'use_aes': use_aes,
+                                                 'cover_digest': upload_digest(cover_image)}
+            except QueueFull as e:
+                st.error(f"❌ The server is busy: {e}")
+
+submitted = st.session_state.get('encrypt_job')
+job = job_queue().get(submitted['id']) if submitted else None
+if job is not None:
+    if not job.finished:
+        job_status(job.id)
+    elif job.state == DONE:
+        same_cover = cover_image is not None and upload_digest(cover_image) == submitted['cover_digest']
+        show_result(job.id, job.result, submitted['use_aes'], cover_pyramid if same_cover else None)
+    elif job.state == FAILED:
+        st.error(f"❌ Error during processing: {job.error}")
+    else:
+        st.warning("⚠️ Encryption and embedding was cancelled")
 
 st.markdown("---")
 st.info("💡 **Tip**: Use high-quality images with sufficient resolution for better steganography results. The image should have enough pixels to accommodate your message.")
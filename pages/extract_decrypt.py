@@ -1,11 +1,72 @@
 import streamlit as st
 import os
 import sys
-from PIL import Image
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from utils.dna_encryption import DNAEncryption, AES256DNAEncryption
-from utils.lsb_steganography import LSBSteganography
+from utils.display import upload_digest, decoded_upload, upload_pyramid, show_pyramid, session_id, show_trace, job_queue, job_status
+from utils.jobs import QueueFull, DONE, FAILED
+from utils.pipeline import extract_decrypt
+from utils import tracing
+
+PREVIEW_WIDTH = 800
+
+
+def show_result(result):
+    extraction_result = result['extraction']
+    decryption_result = result['decryption']
+    
+    with st.expander("🖼️ LSB Extraction Process", expanded=True):
+        col1, col2 = st.columns(2)
+        with col1:
+            st.metric("Extraction Time", f"{extraction_result['extraction_time']:.4f}s")
+        with col2:
+            st.metric("Binary Length", f"{extraction_result['binary_length']} bits")
+        
+        extracted_dna = extraction_result['extracted_data']
+        st.code(extracted_dna[:200] + "..." if len(extracted_dna) > 200 else extracted_dna)
+        st.success(f"✅ Extracted {len(extracted_dna)} DNA bases from image")
+    
+    with st.expander("🔬 DNA Decryption Process", expanded=True):
+        st.success("✅ AES-256 + DNA decryption completed successfully" if result['used_aes']
+                   else "✅ DNA decryption completed successfully")
+        st.metric("Decryption Time", f"{decryption_result['decryption_time']:.4f}s")
+    
+    st.markdown("---")
+    st.subheader("📄 Decrypted Message")
+    
+    decrypted_text = decryption_result['decrypted_text']
+    
+    st.text_area(
+        "Original Secret Message:",
+        value=decrypted_text,
+        height=200,
+        disabled=True
+    )
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Message Length", f"{len(decrypted_text)} characters")
+    with col2:
+        st.metric("Total Extraction Time", f"{extraction_result['extraction_time']:.4f}s")
+    with col3:
+        st.metric("Total Decryption Time", f"{decryption_result['decryption_time']:.4f}s")
+    
+    st.info(f"⏱️ Total processing time: {result['total_time']:.4f} seconds")
+    
+    st.success("✅ Extraction and decryption completed successfully!")
+    
+    st.markdown("---")
+    st.download_button(
+        label="💾 Download Decrypted Message",
+        data=decrypted_text,
+        file_name="decrypted_message.txt",
+        mime="text/plain",
+        use_container_width=True
+    )
+    
+    if result['trace'] is not None:
+        show_trace(result['trace'], "extract_decrypt_trace.json")
+
 
 st.title("🔓 Extract & Decrypt")
 st.markdown("### Extract hidden data from stego-images and decrypt using DNA cipher")
@@ -23,7 +84,7 @@ with col1:
     )
     
     if stego_image:
-        st.image(stego_image, caption="Stego-Image", use_container_width=True)
+        show_pyramid(upload_pyramid(upload_digest(stego_image), stego_image), "Stego-Image", PREVIEW_WIDTH, key="stego")
     
     st.subheader("🔒 Step 2: Decryption Options")
     uses_aes = st.checkbox("🛡️ Image uses AES-256 Encryption", value=False,
@@ -68,107 +129,50 @@ with col2:
 
 st.markdown("---")
 
+col_trace, col_memory = st.columns(2)
+with col_trace:
+    record_trace = st.checkbox("🧭 Record performance trace", value=tracing.TRACE_BY_DEFAULT,
+                               help="Time every stage of the run and offer it as Chrome trace-event JSON")
+with col_memory:
+    track_memory = st.checkbox("💾 Track peak memory", value=tracing.TRACE_MEMORY_BY_DEFAULT,
+                               help="Record the tracemalloc peak and NumPy buffer sizes of each stage (slows the run)")
+
 if st.button("🔍 Extract and Decrypt", type="primary", use_container_width=True):
     if not stego_image:
         st.error("❌ Please upload a stego-image")
     elif uses_aes and not decryption_key:
         st.error("❌ Please provide the decryption key")
     else:
-        with st.spinner("Extracting and decrypting data..."):
-            temp_stego_path = None
+        try:
+            decoded_key = None
+            if uses_aes:
+                import base64
+                decoded_key = base64.b64decode(decryption_key)
+        except Exception:
+            st.error(f"❌ Invalid Base64 key format. Please check your decryption key.")
+        else:
+            previous = job_queue().get(st.session_state.get('extract_job'))
+            if previous is not None and not previous.finished:
+                previous.cancel()
             try:
-                lsb_steg = LSBSteganography()
-                
-                if uses_aes:
-                    import base64
-                    try:
-                        decoded_key = base64.b64decode(decryption_key)
-                        dna_enc = AES256DNAEncryption(key=decoded_key)
-                    except Exception as e:
-                        st.error(f"❌ Invalid Base64 key format. Please check your decryption key.")
-                        raise
-                else:
-                    dna_enc = DNAEncryption()
-                
-                temp_stego_path = "temp_stego_extract.png"
-                Image.open(stego_image).save(temp_stego_path)
-                
-                with st.expander("🖼️ LSB Extraction Process", expanded=True):
-                    extraction_result = lsb_steg.extract(temp_stego_path)
-                    
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        st.metric("Extraction Time", f"{extraction_result['extraction_time']:.4f}s")
-                    with col2:
-                        st.metric("Binary Length", f"{extraction_result['binary_length']} bits")
-                    
-                    extracted_dna = extraction_result['extracted_data']
-                    st.code(extracted_dna[:200] + "..." if len(extracted_dna) > 200 else extracted_dna)
-                    st.success(f"✅ Extracted {len(extracted_dna)} DNA bases from image")
-                
-                with st.expander("🔬 DNA Decryption Process", expanded=True):
-                    if uses_aes:
-                        decryption_result = dna_enc.decrypt(extracted_dna, use_aes=True)
-                        st.success("✅ AES-256 + DNA decryption completed successfully")
-                    else:
-                        decryption_result = dna_enc.decrypt(extracted_dna)
-                        st.success("✅ DNA decryption completed successfully")
-                    
-                    st.metric("Decryption Time", f"{decryption_result['decryption_time']:.4f}s")
-                
-                st.markdown("---")
-                st.subheader("📄 Decrypted Message")
-                
-                decrypted_text = decryption_result['decrypted_text']
-                
-                st.text_area(
-                    "Original Secret Message:",
-                    value=decrypted_text,
-                    height=200,
-                    disabled=True
-                )
-                
-                col1, col2, col3 = st.columns(3)
-                with col1:
-                    st.metric("Message Length", f"{len(decrypted_text)} characters")
-                with col2:
-                    st.metric("Total Extraction Time", f"{extraction_result['extraction_time']:.4f}s")
-                with col3:
-                    st.metric("Total Decryption Time", f"{decryption_result['decryption_time']:.4f}s")
-                
-                total_time = extraction_result['extraction_time'] + decryption_result['decryption_time']
-                st.info(f"⏱️ Total processing time: {total_time:.4f} seconds")
-                
-                if 'decryption_history' not in st.session_state:
-                    st.session_state.decryption_history = []
-                
-                st.session_state.decryption_history.append({
-                    'message_length': len(decrypted_text),
-                    'extraction_time': extraction_result['extraction_time'],
-                    'decryption_time': decryption_result['decryption_time'],
-                    'total_time': total_time
-                })
-                
-                st.success("✅ Extraction and decryption completed successfully!")
-                
-                st.markdown("---")
-                st.download_button(
-                    label="💾 Download Decrypted Message",
-                    data=decrypted_text,
-                    file_name="decrypted_message.txt",
-                    mime="text/plain",
-                    use_container_width=True
-                )
-                
-            except Exception as e:
-                st.error(f"❌ Error during extraction/decryption: {str(e)}")
-                st.info("💡 Make sure you uploaded a valid stego-image created by this system")
-            finally:
-                if temp_stego_path and os.path.exists(temp_stego_path):
-                    try:
-                        os.remove(temp_stego_path)
-                    except:
-                        pass
+                job = job_queue().submit('extract_decrypt', extract_decrypt,
+                                         decoded_upload(upload_digest(stego_image), stego_image), uses_aes,
+                                         decoded_key, record_trace, track_memory, session=session_id())
+                st.session_state.extract_job = job.id
+            except QueueFull as e:
+                st.error(f"❌ The server is busy: {e}")
+
+job = job_queue().get(st.session_state.get('extract_job'))
+if job is not None:
+    if not job.finished:
+        job_status(job.id)
+    elif job.state == DONE:
+        show_result(job.result)
+    elif job.state == FAILED:
+        st.error(f"❌ Error during extraction/decryption: {job.error}")
+        st.info("💡 Make sure you uploaded a valid stego-image created by this system")
+    else:
+        st.warning("⚠️ Extraction and decryption was cancelled")
 
 st.markdown("---")
 st.info("💡 **Tip**: The extraction process will automatically stop when it finds the end marker, ensuring accurate data retrieval.")
@@ -0,0 +1,338 @@
+"""Stand-alone HTTP exchange service for partner hospital systems.
+
+    python -m service --port 8600 --workers 4
+    python main.py service --port 8600
+
+Endpoints (JSON bodies; images are Base64-encoded PNG/JPEG/BMP bytes):
+
+    POST /send     {"message": "...", "cover": "<b64>", "aes": true, "key": "<b64, optional>"}
+                   -> {"stego": "<b64 PNG>", "key": "<b64 or null>", "psnr": ..., timings}
+    POST /receive  {"stego": "<b64>", "aes": true, "key": "<b64>"}
+                   -> {"message": "...", timings}
+    GET  /health   -> queue and latency statistics
+
+Encryption and embedding run on a process pool. At most `workers +
+max_queue` requests are admitted at once; beyond that the service answers
+503 with Retry-After instead of queueing without bound. Bodies larger than
+--max-body-mb are refused with 413 before they are read.
+
+Requests are not written to the metrics database: its rollups are cached
+by the one process that writes them, which is the Streamlit app.
+"""
+import io
+import os
+import sys
+import json
+import time
+import base64
+import signal
+import asyncio
+import argparse
+import binascii
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image, UnidentifiedImageError
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.streaming_stats import RunningStats
+
+DEFAULT_PORT = 8600
+DEFAULT_MAX_QUEUE = 32
+DEFAULT_MAX_BODY_MB = 32
+MAX_HEADER_BYTES = 16 * 1024
+HEADER_TIMEOUT = 10.0
+BODY_TIMEOUT = 60.0
+RETRY_AFTER_SECONDS = 1
+# Worker errors caused by the request's content rather than by the service:
+# covers too small, unreadable or oversized images, wrong keys, non-stego inputs
+INPUT_ERRORS = (ValueError, KeyError, OSError, UnidentifiedImageError, Image.DecompressionBombError)
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           408: 'Request Timeout', 411: 'Length Required', 413: 'Payload Too Large',
+           422: 'Unprocessable Entity', 500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+def warm_worker():
+    # Imported once per worker process instead of on its first request
+    import utils.pipeline  # noqa: F401
+
+
+def send_work(message, cover_bytes, use_aes, key):
+    """Encrypt and embed in a worker process; returns the stego PNG bytes and timings."""
+    import numpy as np
+    from PIL import Image
+    from utils.lsb_steganography import LSBSteganography
+    from utils.tiled_metrics import TiledImageMetrics
+    from utils.pipeline import make_cipher
+
+    start = time.perf_counter()
+    cipher = make_cipher(use_aes, key)
+    encryption = cipher.encrypt(message, use_aes=True) if use_aes else cipher.encrypt(message)
+    embedding = LSBSteganography().embed(io.BytesIO(cover_bytes), encryption['encrypted_dna'])
+
+    buf = io.BytesIO()
+    embedding['stego_image'].save(buf, format='PNG')
+    cover = np.asarray(Image.open(io.BytesIO(cover_bytes)).convert('RGB'))
+    psnr = TiledImageMetrics().psnr(cover, np.asarray(embedding['stego_image']))
+
+    return {
+        'stego': buf.getvalue(),
+        'key': cipher.get_key_base64() if use_aes else None,
+        'psnr': psnr if psnr != float('inf') else None,
+        'image_size': list(embedding['image_size']),
+        'dna_length': encryption['dna_length'],
+        'encryption_time': encryption['encryption_time'],
+        'embedding_time': embedding['embedding_time'],
+        'work_time': time.perf_counter() - start
+    }
+
+
+def receive_work(stego_bytes, use_aes, key):
+    """Extract and decrypt in a worker process."""
+    from utils.lsb_steganography import LSBSteganography
+    from utils.pipeline import make_cipher
+
+    start = time.perf_counter()
+    extraction = LSBSteganography().extract(io.BytesIO(stego_bytes))
+    cipher = make_cipher(use_aes, key)
+    decryption = cipher.decrypt(extraction['extracted_data'], use_aes=True) if use_aes \
+        else cipher.decrypt(extraction['extracted_data'])
+
+    return {
+        'message': decryption['decrypted_text'],
+        'extraction_time': extraction['extraction_time'],
+        'decryption_time': decryption['decryption_time'],
+        'work_time': time.perf_counter() - start
+    }
+
+
+def decode_field(body, field, required=True):
+    value = body.get(field)
+    if value is None:
+        if required:
+            raise HTTPError(400, f"Missing field: {field}")
+        return None
+    try:
+        return base64.b64decode(value, validate=True)
+    except (binascii.Error, TypeError, ValueError):
+        raise HTTPError(400, f"Field {field} is not valid Base64")
+
+
+def aes_options(body):
+    use_aes = bool(body.get('aes', False))
+    key = decode_field(body, 'key', required=False) if use_aes else None
+    if key is not None and len(key) != 32:
+        raise HTTPError(400, "AES key must decode to 32 bytes")
+    return use_aes, key
+
+
+class ExchangeService:
+    def __init__(self, workers=None, max_queue=DEFAULT_MAX_QUEUE, max_body_bytes=DEFAULT_MAX_BODY_MB * 1024 * 1024):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.max_body_bytes = max_body_bytes
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=warm_worker)
+        self.in_flight = 0
+        self.started = time.time()
+        self.counts = {}
+        self.latency = {'send': RunningStats(), 'receive': RunningStats()}
+        self.wait = RunningStats()
+
+    @property
+    def capacity(self):
+        return self.workers + self.max_queue
+
+    async def offload(self, func, *args):
+        # Admission happens before any work is queued, so an overloaded
+        # service answers 503 immediately instead of timing out later
+        if self.in_flight >= self.capacity:
+            raise HTTPError(503, "Service overloaded; retry later",
+                            headers={'Retry-After': str(RETRY_AFTER_SECONDS)})
+        self.in_flight += 1
+        submitted = time.perf_counter()
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self.pool, func, *args)
+        except INPUT_ERRORS as e:
+            raise HTTPError(422, f"{type(e).__name__}: {e}")
+        finally:
+            self.in_flight -= 1
+        self.wait.add(time.perf_counter() - submitted - result['work_time'])
+        return result
+
+    async def send(self, body):
+        message = body.get('message')
+        if not isinstance(message, str) or not message:
+            raise HTTPError(400, "Field message must be a non-empty string")
+        cover = decode_field(body, 'cover')
+        use_aes, key = aes_options(body)
+        result = await self.offload(send_work, message, cover, use_aes, key)
+        result['stego'] = base64.b64encode(result['stego']).decode('ascii')
+        return result
+
+    async def receive(self, body):
+        stego = decode_field(body, 'stego')
+        use_aes, key = aes_options(body)
+        if use_aes and key is None:
+            raise HTTPError(400, "Field key is required when aes is true")
+        return await self.offload(receive_work, stego, use_aes, key)
+
+    def health(self):
+        return {
+            'status': 'ok',
+            'uptime': time.time() - self.started,
+            'workers': self.workers,
+            'in_flight': self.in_flight,
+            'capacity': self.capacity,
+            'responses': self.counts,
+            'latency': {name: stats.summary() for name, stats in self.latency.items()},
+            'queue_wait': self.wait.summary()
+        }
+
+    async def dispatch(self, method, path, body):
+        routes = {'/send': ('POST', self.send), '/receive': ('POST', self.receive)}
+        if path == '/health':
+            if method != 'GET':
+                raise HTTPError(405, "Use GET")
+            return self.health()
+        if path not in routes:
+            raise HTTPError(404, f"No endpoint {path}")
+        expected, handler = routes[path]
+        if method != expected:
+            raise HTTPError(405, f"Use {expected}")
+        try:
+            payload = json.loads(body)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            raise HTTPError(400, "Body must be JSON")
+        if not isinstance(payload, dict):
+            raise HTTPError(400, "Body must be a JSON object")
+        return await handler(payload)
+
+    async def read_request(self, reader):
+        """(method, path, headers, body) of the next request, or None once the client closes."""
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), HEADER_TIMEOUT)
+        except asyncio.IncompleteReadError:
+            return None
+        except asyncio.LimitOverrunError:
+            raise HTTPError(413, "Request headers too large")
+        except asyncio.TimeoutError:
+            raise HTTPError(408, "Timed out reading request headers")
+
+        lines = head.decode('latin-1').split('\r\n')
+        try:
+            method, target, _ = lines[0].split(' ', 2)
+        except ValueError:
+            raise HTTPError(400, "Malformed request line")
+        headers = {}
+        for line in lines[1:]:
+            if ':' in line:
+                name, value = line.split(':', 1)
+                headers[name.strip().lower()] = value.strip()
+
+        body = b''
+        if method in ('POST', 'PUT'):
+            if 'content-length' not in headers:
+                raise HTTPError(411, "Content-Length is required")
+            try:
+                length = int(headers['content-length'])
+            except ValueError:
+                raise HTTPError(400, "Invalid Content-Length")
+            if length > self.max_body_bytes:
+                raise HTTPError(413, f"Body exceeds {self.max_body_bytes} bytes")
+            try:
+                body = await asyncio.wait_for(reader.readexactly(length), BODY_TIMEOUT)
+            except (asyncio.IncompleteReadError, asyncio.TimeoutError):
+                raise HTTPError(408, "Timed out reading request body")
+        return method, target.split('?', 1)[0], headers, body
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                keep_alive = True
+                start = time.perf_counter()
+                endpoint = None
+                extra_headers = {}
+                try:
+                    request = await self.read_request(reader)
+                    if request is None:
+                        break
+                    method, path, headers, body = request
+                    endpoint = path.strip('/')
+                    keep_alive = headers.get('connection', '').lower() != 'close'
+                    status, payload = 200, await self.dispatch(method, path, body)
+                except HTTPError as e:
+                    status, payload, extra_headers = e.status, {'error': str(e)}, e.headers
+                    # The rest of an unread or oversized request cannot be skipped reliably
+                    keep_alive = keep_alive and e.status not in (400, 408, 411, 413)
+                except Exception as e:
+                    status, payload = 500, {'error': f"{type(e).__name__}: {e}"}
+
+                self.counts[status] = self.counts.get(status, 0) + 1
+                if status == 200 and endpoint in self.latency:
+                    self.latency[endpoint].add(time.perf_counter() - start)
+                await self.write_response(writer, status, payload, keep_alive, extra_headers)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def write_response(writer, status, payload, keep_alive, extra_headers):
+        body = json.dumps(payload).encode('utf-8')
+        headers = {'Content-Type': 'application/json', 'Content-Length': str(len(body)),
+                   'Connection': 'keep-alive' if keep_alive else 'close', **extra_headers}
+        head = f"HTTP/1.1 {status} {REASONS.get(status, 'Error')}\r\n" + \
+               ''.join(f"{name}: {value}\r\n" for name, value in headers.items()) + "\r\n"
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle_connection, host, port, limit=MAX_HEADER_BYTES)
+        print(f"Exchange service on http://{host}:{port} with {self.workers} workers, "
+              f"{self.max_queue} queued requests max", file=sys.stderr, flush=True)
+        # SIGTERM stops the server like Ctrl+C, so the worker pool is shut down instead of orphaned
+        stopped = asyncio.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                asyncio.get_running_loop().add_signal_handler(signum, stopped.set)
+            except (NotImplementedError, RuntimeError):
+                pass  # Windows: Ctrl+C still raises KeyboardInterrupt
+        async with server:
+            await stopped.wait()
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog="python -m service", description="HTTP send/receive exchange service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument("--max-queue", type=int, default=DEFAULT_MAX_QUEUE,
+                        help="requests waiting for a worker before new ones get 503")
+    parser.add_argument("--max-body-mb", type=float, default=DEFAULT_MAX_BODY_MB, help="largest accepted request body")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    service = ExchangeService(args.workers, args.max_queue, int(args.max_body_mb * 1024 * 1024))
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.pool.shutdown(cancel_futures=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
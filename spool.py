@@ -0,0 +1,356 @@
+"""Inbox/outbox spool exchange for integrations that drop files into a shared folder.
+
+    python -m spool --inbox spool/in --outbox spool/out --aes --key-file key.b64
+
+Layout:
+
+    <inbox>/send/NAME.txt       message to embed, into NAME.png|jpg|jpeg|bmp next to it or --cover
+    <inbox>/receive/NAME.png    stego image to extract and decrypt
+    <outbox>/send/NAME-JOB.png      stego image
+    <outbox>/receive/NAME-JOB.txt   recovered message
+    <inbox>/done/, <inbox>/failed/   processed inputs, moved out of the way
+
+JOB is a short hash of the input's name, size and mtime, so a file dropped
+again under the same name gets new outputs instead of replacing the
+earlier ones.
+
+Producers should write files under a temporary name (dotfile or .tmp) and
+rename them when complete; files are also only picked up once their size
+and mtime are unchanged between two scans. Ready files are grouped into
+batches of up to --batch-size, or fewer once the oldest has waited
+--batch-wait seconds, and run on a process pool.
+
+Outputs are written to a temp file and renamed. Each finished input is
+then recorded in a JSON Lines journal before it is moved to done/ or
+failed/, so after a crash or restart a file is either reprocessed (its
+output had not been recorded yet) or only moved, never lost. The journal
+is compacted at startup and every COMPACT_EVERY finished inputs.
+
+Throughput and backlog depth go to stderr every --report-interval seconds
+and to <outbox>/.spool-status.json.
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import signal
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from batch import IMAGE_EXTENSIONS, BatchError, load_key, run_item, write_atomic
+
+DEFAULT_BATCH_SIZE = 16
+DEFAULT_BATCH_WAIT = 2.0
+DEFAULT_POLL_INTERVAL = 1.0
+DEFAULT_REPORT_INTERVAL = 30.0
+THROUGHPUT_WINDOW = 60.0
+COMPACT_EVERY = 1000
+DIRECTIONS = ('send', 'receive')
+
+
+def is_temporary(name):
+    return name.startswith('.') or name.endswith(('.tmp', '.part'))
+
+
+def job_tag(file_id):
+    """Short, stable name suffix for one input, so re-drops of the same name never overwrite."""
+    return hashlib.blake2b(file_id.encode('utf-8'), digest_size=4).hexdigest()
+
+
+class Journal:
+    """Append-only record of finished inputs, keyed by path, size and mtime."""
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # a line cut short by a crash
+                    self.entries[entry['id']] = entry
+        self._file = None
+
+    def compact(self, live_ids):
+        """Rewrite the journal keeping only inputs still waiting to be moved out of the inbox."""
+        self.entries = {key: entry for key, entry in self.entries.items() if key in live_ids}
+        self.close()  # the rewrite replaces the file the append handle points to
+
+        def write(path):
+            with open(path, 'w') as f:
+                for entry in self.entries.values():
+                    f.write(json.dumps(entry) + "\n")
+        write_atomic(self.path, write)
+
+    def record(self, entry):
+        if self._file is None:
+            self._file = open(self.path, 'a')
+        self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.entries[entry['id']] = entry
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class Spool:
+    def __init__(self, args, key):
+        self.inbox = args.inbox
+        self.outbox = args.outbox
+        self.cover = args.cover
+        self.batch_size = args.batch_size
+        self.batch_wait = args.batch_wait
+        self.key = key
+        self.compute_ssim = args.ssim
+        self.settle = not args.once
+        for directory in [os.path.join(self.inbox, d) for d in DIRECTIONS + ('done', 'failed')] + \
+                         [os.path.join(self.outbox, d) for d in DIRECTIONS]:
+            os.makedirs(directory, exist_ok=True)
+        self.journal = Journal(args.journal or os.path.join(self.inbox, '.spool-journal.jsonl'))
+        self.status_path = os.path.join(self.outbox, '.spool-status.json')
+
+        self._seen = {}
+        self._ready_since = {}
+        self.backlog = 0
+        self.processed = 0
+        self.failed = 0
+        self.started = time.time()
+        self._finished_at = []
+
+    def _file_id(self, direction, path):
+        stat = os.stat(path)
+        return f"{direction}:{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+
+    def _live_ids(self):
+        live_ids = set()
+        for direction, path in self._candidates():
+            try:
+                live_ids.add(self._file_id(direction, path))
+            except FileNotFoundError:
+                continue
+        return live_ids
+
+    def compact(self):
+        self.journal.compact(self._live_ids())
+
+    def _candidates(self):
+        """(direction, path) of every complete-looking input currently in the inbox."""
+        for direction in DIRECTIONS:
+            directory = os.path.join(self.inbox, direction)
+            names = sorted(name for name in os.listdir(directory) if not is_temporary(name))
+            for name in names:
+                path = os.path.join(directory, name)
+                if not os.path.isfile(path):
+                    continue
+                lower = name.lower()
+                if direction == 'send' and lower.endswith('.txt'):
+                    yield direction, path
+                elif direction == 'receive' and lower.endswith(IMAGE_EXTENSIONS):
+                    yield direction, path
+
+    def _send_cover(self, message_path):
+        stem = os.path.splitext(message_path)[0]
+        for extension in IMAGE_EXTENSIONS:
+            for candidate in (stem + extension, stem + extension.upper()):
+                if os.path.exists(candidate):
+                    return candidate
+        return self.cover
+
+    def _item(self, direction, path, file_id):
+        stem = f"{os.path.splitext(os.path.basename(path))[0]}-{job_tag(file_id)}"
+        if direction == 'send':
+            return {'id': file_id, 'input': self._send_cover(path), 'message_file': path,
+                    'output': os.path.join(self.outbox, 'send', stem + '.png')}
+        return {'id': file_id, 'input': path, 'output': os.path.join(self.outbox, 'receive', stem + '.txt')}
+
+    def scan(self):
+        """Ready work items, oldest first; files still changing or missing a cover wait for the next scan."""
+        now = time.monotonic()
+        ready = []
+        seen = {}
+        backlog = 0
+        for direction, path in self._candidates():
+            try:
+                stat = os.stat(path)
+                file_id = self._file_id(direction, path)
+            except FileNotFoundError:
+                continue
+            signature = (stat.st_size, stat.st_mtime_ns)
+            cover = self._send_cover(path) if direction == 'send' else None
+            if cover is not None and os.path.exists(cover):
+                cover_stat = os.stat(cover)
+                signature += (cover_stat.st_size, cover_stat.st_mtime_ns)
+            seen[path] = signature
+
+            entry = self.journal.get(file_id)
+            if entry:
+                # Finished before a restart but not yet moved out of the inbox
+                self._move_input(direction, path, file_id, entry['status'])
+                continue
+            backlog += 1
+            if self.settle and self._seen.get(path) != signature:
+                continue
+            item = self._item(direction, path, file_id)
+            if direction == 'send' and item['input'] is None:
+                continue  # the cover image may still be on its way
+            ready.append((direction, item))
+            self._ready_since.setdefault(path, now)
+
+        self._seen = seen
+        self._ready_since = {path: since for path, since in self._ready_since.items() if path in seen}
+        self.backlog = backlog
+        return ready
+
+    def next_batch(self, ready):
+        if not ready:
+            return []
+        oldest = min(self._ready_since[item['message_file'] if direction == 'send' else item['input']]
+                     for direction, item in ready)
+        if len(ready) < self.batch_size and self.settle and time.monotonic() - oldest < self.batch_wait:
+            return []
+        return ready[:self.batch_size]
+
+    def _move_input(self, direction, path, file_id, status):
+        directory = os.path.join(self.inbox, 'done' if status == 'ok' else 'failed')
+        prefix = f"{direction}-{job_tag(file_id)}-"
+        if os.path.exists(path):
+            os.replace(path, os.path.join(directory, prefix + os.path.basename(path)))
+        if direction == 'send':
+            cover = self._send_cover(path)
+            if cover and cover != self.cover and os.path.exists(cover):
+                os.replace(cover, os.path.join(directory, prefix + os.path.basename(cover)))
+
+    def finish(self, direction, item, record):
+        path = item['message_file'] if direction == 'send' else item['input']
+        entry = dict(record, input=path, direction=direction)
+        if direction == 'send':
+            entry['cover'] = item['input']
+        self.journal.record(entry)
+        self._move_input(direction, path, item['id'], record['status'])
+        self.processed += 1
+        self.failed += record['status'] != 'ok'
+        self._finished_at.append(time.time())
+        self.backlog = max(0, self.backlog - 1)
+        if self.processed % COMPACT_EVERY == 0:
+            self.compact()
+
+    def run_batch(self, pool, batch):
+        if pool is None:
+            for direction, item in batch:
+                self.finish(direction, item, run_item(direction_command(direction), item, self.key, self.compute_ssim))
+            return
+        futures = [(direction, item, pool.submit(run_item, direction_command(direction), item, self.key,
+                                                 self.compute_ssim))
+                   for direction, item in batch]
+        for direction, item, future in futures:
+            self.finish(direction, item, future.result())
+
+    def status(self):
+        now = time.time()
+        self._finished_at = [t for t in self._finished_at if t >= now - THROUGHPUT_WINDOW]
+        window = min(THROUGHPUT_WINDOW, now - self.started) or 1.0
+        elapsed = (now - self.started) or 1.0
+        return {
+            'processed': self.processed,
+            'failed': self.failed,
+            'backlog': self.backlog,
+            'items_per_s': len(self._finished_at) / window,
+            'overall_items_per_s': self.processed / elapsed,
+            'uptime_s': now - self.started,
+            'updated_at': now
+        }
+
+    def report(self, quiet=False):
+        status = self.status()
+
+        def write(path):
+            with open(path, 'w') as f:
+                json.dump(status, f, indent=2)
+        write_atomic(self.status_path, write)
+        if not quiet:
+            print(f"[spool] {status['processed']} processed ({status['failed']} failed), "
+                  f"{status['items_per_s']:.2f} items/s over the last minute, backlog {status['backlog']}",
+                  file=sys.stderr, flush=True)
+        return status
+
+
+def direction_command(direction):
+    return 'embed' if direction == 'send' else 'extract'
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog="python -m spool", description="Inbox/outbox spool exchange")
+    parser.add_argument("--inbox", required=True, help="directory with send/ and receive/ subfolders")
+    parser.add_argument("--outbox", required=True, help="where stego images and recovered messages are written")
+    parser.add_argument("--cover", help="cover image for messages without one of the same name")
+    parser.add_argument("--journal", help="state journal (default: <inbox>/.spool-journal.jsonl)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="parallel worker processes")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--batch-wait", type=float, default=DEFAULT_BATCH_WAIT,
+                        help="seconds the oldest ready file waits for a batch to fill")
+    parser.add_argument("--poll-interval", type=float, default=DEFAULT_POLL_INTERVAL)
+    parser.add_argument("--report-interval", type=float, default=DEFAULT_REPORT_INTERVAL)
+    parser.add_argument("--once", action="store_true", help="process what is in the inbox now, then exit")
+    parser.add_argument("--aes", action="store_true", help="use the AES-256 layer")
+    parser.add_argument("--key", help="Base64 AES key")
+    parser.add_argument("--key-file", help="file containing the Base64 AES key")
+    parser.add_argument("--ssim", action="store_true", help="also compute SSIM for sent images (slower)")
+    parser.add_argument("--quiet", action="store_true", help="no progress reports on stderr")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        key = load_key(args)
+        if args.cover and not os.path.isfile(args.cover):
+            raise BatchError(f"Cover image not found: {args.cover}")
+        spool = Spool(args, key)
+    except (BatchError, OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+
+    spool.compact()
+
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopping.append(signum))
+    pool = ProcessPoolExecutor(max_workers=args.workers) if args.workers > 1 else None
+    last_report = time.monotonic()
+    try:
+        while not stopping:
+            batch = spool.next_batch(spool.scan())
+            if batch:
+                spool.run_batch(pool, batch)
+            # Also while input keeps arriving, when throughput and backlog matter most
+            if time.monotonic() - last_report >= args.report_interval:
+                spool.report(args.quiet)
+                last_report = time.monotonic()
+            if batch:
+                continue
+            if args.once:
+                # Anything left is a message whose cover has not arrived; it stays in the inbox
+                break
+            time.sleep(args.poll_interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        spool.report(args.quiet)
+        spool.journal.close()
+    return 1 if spool.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,52 @@
+import io
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from pydicom.dataset import Dataset, FileMetaDataset
+from pydicom.uid import ExplicitVRLittleEndian, generate_uid
+
+from utils.dicom_series import find_series
+
+
+def dicom_file(pixels, name, **fields):
+    ds = Dataset()
+    ds.file_meta = FileMetaDataset()
+    ds.file_meta.TransferSyntaxUID = ExplicitVRLittleEndian
+    ds.file_meta.MediaStorageSOPClassUID = '1.2.840.10008.5.1.4.1.1.2'
+    ds.file_meta.MediaStorageSOPInstanceUID = generate_uid()
+    ds.Modality = 'CT'
+    ds.Rows, ds.Columns = pixels.shape[-2:]
+    if pixels.ndim == 3:
+        ds.NumberOfFrames = pixels.shape[0]
+    ds.SamplesPerPixel = 1
+    ds.PhotometricInterpretation = 'MONOCHROME2'
+    ds.BitsAllocated, ds.BitsStored, ds.HighBit, ds.PixelRepresentation = 16, 16, 15, 1
+    for keyword, value in fields.items():
+        setattr(ds, keyword, value)
+    ds.PixelData = pixels.astype(np.int16).tobytes()
+    buffer = io.BytesIO()
+    ds.save_as(buffer, enforce_file_format=True)
+    buffer.name = name
+    buffer.seek(0)
+    return buffer
+
+
+def test_per_slice_rescale_and_skipped_multi_frame():
+    uid = generate_uid()
+    stored = np.full((2, 4, 4), 100)
+    rescales = [(1.0, -1024.0), (2.0, -2048.0)]
+    uploads = [dicom_file(stored[i], f"slice{i}.dcm", SeriesInstanceUID=uid, InstanceNumber=i + 1,
+                          RescaleSlope=slope, RescaleIntercept=intercept)
+               for i, (slope, intercept) in enumerate(rescales)]
+    uploads.append(dicom_file(np.zeros((3, 4, 4)), "cine.dcm"))
+
+    series_list, multi_frame = find_series(uploads)
+    assert multi_frame == ["cine.dcm"]
+    [series] = series_list
+
+    volume = series.load_volume(max_workers=1)['volume']
+    assert volume[0, 0, 0] == 100 - 1024 and volume[1, 0, 0] == 200 - 2048
+    assert series.windowing().to_modality(volume[1, 0, 0]) == 200 - 2048
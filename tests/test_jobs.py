@@ -0,0 +1,45 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pytest
+
+from utils import pipeline
+from utils.jobs import JobQueue, DONE
+from utils.metrics_store import MetricsStore
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = MetricsStore(str(tmp_path / 'metrics.db'))
+    monkeypatch.setattr(pipeline, 'shared_store', lambda path=None: store)
+    return store
+
+
+def run(queue, func, *args, session):
+    job = queue.submit(func.__name__, func, *args, session=session)
+    job.future.result(timeout=60)
+    assert job.state == DONE, job.error
+    return job.result
+
+
+def test_pipeline_metrics_are_recorded_for_the_submitting_session(store):
+    queue = JobQueue(max_workers=1)
+    cover = np.random.default_rng(0).integers(0, 256, (64, 64, 3), dtype=np.uint8)
+    message = "Patient 7: session scoped"
+
+    result = run(queue, pipeline.encrypt_embed, message, cover, False, session='S1')
+    stego = np.asarray(result['embedding']['stego_image'])
+    extracted = run(queue, pipeline.extract_decrypt, stego, False, session='S1')
+    assert extracted['decryption']['decrypted_text'] == message
+
+    for kind in ('encryption', 'decryption'):
+        assert store.summary(kind, session='S1')['count'] == 1
+        assert store.summary(kind, session='S2')['count'] == 0
+        assert store.summary(kind)['count'] == 1
+
+    store.clear(session='S1')
+    assert store.summary('encryption', session='S1')['count'] == 0
+    assert store.summary('encryption')['count'] == 0
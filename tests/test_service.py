@@ -0,0 +1,58 @@
+import io
+import os
+import sys
+import json
+import zlib
+import base64
+import struct
+import asyncio
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from service import ExchangeService, HTTPError
+
+
+def png_chunk(kind, data):
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+
+def oversized_png(width=20000, height=20000):
+    """PNG header claiming width x height RGB pixels; PIL refuses it on open, before decoding any data."""
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + png_chunk(b'IHDR', header)
+            + png_chunk(b'IDAT', zlib.compress(b'\x00')) + png_chunk(b'IEND', b''))
+
+
+def cover_png(size=64):
+    buf = io.BytesIO()
+    Image.fromarray(np.random.default_rng(0).integers(0, 256, (size, size, 3), dtype=np.uint8)).save(buf, 'PNG')
+    return buf.getvalue()
+
+
+@pytest.fixture(scope='module')
+def service():
+    service = ExchangeService(workers=1)
+    yield service
+    service.pool.shutdown(cancel_futures=True)
+
+
+def send(service, cover):
+    body = json.dumps({'message': 'Patient 7', 'cover': base64.b64encode(cover).decode('ascii')}).encode('utf-8')
+    return asyncio.run(service.dispatch('POST', '/send', body))
+
+
+def test_send_embeds_into_a_valid_cover(service):
+    result = send(service, cover_png())
+    assert Image.open(io.BytesIO(base64.b64decode(result['stego']))).size == (64, 64)
+
+
+@pytest.mark.parametrize('cover', [oversized_png(), b'not an image'], ids=['decompression-bomb', 'unreadable'])
+def test_bad_images_are_client_errors(service, cover):
+    with pytest.raises(HTTPError) as error:
+        send(service, cover)
+    assert error.value.status == 422
+    assert service.in_flight == 0
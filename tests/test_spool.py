@@ -0,0 +1,43 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from PIL import Image
+
+import spool
+
+
+def drop(inbox, name, text, mtime):
+    path = os.path.join(inbox, 'send', name)
+    with open(path, 'w') as f:
+        f.write(text)
+    os.utime(path, ns=(mtime, mtime))
+
+
+def run_once(inbox, outbox, cover):
+    return spool.main(['--inbox', inbox, '--outbox', outbox, '--cover', cover, '--once', '--workers', '1',
+                       '--quiet'])
+
+
+def test_redrop_keeps_earlier_outputs_and_journal_is_compacted(tmp_path, monkeypatch):
+    monkeypatch.setattr(spool, 'COMPACT_EVERY', 2)
+    inbox, outbox = str(tmp_path / 'in'), str(tmp_path / 'out')
+    cover = str(tmp_path / 'cover.png')
+    Image.fromarray(np.random.default_rng(0).integers(0, 256, (64, 64, 3), dtype=np.uint8)).save(cover)
+    os.makedirs(os.path.join(inbox, 'send'))
+
+    drop(inbox, 'note.txt', 'first', 1_000_000_000)
+    drop(inbox, 'other.txt', 'other', 1_000_000_000)
+    assert run_once(inbox, outbox, cover) == 0
+    # Two completions compacted every moved input out of the journal
+    with open(os.path.join(inbox, '.spool-journal.jsonl')) as f:
+        assert f.read() == ''
+
+    drop(inbox, 'note.txt', 'second', 2_000_000_000)
+    assert run_once(inbox, outbox, cover) == 0
+
+    assert len(os.listdir(os.path.join(outbox, 'send'))) == 3
+    done = os.listdir(os.path.join(inbox, 'done'))
+    assert len(done) == 3 and sum(name.endswith('-note.txt') for name in done) == 2
@@ -0,0 +1,164 @@
+import os
+import re
+import time
+from types import SimpleNamespace
+
+# the newest OpenAI model is "gpt-5" which was released August 7, 2025.
+# do not change this unless explicitly requested by the user
+MODEL = "gpt-5"
+
+SYSTEM_PROMPT = """You are an expert AI assistant for a Secure Inter-Hospital Communication System that uses DNA encryption and LSB image steganography.
+
+Your knowledge includes:
+- DNA Encryption: Binary to DNA encoding (00→A, 01→T, 10→C, 11→G) with symmetric substitution cipher (A↔T, C↔G)
+- LSB Steganography: Embedding encrypted data in image pixels using Least Significant Bit manipulation
+- DICOM medical imaging format and standards
+- Image quality metrics: PSNR (Peak Signal-to-Noise Ratio) and SSIM (Structural Similarity Index)
+- Security best practices for medical data
+- HIPAA compliance considerations
+
+Provide clear, concise, and helpful responses. Use examples when appropriate. Be professional but friendly."""
+
+# STEGO_CHAT_CLIENT=stub answers locally instead of calling the API, for
+# trying the page and load tests without a key; STEGO_CHAT_STUB_DELAY adds
+# a pause per streamed chunk to mimic the API's latency
+STUB_CLIENT = os.environ.get('STEGO_CHAT_CLIENT') == 'stub'
+STUB_DELAY = float(os.environ.get('STEGO_CHAT_STUB_DELAY', '0'))
+REPLAY_WORDS_PER_CHUNK = 4
+
+# Tokens allowed per request (system prompt + history), estimated locally.
+# When the history does not fit, the oldest turns are dropped and their
+# questions listed in a short summary using at most SUMMARY_SHARE of it.
+CONTEXT_TOKEN_BUDGET = int(os.environ.get('STEGO_CHAT_CONTEXT_TOKENS', '3000'))
+SUMMARY_SHARE = 0.15
+SUMMARY_QUESTION_CHARS = 160
+MESSAGE_OVERHEAD_TOKENS = 4
+ERROR_PREFIX = "❌ Error"
+
+
+class StubChatClient:
+    """Stands in for `openai.OpenAI`: streams a canned answer shaped like chat completion chunks."""
+
+    def __init__(self, delay=STUB_DELAY):
+        self.delay = delay
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model, messages, stream=False):
+        self.calls += 1
+        question = next((m['content'] for m in reversed(messages) if m['role'] == 'user'), '')
+        answer = f"Stub answer to: {question}"
+        if not stream:
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=answer))])
+        return self._stream(answer)
+
+    def _stream(self, answer):
+        for chunk in replay(answer):
+            if self.delay:
+                time.sleep(self.delay)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=chunk))])
+
+
+def chat_configured():
+    return STUB_CLIENT or bool(os.environ.get("OPENAI_API_KEY"))
+
+
+def chat_model():
+    """Model name requests are made and cached under; stub answers never share entries with real ones."""
+    return 'stub' if STUB_CLIENT else MODEL
+
+
+def make_client():
+    if STUB_CLIENT:
+        return StubChatClient()
+    from openai import OpenAI
+
+    return OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+
+
+def stream_completion(client, messages, model=None):
+    """Text deltas of a streamed chat completion."""
+    response = client.chat.completions.create(model=model or chat_model(), messages=messages, stream=True)
+    for chunk in response:
+        if chunk.choices and chunk.choices[0].delta.content is not None:
+            yield chunk.choices[0].delta.content
+
+
+def replay(text, words_per_chunk=REPLAY_WORDS_PER_CHUNK):
+    """Deltas of an already complete answer, so cached answers go through the same streaming display."""
+    words = re.findall(r'\s*\S+', text)
+    for start in range(0, len(words), words_per_chunk):
+        yield ''.join(words[start:start + words_per_chunk])
+    trailing = text[len(text.rstrip()):]
+    if trailing:
+        yield trailing
+
+
+def estimate_tokens(text):
+    """Rough token count: about four UTF-8 bytes per token, so emoji and arrows count more than letters."""
+    return (len(text.encode('utf-8')) + 3) // 4
+
+
+def message_tokens(message):
+    return estimate_tokens(message['content']) + MESSAGE_OVERHEAD_TOKENS
+
+
+def is_error(message):
+    return message['role'] == 'assistant' and message['content'].startswith(ERROR_PREFIX)
+
+
+def summarize_turns(turns, budget):
+    """System note listing the user's questions from dropped turns, newest first, within `budget` tokens."""
+    note = "Earlier turns of this conversation were omitted. The user had asked:"
+    used = estimate_tokens(note) + MESSAGE_OVERHEAD_TOKENS
+    questions = []
+    for turn in reversed(turns):
+        if turn['role'] != 'user':
+            continue
+        question = ' '.join(turn['content'].split())
+        if len(question) > SUMMARY_QUESTION_CHARS:
+            question = question[:SUMMARY_QUESTION_CHARS - 1] + '…'
+        cost = estimate_tokens(question) + 1
+        if used + cost > budget:
+            break
+        questions.append(question)
+        used += cost
+    if not questions:
+        return None
+    return {"role": "system", "content": note + ''.join(f"\n- {q}" for q in reversed(questions))}
+
+
+def build_context(history, system_prompt=SYSTEM_PROMPT, budget=CONTEXT_TOKEN_BUDGET):
+    """Messages to send for `history`: the system prompt plus the newest turns that fit `budget`.
+
+    Error replies are left out. Returns the messages and a dict with the
+    estimated token count and how many history messages were kept and
+    dropped. The newest message is always sent, even if it alone exceeds
+    the budget.
+    """
+    turns = [message for message in history if not is_error(message)]
+    system = {"role": "system", "content": system_prompt}
+    used = message_tokens(system)
+    costs = [message_tokens(turn) for turn in turns]
+
+    available = budget - used
+    if sum(costs) > available:
+        available -= int(budget * SUMMARY_SHARE)
+    kept = 0
+    for cost in reversed(costs):
+        if kept and cost > available:
+            break
+        available -= cost
+        used += cost
+        kept += 1
+
+    dropped = turns[:len(turns) - kept]
+    messages = [system]
+    if dropped:
+        summary = summarize_turns(dropped, max(0, budget - used))
+        if summary is not None:
+            messages.append(summary)
+            used += message_tokens(summary)
+    messages += turns[len(turns) - kept:]
+    return messages, {'tokens': used, 'kept': kept, 'dropped': len(dropped),
+                      'errors_skipped': len(history) - len(turns)}
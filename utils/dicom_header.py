@@ -0,0 +1,98 @@
+import re
+
+VALUE_PREVIEW_LENGTH = 80
+BINARY_PREVIEW_BYTES = 1024
+BINARY_VRS = {'OB', 'OD', 'OF', 'OL', 'OV', 'OW', 'UN'}
+
+
+def format_tag(tag):
+    return f"({tag.group:04X},{tag.element:04X})"
+
+
+def preview_value(elem, length=VALUE_PREVIEW_LENGTH):
+    """Return (preview text, whether the full value is longer than the preview)."""
+    if elem.VR == 'SQ':
+        return elem.repval, False
+    if elem.VR in BINARY_VRS:
+        size = len(elem.value) if elem.value is not None else 0
+        return f"<{size} bytes>", size > 0
+
+    text = elem.value if isinstance(elem.value, str) else elem.repval
+    if len(text) <= length:
+        return text, False
+    return text[:length - 1] + '…', True
+
+
+def build_tag_index(ds, preview_length=VALUE_PREVIEW_LENGTH):
+    """Flatten a dataset (file meta, nested sequences, private tags) into searchable rows.
+
+    Each row keeps a `location` tuple from which `element_at` can fetch the
+    element again, so full values are only formatted when requested.
+    """
+    entries = []
+
+    def walk(dataset, path, location):
+        for elem in dataset:
+            elem_location = location + (int(elem.tag),)
+            value, truncated = preview_value(elem, preview_length)
+            entries.append({
+                'tag': format_tag(elem.tag),
+                'keyword': elem.keyword or ('Private' if elem.tag.is_private else ''),
+                'name': elem.name,
+                'vr': elem.VR,
+                'value': value,
+                'path': path,
+                'truncated': truncated,
+                'location': elem_location
+            })
+            if elem.VR == 'SQ':
+                label = elem.keyword or format_tag(elem.tag)
+                for index, item in enumerate(elem.value):
+                    walk(item, f"{path}{label}[{index}] > ", elem_location + (index,))
+
+    file_meta = getattr(ds, 'file_meta', None)
+    if file_meta is not None:
+        walk(file_meta, "File Meta > ", ('file_meta',))
+    walk(ds, "", ())
+    return entries
+
+
+def search_index(entries, query):
+    query = query.strip()
+    if not query:
+        return entries
+
+    text = query.lower()
+    hex_digits = re.sub(r'[^0-9a-fA-F]', '', query).upper()
+    looks_like_tag = len(hex_digits) >= 4 and re.fullmatch(r'[\s(]*[0-9a-fA-F]{4}[\s,]*[0-9a-fA-F]{0,4}[\s)]*', query)
+
+    def matches(entry):
+        if looks_like_tag and hex_digits in entry['tag'].replace('(', '').replace(',', '').replace(')', ''):
+            return True
+        return text in entry['keyword'].lower() or text in entry['name'].lower()
+
+    return [entry for entry in entries if matches(entry)]
+
+
+def element_at(ds, location):
+    dataset = ds
+    if location and location[0] == 'file_meta':
+        dataset, location = ds.file_meta, location[1:]
+
+    elem = None
+    for step in location:
+        if elem is not None and elem.VR == 'SQ':
+            dataset = elem.value[step]
+            elem = None
+            continue
+        elem = dataset[step]
+    return elem
+
+
+def full_value(elem):
+    if elem.VR in BINARY_VRS:
+        data = bytes(elem.value or b'')
+        shown = data[:BINARY_PREVIEW_BYTES].hex(' ')
+        suffix = f"\n… {len(data) - BINARY_PREVIEW_BYTES} more bytes" if len(data) > BINARY_PREVIEW_BYTES else ""
+        return f"{len(data)} bytes\n{shown}{suffix}"
+    return str(elem.value)
@@ -0,0 +1,155 @@
+import os
+import threading
+from io import BytesIO
+
+import numpy as np
+import pydicom
+from pydicom.encaps import generate_frames
+from pydicom.pixels import pixel_array
+
+DEFER_SIZE = '16 KB'
+
+
+class DicomLoader:
+    """Metadata-first access to a DICOM file.
+
+    The header is parsed without pixel data (large values are deferred until
+    they are accessed) and frames are decoded one at a time on request. A
+    loader may be shared between sessions, so reads of the source are locked,
+    except frame reads from a path or an in-memory buffer, which each get
+    their own handle and can run in parallel.
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self._metadata = None
+        self._data = None
+        self._lock = threading.Lock()
+
+    def _rewind(self):
+        if hasattr(self.source, 'seek'):
+            self.source.seek(0)
+
+    def metadata(self):
+        if self._metadata is None:
+            with self._lock:
+                self._rewind()
+                self._metadata = pydicom.dcmread(self.source, stop_before_pixels=True, defer_size=DEFER_SIZE)
+        return self._metadata
+
+    def number_of_frames(self):
+        return int(self.metadata().get('NumberOfFrames', 1) or 1)
+
+    def frame_shape(self):
+        ds = self.metadata()
+        shape = (int(ds.Rows), int(ds.Columns))
+        samples = int(ds.get('SamplesPerPixel', 1) or 1)
+        return shape + (samples,) if samples > 1 else shape
+
+    def shape(self):
+        frames = self.number_of_frames()
+        return (frames,) + self.frame_shape() if frames > 1 else self.frame_shape()
+
+    def dtype(self):
+        ds = self.metadata()
+        bits = int(ds.get('BitsAllocated', 8) or 8)
+        signed = int(ds.get('PixelRepresentation', 0) or 0) == 1
+        return np.dtype(f"{'i' if signed else 'u'}{max(1, bits // 8)}")
+
+    def nbytes(self):
+        return int(np.prod(self.shape())) * self.dtype().itemsize
+
+    def frame(self, index=0):
+        if not 0 <= index < self.number_of_frames():
+            raise IndexError(f"Frame {index} out of range. File has {self.number_of_frames()} frames")
+
+        index = None if self.number_of_frames() == 1 else index
+        reader = self._private_reader()
+        if reader is not None:
+            return pixel_array(reader, index=index)
+        with self._lock:
+            self._rewind()
+            return pixel_array(self.source, index=index)
+
+    def _private_reader(self):
+        """A handle on the source no other read shares, or None if reads have to take turns."""
+        if isinstance(self.source, (str, os.PathLike)):
+            return self.source
+        if isinstance(self.source, BytesIO):
+            if self._data is None:
+                with self._lock:
+                    self._data = self.source.getvalue()
+            # BytesIO over unchanged bytes shares them instead of copying
+            return BytesIO(self._data)
+        return None
+
+    def is_encapsulated(self):
+        return self.metadata().file_meta.TransferSyntaxUID.is_encapsulated
+
+    def encoded_frames(self):
+        """Compressed bytes of each frame of an encapsulated (RLE/JPEG) file."""
+        with self._lock:
+            self._rewind()
+            ds = pydicom.dcmread(self.source)
+        return list(generate_frames(ds.PixelData, number_of_frames=self.number_of_frames()))
+
+    def decode_options(self):
+        ds = self.metadata()
+        options = {
+            'transfer_syntax_uid': ds.file_meta.TransferSyntaxUID,
+            'rows': int(ds.Rows),
+            'columns': int(ds.Columns),
+            'samples_per_pixel': int(ds.get('SamplesPerPixel', 1) or 1),
+            'bits_allocated': int(ds.BitsAllocated),
+            'bits_stored': int(ds.get('BitsStored', ds.BitsAllocated)),
+            'pixel_representation': int(ds.get('PixelRepresentation', 0) or 0),
+            'photometric_interpretation': str(ds.PhotometricInterpretation),
+            'number_of_frames': 1
+        }
+        if options['samples_per_pixel'] > 1:
+            options['planar_configuration'] = int(ds.get('PlanarConfiguration', 0) or 0)
+        return options
+
+
+def volume_statistics(frames):
+    """Min, max, mean and std over an iterable of frames in a single pass; all zero without pixels."""
+    count, mean, m2 = 0, 0.0, 0.0
+    low, high = None, None
+
+    for frame in frames:
+        if frame.size == 0:
+            continue
+        values = frame.astype(np.float64)
+        n = values.size
+        frame_mean = float(values.mean())
+        values -= frame_mean
+        frame_m2 = float(np.dot(values.ravel(), values.ravel()))
+
+        total = count + n
+        delta = frame_mean - mean
+        mean += delta * n / total
+        m2 += frame_m2 + delta * delta * count * n / total
+        count = total
+
+        frame_low, frame_high = frame.min(), frame.max()
+        low = frame_low if low is None else min(low, frame_low)
+        high = frame_high if high is None else max(high, frame_high)
+
+    if count == 0:
+        return {'min': 0, 'max': 0, 'mean': 0.0, 'std': 0.0, 'count': 0}
+    return {
+        'min': low.item(),
+        'max': high.item(),
+        'mean': mean,
+        'std': (m2 / count) ** 0.5,
+        'count': count
+    }
+
+
+def to_uint8(pixels):
+    if pixels.dtype == np.uint8:
+        return pixels
+
+    low, high = pixels.min(), pixels.max()
+    scale = 255.0 / (float(high) - float(low)) if high > low else 0.0
+    return ((pixels.astype(np.float32) - float(low)) * scale).astype(np.uint8)
@@ -0,0 +1,180 @@
+import io
+import os
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from pydicom.errors import InvalidDicomError
+
+from utils.dicom_loader import DicomLoader
+from utils.windowing import Windowing
+
+PLANES = ('Axial', 'Coronal', 'Sagittal')
+
+
+def iter_sources(uploads):
+    """Yield (name, file object) for every uploaded file and every member of uploaded zips."""
+    for upload in uploads:
+        name = getattr(upload, 'name', '')
+        upload.seek(0)
+        if zipfile.is_zipfile(upload):
+            upload.seek(0)
+            with zipfile.ZipFile(upload) as archive:
+                for info in archive.infolist():
+                    if not info.is_dir():
+                        yield info.filename, io.BytesIO(archive.read(info))
+        else:
+            upload.seek(0)
+            yield name, io.BytesIO(upload.read())
+
+
+def slice_position(ds):
+    position = ds.get('ImagePositionPatient')
+    orientation = ds.get('ImageOrientationPatient')
+    if position is None or orientation is None or len(orientation) != 6:
+        return None
+    normal = np.cross([float(v) for v in orientation[:3]], [float(v) for v in orientation[3:]])
+    return float(np.dot(normal, [float(v) for v in position]))
+
+
+def slice_rescale(ds):
+    return float(ds.get('RescaleSlope', 1.0) or 1.0), float(ds.get('RescaleIntercept', 0.0) or 0.0)
+
+
+class DicomSeries:
+    def __init__(self, uid, loaders):
+        self.uid = uid
+        self.loaders = loaders
+        self.positions = [slice_position(loader.metadata()) for loader in loaders]
+        self.rescales = [slice_rescale(loader.metadata()) for loader in loaders]
+        # Slices with their own slope/intercept are stacked in modality units instead of stored values
+        self.mixed_rescale = len(set(self.rescales)) > 1
+
+    def metadata(self):
+        return self.loaders[0].metadata()
+
+    def description(self):
+        ds = self.metadata()
+        label = ds.get('SeriesDescription') or ds.get('Modality') or 'Series'
+        return f"{label} ({len(self.loaders)} slices)"
+
+    def shape(self):
+        return (len(self.loaders),) + self.loaders[0].frame_shape()
+
+    def dtype(self):
+        return np.dtype(np.float32) if self.mixed_rescale else self.loaders[0].dtype()
+
+    def windowing(self):
+        """Windowing for the stacked volume, which is already in modality units if the rescale differs per slice."""
+        return Windowing() if self.mixed_rescale else Windowing(*self.rescales[0])
+
+    def spacing(self):
+        """(slice, row, column) spacing in mm."""
+        ds = self.metadata()
+        pixel_spacing = ds.get('PixelSpacing') or [1.0, 1.0]
+
+        slice_spacing = None
+        if len(self.loaders) > 1 and None not in self.positions:
+            gaps = np.abs(np.diff(self.positions))
+            gaps = gaps[gaps > 0]
+            if gaps.size:
+                slice_spacing = float(np.median(gaps))
+        if slice_spacing is None:
+            slice_spacing = float(ds.get('SpacingBetweenSlices') or ds.get('SliceThickness') or 1.0)
+
+        return slice_spacing, float(pixel_spacing[0]), float(pixel_spacing[1])
+
+    def plane_aspect(self, plane):
+        """Height/width ratio of one displayed pixel in the given plane."""
+        slice_spacing, row_spacing, column_spacing = self.spacing()
+        if plane == 'Coronal':
+            return slice_spacing / column_spacing
+        if plane == 'Sagittal':
+            return slice_spacing / row_spacing
+        return row_spacing / column_spacing
+
+    def load_volume(self, max_workers=None):
+        start_time = time.time()
+
+        frame_shape = self.loaders[0].frame_shape()
+        if len(frame_shape) != 2:
+            raise ValueError(f"Only single-sample slices can be stacked into a volume, got {frame_shape}")
+
+        volume = np.empty(self.shape(), dtype=self.dtype())
+
+        def decode(index):
+            frame = self.loaders[index].frame(0)
+            if frame.shape != frame_shape:
+                raise ValueError(f"Slice {index} has shape {frame.shape}, expected {frame_shape}")
+            if self.mixed_rescale:
+                slope, intercept = self.rescales[index]
+                volume[index] = frame * slope + intercept
+            else:
+                volume[index] = frame
+
+        workers = max_workers or os.cpu_count() or 1
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(decode, range(len(self.loaders))))
+
+        return {
+            'volume': volume,
+            'load_time': time.time() - start_time,
+            'workers': workers
+        }
+
+
+def find_series(uploads):
+    """Group uploaded DICOM files (or zips of them) into spatially sorted series.
+
+    Returns (series list, names of multi-frame files), since a multi-frame
+    file is a volume on its own and cannot be stacked as a slice.
+    """
+    groups = {}
+    multi_frame = []
+    for name, source in iter_sources(uploads):
+        loader = DicomLoader(source)
+        try:
+            ds = loader.metadata()
+        except (InvalidDicomError, EOFError):
+            continue
+        if 'Rows' not in ds or 'Columns' not in ds:
+            continue
+        if loader.number_of_frames() != 1:
+            multi_frame.append(name)
+            continue
+        uid = str(ds.get('SeriesInstanceUID', 'unknown'))
+        groups.setdefault(uid, []).append((name, loader))
+
+    def sort_key(item):
+        name, loader = item
+        ds = loader.metadata()
+        position = slice_position(ds)
+        return (
+            position if position is not None else float('inf'),
+            int(ds.get('InstanceNumber') or 0),
+            name
+        )
+
+    series_list = []
+    for uid, items in groups.items():
+        items.sort(key=sort_key)
+        series_list.append(DicomSeries(uid, [loader for _, loader in items]))
+
+    series_list.sort(key=lambda series: len(series.loaders), reverse=True)
+    return series_list, multi_frame
+
+
+def reformat(volume, plane, index):
+    """Return one slice of an axial stack in the requested plane, superior side up."""
+    if plane == 'Axial':
+        return volume[index]
+    if plane == 'Coronal':
+        return volume[::-1, index, :]
+    if plane == 'Sagittal':
+        return volume[::-1, :, index]
+    raise ValueError(f"Unknown plane {plane}. Expected one of {', '.join(PLANES)}")
+
+
+def plane_size(volume, plane):
+    return volume.shape[PLANES.index(plane)]
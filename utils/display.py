@@ -0,0 +1,226 @@
+import time
+import hashlib
+
+import streamlit as st
+
+from utils.image_pyramid import ImagePyramid
+
+DEFAULT_VIEWPORT_WIDTH = 1024
+ZOOM_CROP_SIZES = [128, 256, 512, 1024]
+JOB_POLL_INTERVAL = 0.5
+UPLOAD_CACHE_ENTRIES = 16
+UPLOAD_CACHE_TTL = 3600
+PREVIEW_CACHE_ENTRIES = 64
+PREVIEW_JPEG_QUALITY = 90
+# st.image re-encodes anything wider than Streamlit's content width
+MAX_PREVIEW_WIDTH = 1460
+# Streamed chat answers are redrawn at most this often, plus once at the end
+STREAM_RENDER_INTERVAL = 0.1
+STREAM_CURSOR = "▌"
+
+
+def session_id():
+    """Identifier of the current browser session, used to tag recorded metrics."""
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else None
+
+
+def upload_digest(uploaded_file):
+    """Content hash of an upload, computed once per session and upload."""
+    if 'upload_digests' not in st.session_state:
+        st.session_state.upload_digests = {}
+
+    digests = st.session_state.upload_digests
+    if uploaded_file.file_id not in digests:
+        digests[uploaded_file.file_id] = hashlib.blake2b(uploaded_file.getbuffer(), digest_size=16).hexdigest()
+    return digests[uploaded_file.file_id]
+
+
+@st.cache_resource(max_entries=UPLOAD_CACHE_ENTRIES, ttl=UPLOAD_CACHE_TTL, show_spinner=False)
+def decoded_upload(file_hash, _uploaded_file):
+    """RGB pixels of an upload, decoded once per content hash and shared read-only by every session.
+
+    A resource rather than st.cache_data, which would unpickle a full copy
+    of the array on every hit.
+    """
+    import numpy as np
+    from PIL import Image
+
+    _uploaded_file.seek(0)
+    image = np.array(Image.open(_uploaded_file).convert('RGB'))
+    image.flags.writeable = False
+    return image
+
+
+@st.cache_resource(max_entries=UPLOAD_CACHE_ENTRIES, ttl=UPLOAD_CACHE_TTL, show_spinner=False)
+def upload_pyramid(file_hash, _uploaded_file):
+    return ImagePyramid(decoded_upload(file_hash, _uploaded_file), key=file_hash)
+
+
+@st.cache_data(max_entries=PREVIEW_CACHE_ENTRIES, ttl=UPLOAD_CACHE_TTL, show_spinner=False)
+def encoded_preview(pyramid_key, viewport_width, aspect, _pyramid):
+    """JPEG bytes of the level shown for `viewport_width`, which st.image passes through without re-encoding."""
+    from io import BytesIO
+    from PIL import Image
+    from utils.image_pyramid import downscale
+
+    image = Image.fromarray(downscale(_pyramid.level_for(viewport_width), MAX_PREVIEW_WIDTH))
+    if abs(aspect - 1.0) > 0.01:
+        image = image.resize((image.width, max(1, round(image.height * aspect))), Image.Resampling.BILINEAR)
+    buffer = BytesIO()
+    image.save(buffer, format='JPEG', quality=PREVIEW_JPEG_QUALITY)
+    return buffer.getvalue()
+
+
+@st.cache_data(max_entries=PREVIEW_CACHE_ENTRIES, ttl=UPLOAD_CACHE_TTL, show_spinner=False)
+def encoded_result_image(job_id, name, max_width, image_format, _image):
+    """Encoded bytes of an image in a finished job's result, so reruns of the result page do not re-encode it."""
+    from io import BytesIO
+    import numpy as np
+    from PIL import Image
+    from utils.image_pyramid import downscale
+
+    image = Image.fromarray(downscale(np.asarray(_image), min(max_width, MAX_PREVIEW_WIDTH)))
+    buffer = BytesIO()
+    if image_format == 'JPEG':
+        image.convert('RGB').save(buffer, format='JPEG', quality=PREVIEW_JPEG_QUALITY)
+    else:
+        image.save(buffer, format=image_format)
+    return buffer.getvalue()
+
+
+def show_pyramid(pyramid, caption, viewport_width=DEFAULT_VIEWPORT_WIDTH, aspect=1.0, key=None):
+    """Send the smallest pyramid level that fills the viewport, with an optional full-resolution zoom."""
+    from PIL import Image
+
+    if pyramid.key is not None:
+        st.image(encoded_preview(pyramid.key, viewport_width, aspect, pyramid), caption=caption,
+                 use_container_width=True)
+    else:
+        level = pyramid.level_for(viewport_width)
+        if abs(aspect - 1.0) > 0.01:
+            img = Image.fromarray(level)
+            level = img.resize((img.width, max(1, round(img.height * aspect))), Image.Resampling.BILINEAR)
+        st.image(level, caption=caption, use_container_width=True)
+
+    full_height, full_width = pyramid.full().shape[:2]
+    if key is None or full_width <= viewport_width:
+        return
+
+    if st.toggle("🔍 Full-resolution zoom", key=f"{key}_zoom"):
+        size = st.select_slider("Crop size", ZOOM_CROP_SIZES, value=512, key=f"{key}_zoom_size")
+        center_x = st.slider("Horizontal position", 0, full_width - 1, full_width // 2, key=f"{key}_zoom_x")
+        center_y = st.slider("Vertical position", 0, full_height - 1, full_height // 2, key=f"{key}_zoom_y")
+        st.image(pyramid.crop(center_x, center_y, size),
+                 caption=f"Full resolution crop around ({center_x}, {center_y})", use_container_width=True)
+
+
+def show_trace(recorder, file_name):
+    """Per-stage timing table for a recorded run plus its Chrome trace-event JSON."""
+    import pandas as pd
+
+    with st.expander("🧭 Performance Trace", expanded=False):
+        st.caption(f"Total {recorder.total_ns() / 1e6:.1f} ms. "
+                   "Open the JSON in chrome://tracing, ui.perfetto.dev or speedscope for a flame chart.")
+        stages = pd.DataFrame(recorder.stage_times())
+        stages['total'] *= 1000
+        stages['self'] *= 1000
+        if recorder.memory:
+            stages['peak_bytes'] /= 1024 * 1024
+            stages['array_bytes'] /= 1024 * 1024
+        st.dataframe(stages.rename(columns={'name': 'Span', 'calls': 'Calls', 'total': 'Total (ms)', 'self': 'Self (ms)',
+                                            'peak_bytes': 'Peak (MB)', 'array_bytes': 'NumPy (MB)'})
+                     .round(3), hide_index=True, use_container_width=True)
+        st.download_button(
+            label="⬇️ Download Chrome Trace (JSON)",
+            data=recorder.to_json(),
+            file_name=file_name,
+            mime="application/json",
+            use_container_width=True
+        )
+
+
+@st.cache_resource(show_spinner=False)
+def job_queue():
+    """Worker pool shared by every session, so a rerun never loses a running pipeline."""
+    from utils.jobs import JobQueue
+
+    return JobQueue()
+
+
+def show_queue_stats(stats):
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Waiting Jobs", f"{stats['queued']} / {stats['max_queued']}")
+    with col2:
+        st.metric("Busy Workers", f"{stats['running']} / {stats['workers']}")
+    with col3:
+        st.metric("Mean Queue Wait", f"{stats['mean_wait']:.2f}s")
+    with col4:
+        st.metric("p95 Queue Wait", f"{stats['p95_wait']:.2f}s")
+    st.caption(f"{stats['submitted']} submitted, {stats['completed']} finished, "
+               f"{stats['rejected']} refused because the queue was full.")
+
+
+@st.fragment(run_every=JOB_POLL_INTERVAL)
+def job_status(job_id):
+    """Progress of a background job, refreshed without rerunning the page; reruns it once the job ends."""
+    from utils.jobs import QUEUED
+
+    job = job_queue().get(job_id)
+    if job is None or job.finished:
+        st.rerun()
+
+    st.progress(job.progress, text=job.message)
+    stats = job_queue().stats()
+    if job.state == QUEUED:
+        st.caption(f"⏳ Queued for {job.wait_time():.1f}s; {stats['queued']} job(s) waiting, "
+                   f"{stats['running']} of {stats['workers']} workers busy.")
+    else:
+        st.caption(f"⚙️ Running for {job.run_time():.1f}s after waiting {job.wait_time():.1f}s in the queue.")
+    if st.button("✖️ Cancel", key=f"cancel_{job_id}", disabled=job.cancel_requested):
+        job.cancel()
+
+
+class StreamingMarkdown:
+    """Markdown placeholder fed with streamed text deltas, redrawn at a bounded rate.
+
+    Every redraw sends the whole text so far, so drawing per delta costs
+    O(n^2) bytes over an answer. Deltas are coalesced and drawn when
+    `interval` seconds have passed since the last draw or, with
+    `max_pending_chars`, once that much text is waiting; `close` draws the
+    final text without the cursor.
+    """
+
+    def __init__(self, placeholder, interval=STREAM_RENDER_INTERVAL, max_pending_chars=None,
+                 cursor=STREAM_CURSOR, clock=time.monotonic):
+        self.placeholder = placeholder
+        self.interval = interval
+        self.max_pending_chars = max_pending_chars
+        self.cursor = cursor
+        self.clock = clock
+        self.text = ""
+        self.pending = 0
+        self.renders = 0
+        self.bytes_sent = 0
+        self._last_render = None
+
+    def _render(self, text):
+        self.placeholder.markdown(text)
+        self.renders += 1
+        self.bytes_sent += len(text.encode('utf-8'))
+        self._last_render = self.clock()
+        self.pending = 0
+
+    def add(self, delta):
+        self.text += delta
+        self.pending += len(delta)
+        if self._last_render is None or self.clock() - self._last_render >= self.interval \
+                or (self.max_pending_chars is not None and self.pending >= self.max_pending_chars):
+            self._render(self.text + self.cursor)
+
+    def close(self):
+        self._render(self.text)
+        return self.text
@@ -5,6 +5,8 @@ from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives import padding
 
+from utils.tracing import traced
+
 class DNAEncryption:
     def __init__(self):
         self.binary_to_dna = {
@@ -35,15 +37,18 @@ class DNAEncryption:
             'C': 'G'
         }
     
+    @traced('dna.text_to_binary')
     def text_to_binary(self, text):
         binary = ''.join(format(ord(char), '08b') for char in text)
         return binary
     
+    @traced('dna.binary_to_text')
     def binary_to_text(self, binary):
         chars = [binary[i:i+8] for i in range(0, len(binary), 8)]
         text = ''.join(chr(int(char, 2)) for char in chars if len(char) == 8)
         return text
     
+    @traced('dna.binary_to_dna')
     def binary_to_dna_sequence(self, binary):
         if len(binary) % 2 != 0:
             binary += '0'
@@ -55,28 +60,32 @@ class DNAEncryption:
         
         return dna_sequence
     
+    @traced('dna.dna_to_binary')
     def dna_to_binary_sequence(self, dna):
         binary = ''
         for nucleotide in dna:
             binary += self.dna_to_binary[nucleotide]
         return binary
     
+    @traced('dna.substitution')
     def apply_substitution(self, dna_sequence):
         encrypted = ''.join(self.substitution_cipher[nucleotide] for nucleotide in dna_sequence)
         return encrypted
     
+    @traced('dna.reverse_substitution')
     def reverse_substitution_cipher(self, encrypted_dna):
         decrypted = ''.join(self.reverse_substitution[nucleotide] for nucleotide in encrypted_dna)
         return decrypted
     
+    @traced('encrypt')
     def encrypt(self, text):
-        start_time = time.time()
+        start_time = time.perf_counter()
         
         binary = self.text_to_binary(text)
         dna_sequence = self.binary_to_dna_sequence(binary)
         encrypted_dna = self.apply_substitution(dna_sequence)
         
-        encryption_time = time.time() - start_time
+        encryption_time = time.perf_counter() - start_time
         
         return {
             'encrypted_dna': encrypted_dna,
@@ -86,14 +95,15 @@ class DNAEncryption:
             'encryption_time': encryption_time
         }
     
+    @traced('decrypt')
     def decrypt(self, encrypted_dna):
-        start_time = time.time()
+        start_time = time.perf_counter()
         
         decrypted_dna = self.reverse_substitution_cipher(encrypted_dna)
         binary = self.dna_to_binary_sequence(decrypted_dna)
         text = self.binary_to_text(binary)
         
-        decryption_time = time.time() - start_time
+        decryption_time = time.perf_counter() - start_time
         
         return {
             'decrypted_text': text,
@@ -117,6 +127,7 @@ class AES256DNAEncryption(DNAEncryption):
         else:
             self.key = key
     
+    @traced('aes.encrypt')
     def aes_encrypt(self, plaintext):
         padder = padding.PKCS7(128).padder()
         padded_data = padder.update(plaintext.encode('utf-8')) + padder.finalize()
@@ -128,6 +139,7 @@ class AES256DNAEncryption(DNAEncryption):
         
         return base64.b64encode(iv + ciphertext).decode('utf-8')
     
+    @traced('aes.decrypt')
     def aes_decrypt(self, ciphertext_b64):
         ciphertext_with_iv = base64.b64decode(ciphertext_b64)
         
@@ -143,8 +155,9 @@ class AES256DNAEncryption(DNAEncryption):
         
         return plaintext.decode('utf-8')
     
+    @traced('encrypt')
     def encrypt(self, text, use_aes=True):
-        start_time = time.time()
+        start_time = time.perf_counter()
         
         if use_aes:
             aes_encrypted = self.aes_encrypt(text)
@@ -155,7 +168,7 @@ class AES256DNAEncryption(DNAEncryption):
         dna_sequence = self.binary_to_dna_sequence(binary)
         encrypted_dna = self.apply_substitution(dna_sequence)
         
-        encryption_time = time.time() - start_time
+        encryption_time = time.perf_counter() - start_time
         
         return {
             'encrypted_dna': encrypted_dna,
@@ -166,8 +179,9 @@ class AES256DNAEncryption(DNAEncryption):
             'used_aes': use_aes
         }
     
+    @traced('decrypt')
     def decrypt(self, encrypted_dna, use_aes=True):
-        start_time = time.time()
+        start_time = time.perf_counter()
         
         decrypted_dna = self.reverse_substitution_cipher(encrypted_dna)
         binary = self.dna_to_binary_sequence(decrypted_dna)
@@ -178,7 +192,7 @@ class AES256DNAEncryption(DNAEncryption):
         else:
             text = intermediate_text
         
-        decryption_time = time.time() - start_time
+        decryption_time = time.perf_counter() - start_time
         
         return {
             'decrypted_text': text,
@@ -0,0 +1,130 @@
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from utils.lru_cache import LRUCache
+
+DEFAULT_CACHE_BYTES = 256 * 1024 * 1024
+DEFAULT_PREFETCH = 4
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def shared_executor(kind, max_workers=None):
+    """Process-wide decode pool, so decoders evicted from a cache never leak workers."""
+    key = (kind, max_workers)
+    with _executors_lock:
+        if key not in _executors:
+            workers = max_workers or os.cpu_count() or 1
+            pool_class = ProcessPoolExecutor if kind == 'process' else ThreadPoolExecutor
+            _executors[key] = pool_class(max_workers=workers)
+        return _executors[key]
+
+
+def decode_encapsulated_frame(encoded, options):
+    from pydicom.encaps import encapsulate
+    from pydicom.pixels import get_decoder
+
+    array, _ = get_decoder(options['transfer_syntax_uid']).as_array(encapsulate([encoded]), **options)
+    return array
+
+
+class FrameDecoder:
+    """On-demand, parallel frame decoding with a bounded cache and directional prefetch.
+
+    Encapsulated (RLE/JPEG) frames are decoded individually on a thread or
+    process pool; native frames go through `DicomLoader.frame` on threads,
+    in parallel when the loader reads from a path or an in-memory buffer.
+    After each request the next `prefetch` frames in the direction the user
+    is scrolling are queued in the background.
+    """
+
+    def __init__(self, loader, cache_bytes=DEFAULT_CACHE_BYTES, prefetch=DEFAULT_PREFETCH,
+                 executor='thread', max_workers=None):
+        self.loader = loader
+        self.encapsulated = loader.is_encapsulated()
+        self.executor_kind = executor if self.encapsulated else 'thread'
+        self.max_workers = max_workers
+        self.prefetch = prefetch
+        self.cache = LRUCache(max_bytes=cache_bytes)
+        self.num_frames = loader.number_of_frames()
+        self._options = loader.decode_options()
+        self._encoded = None
+        self._pending = {}
+        self._last_index = None
+        self._lock = threading.Lock()
+
+    def _executor(self):
+        return shared_executor(self.executor_kind, self.max_workers)
+
+    def _start_decode(self, index):
+        if self.encapsulated:
+            if self._encoded is None:
+                self._encoded = self.loader.encoded_frames()
+            return self._executor().submit(decode_encapsulated_frame, self._encoded[index], self._options)
+        return self._executor().submit(self.loader.frame, index)
+
+    def _submit(self, index):
+        with self._lock:
+            future = self._pending.get(index)
+            started = future is None
+            if started:
+                future = self._start_decode(index)
+                self._pending[index] = future
+        # Outside the lock: a decode that already finished runs the callback
+        # right here, and _finish takes the lock itself
+        if started:
+            future.add_done_callback(lambda done, index=index: self._finish(index, done))
+        return future
+
+    def _finish(self, index, future):
+        with self._lock:
+            self._pending.pop(index, None)
+        if not future.cancelled() and future.exception() is None:
+            self.cache.put(index, future.result())
+
+    def frame(self, index):
+        if not 0 <= index < self.num_frames:
+            raise IndexError(f"Frame {index} out of range. File has {self.num_frames} frames")
+
+        cached = self.cache.get(index)
+        future = None if cached is not None else self._submit(index)
+
+        direction = -1 if self._last_index is not None and index < self._last_index else 1
+        self._last_index = index
+        for step in range(1, self.prefetch + 1):
+            neighbour = index + direction * step
+            if 0 <= neighbour < self.num_frames and neighbour not in self.cache:
+                self._submit(neighbour)
+
+        return cached if future is None else future.result()
+
+    def iter_frames(self, window=None):
+        """Yield every frame in order, decoding up to `window` frames ahead without caching them.
+
+        Frames already cached or being decoded (e.g. prefetched) are reused.
+        """
+        window = window or 2 * (self.max_workers or os.cpu_count() or 1)
+        queued = deque()
+        for index in range(self.num_frames):
+            cached = self.cache.get(index)
+            queued.append(cached if cached is not None else self._pending_or_start(index))
+            if len(queued) > window:
+                yield self._resolve(queued.popleft())
+        while queued:
+            yield self._resolve(queued.popleft())
+
+    def _pending_or_start(self, index):
+        with self._lock:
+            return self._pending.get(index) or self._start_decode(index)
+
+    @staticmethod
+    def _resolve(item):
+        return item.result() if hasattr(item, 'result') else item
+
+    def stats(self):
+        stats = self.cache.stats()
+        stats['pending'] = len(self._pending)
+        return stats
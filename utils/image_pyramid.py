@@ -0,0 +1,49 @@
+import numpy as np
+
+MIN_LEVEL_SIZE = 256
+
+
+class ImagePyramid:
+    """Area-averaged 2x levels of an image, full resolution first.
+
+    `key` identifies the source content (an upload hash) so renderings of
+    the pyramid can be cached across reruns.
+    """
+
+    def __init__(self, image, min_size=MIN_LEVEL_SIZE, key=None):
+        import cv2
+
+        self.key = key
+        self.levels = [np.ascontiguousarray(image)]
+        while max(self.levels[-1].shape[:2]) > min_size:
+            height, width = self.levels[-1].shape[:2]
+            self.levels.append(cv2.resize(self.levels[-1], ((width + 1) // 2, (height + 1) // 2),
+                                          interpolation=cv2.INTER_AREA))
+        self.nbytes = sum(level.nbytes for level in self.levels)
+
+    def full(self):
+        return self.levels[0]
+
+    def level_for(self, viewport_width):
+        """Smallest level at least `viewport_width` pixels wide (full resolution if none is)."""
+        for level in reversed(self.levels):
+            if level.shape[1] >= viewport_width:
+                return level
+        return self.levels[0]
+
+    def crop(self, center_x, center_y, size):
+        height, width = self.levels[0].shape[:2]
+        x0 = min(max(center_x - size // 2, 0), max(width - size, 0))
+        y0 = min(max(center_y - size // 2, 0), max(height - size, 0))
+        return self.levels[0][y0:y0 + size, x0:x0 + size]
+
+
+def downscale(image, max_width):
+    """Area-average an image down to `max_width` columns if it is wider."""
+    import cv2
+
+    height, width = image.shape[:2]
+    if width <= max_width:
+        return image
+    new_height = max(1, round(height * max_width / width))
+    return cv2.resize(np.ascontiguousarray(image), (max_width, new_height), interpolation=cv2.INTER_AREA)
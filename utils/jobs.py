@@ -0,0 +1,193 @@
+import os
+import time
+import uuid
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.streaming_stats import RunningStats
+
+DEFAULT_WORKERS = max(1, min(4, (os.cpu_count() or 1) // 2))
+DEFAULT_MAX_QUEUED = 16
+DEFAULT_RETAIN_SECONDS = 3600
+DEFAULT_RETAIN_JOBS = 256
+WAIT_HISTORY = 500
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+
+class QueueFull(Exception):
+    pass
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    """One submitted pipeline run; the function reports progress through `update`."""
+
+    def __init__(self, name, session=None):
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.session = session
+        self.state = QUEUED
+        self.progress = 0.0
+        self.message = 'Waiting for a worker...'
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.future = None
+        self._cancel = threading.Event()
+
+    def update(self, progress=None, message=None):
+        """Report progress (0..1) from inside the job; raises JobCancelled once cancel() was requested."""
+        if self._cancel.is_set():
+            raise JobCancelled()
+        if progress is not None:
+            self.progress = min(1.0, max(0.0, progress))
+        if message is not None:
+            self.message = message
+
+    def cancel(self):
+        """Drop a queued job, or stop a running one at its next `update` call."""
+        self._cancel.set()
+        if self.future is not None and self.future.cancel():
+            self._finish(CANCELLED)
+
+    @property
+    def cancel_requested(self):
+        return self._cancel.is_set()
+
+    @property
+    def finished(self):
+        return self.state in FINISHED_STATES
+
+    def wait_time(self):
+        """Seconds spent queued so far, or before a worker picked it up."""
+        return (self.started_at or time.time()) - self.submitted_at
+
+    def run_time(self):
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+    def _finish(self, state, result=None, error=None):
+        self.state = state
+        self.result = result
+        self.error = error
+        self.finished_at = time.time()
+        if state == DONE:
+            self.progress = 1.0
+            self.message = 'Finished'
+        elif state == CANCELLED:
+            self.message = 'Cancelled'
+        else:
+            self.message = f'Failed: {error}'
+
+
+class JobQueue:
+    """Bounded worker pool for long pipeline runs, shared by every Streamlit session.
+
+    Jobs outlive the script run that submitted them, so a rerun only has to
+    look the job up again by id. Submissions beyond `max_queued` waiting jobs
+    are refused with QueueFull instead of growing the backlog without limit.
+    """
+
+    def __init__(self, max_workers=DEFAULT_WORKERS, max_queued=DEFAULT_MAX_QUEUED,
+                 retain_seconds=DEFAULT_RETAIN_SECONDS, retain_jobs=DEFAULT_RETAIN_JOBS):
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.retain_seconds = retain_seconds
+        self.retain_jobs = retain_jobs
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='stego-job')
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._waits = deque(maxlen=WAIT_HISTORY)
+        self.submitted = 0
+        self.rejected = 0
+        self.completed = 0
+
+    def submit(self, name, func, *args, session=None, **kwargs):
+        """Queue `func(job, *args, **kwargs)`; its return value becomes `job.result`."""
+        job = Job(name, session)
+        with self._lock:
+            self._expire()
+            if self._count(QUEUED) >= self.max_queued:
+                self.rejected += 1
+                raise QueueFull(f"{self.max_queued} jobs are already waiting; try again shortly")
+            self._jobs[job.id] = job
+            self.submitted += 1
+            job.future = self._executor.submit(self._run, job, func, args, kwargs)
+        return job
+
+    def _run(self, job, func, args, kwargs):
+        if job.cancel_requested:
+            job._finish(CANCELLED)
+            return
+        job.started_at = time.time()
+        job.state = RUNNING
+        job.message = 'Starting...'
+        with self._lock:
+            self._waits.append(job.wait_time())
+        try:
+            result = func(job, *args, **kwargs)
+        except JobCancelled:
+            job._finish(CANCELLED)
+        except Exception as e:
+            job._finish(FAILED, error=str(e) or type(e).__name__)
+        else:
+            job._finish(DONE, result=result)
+        with self._lock:
+            self.completed += 1
+
+    def get(self, job_id):
+        return self._jobs.get(job_id) if job_id else None
+
+    def jobs(self, session=None):
+        """Jobs still retained, newest first, optionally for one session."""
+        jobs = [job for job in list(self._jobs.values()) if session is None or job.session == session]
+        return sorted(jobs, key=lambda job: job.submitted_at, reverse=True)
+
+    def _count(self, state):
+        return sum(job.state == state for job in self._jobs.values())
+
+    def _expire(self):
+        # Finished results (images, heatmaps) are kept for a while so the
+        # submitting session can still render them after a rerun
+        cutoff = time.time() - self.retain_seconds
+        finished = sorted((job for job in self._jobs.values() if job.finished), key=lambda job: job.finished_at)
+        excess = len(self._jobs) - self.retain_jobs
+        for job in finished:
+            if job.finished_at < cutoff or excess > 0:
+                del self._jobs[job.id]
+                excess -= 1
+
+    def stats(self):
+        """Queue length, running jobs and wait times for capacity planning."""
+        with self._lock:
+            waits = list(self._waits)
+            queued = [job for job in self._jobs.values() if job.state == QUEUED]
+            running = self._count(RUNNING)
+        wait_stats = RunningStats()
+        for wait in waits:
+            wait_stats.add(wait)
+        return {
+            'workers': self.max_workers,
+            'max_queued': self.max_queued,
+            'queued': len(queued),
+            'running': running,
+            'oldest_wait': max((job.wait_time() for job in queued), default=0.0),
+            'mean_wait': wait_stats.mean,
+            'p95_wait': wait_stats.quantile(0.95) or 0.0,
+            'submitted': self.submitted,
+            'completed': self.completed,
+            'rejected': self.rejected
+        }
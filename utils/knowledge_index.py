@@ -0,0 +1,194 @@
+import os
+import re
+import ast
+import math
+import inspect
+import threading
+from collections import Counter
+
+PAGES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'pages')
+# The assistant's own page only describes the assistant
+INDEXED_PAGES = ('home.py', 'encrypt_embed.py', 'extract_decrypt.py', 'dicom_viewer.py', 'analytics.py')
+TEXT_CALLS = {'markdown', 'info', 'success', 'warning', 'caption'}
+MIN_TEXT_CHARS = 40
+MAX_PASSAGE_CHARS = 700
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+# A passage answers a question on its own when it matches at least this
+# share of the question's IDF-weighted terms and has a score this high
+CONFIDENT_COVERAGE = 0.8
+CONFIDENT_SCORE = 4.0
+MIN_CONFIDENT_TERMS = 2
+# Without a model, weaker matches are still listed when they cover this much of the question
+OFFLINE_MIN_COVERAGE = 0.3
+
+STOPWORDS = frozenset("""
+a an and are as at be been but by can could do does did for from has have how i if in into is it its
+me my of on or our should so that the their them then there these this those to was we were what when
+where which who why will with would you your about tell explain work works mean means please system
+""".split())
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def shared_knowledge_index():
+    """Index over the system prompt and page texts, built once per process."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            from utils.chat import SYSTEM_PROMPT
+
+            _index = KnowledgeIndex(load_passages(system_prompt=SYSTEM_PROMPT))
+        return _index
+
+
+def tokenize(text):
+    terms = []
+    for word in re.findall(r'[a-z0-9]+', text.lower()):
+        if word in STOPWORDS or len(word) < 2:
+            continue
+        if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+        terms.append(word)
+    return terms
+
+
+def split_sections(text, title):
+    """Markdown split at headings and bold-only lines, long sections further at blank lines."""
+    sections = []
+    heading, lines = title, []
+    for line in text.splitlines():
+        stripped = line.strip()
+        is_heading = stripped.startswith('#') or (stripped.startswith('**') and stripped.endswith('**')
+                                                  and stripped.count('**') == 2)
+        if is_heading or stripped == '---':
+            if any(l.strip() for l in lines):
+                sections.append((heading, '\n'.join(lines).strip()))
+            lines = []
+            if is_heading:
+                heading = stripped.strip('#* ').rstrip(':')
+                lines = [line]
+            continue
+        lines.append(line)
+    if any(l.strip() for l in lines):
+        sections.append((heading, '\n'.join(lines).strip()))
+    # A heading on its own (e.g. a page subtitle) answers nothing
+    sections = [(heading, body) for heading, body in sections
+                if '\n' in body or not body.lstrip().startswith(('#', '**'))]
+
+    passages = []
+    for heading, body in sections:
+        while len(body) > MAX_PASSAGE_CHARS:
+            cut = body.rfind('\n\n', 0, MAX_PASSAGE_CHARS)
+            cut = cut if cut > 0 else body.rfind('\n', 0, MAX_PASSAGE_CHARS)
+            if cut <= 0:
+                break
+            passages.append((heading, body[:cut].strip()))
+            body = body[cut:].strip()
+        passages.append((heading, body))
+    return passages
+
+
+def page_texts(path):
+    """(page title, [(label, text)]) of a page's markdown/info texts and widget help strings."""
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read(), path)
+
+    def constant(node):
+        return node.value if isinstance(node, ast.Constant) and isinstance(node.value, str) else None
+
+    title = os.path.splitext(os.path.basename(path))[0].replace('_', ' ').title()
+    texts = []
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.Call) or not isinstance(node.func, ast.Attribute):
+            continue
+        first = constant(node.args[0]) if node.args else None
+        if node.func.attr == 'title' and first:
+            title = first.lstrip('🏥🔐🔓🩺📊🤖 ').strip()
+        elif node.func.attr in TEXT_CALLS and first and len(first) >= MIN_TEXT_CHARS:
+            texts.append((None, inspect.cleandoc(first)))
+        for keyword in node.keywords:
+            help_text = constant(keyword.value) if keyword.arg == 'help' else None
+            if help_text:
+                texts.append((first, f"{first}: {help_text}" if first else help_text))
+    return title, texts
+
+
+def load_passages(pages=INDEXED_PAGES, system_prompt=None):
+    passages = []
+    if system_prompt:
+        # Only the knowledge bullets; the rest instructs the model
+        for line in system_prompt.splitlines():
+            if line.startswith('- '):
+                topic = line[2:].split(':', 1)[0]
+                passages.append({'source': 'Assistant knowledge', 'title': topic, 'text': line})
+    for name in pages:
+        title, texts = page_texts(os.path.join(PAGES_DIR, name))
+        for label, text in texts:
+            for heading, section in split_sections(text, label or title):
+                passages.append({'source': title, 'title': heading, 'text': section})
+    return passages
+
+
+class KnowledgeIndex:
+    """Okapi BM25 over short passages, with a confidence measure for answering without the model."""
+
+    def __init__(self, passages):
+        self.passages = passages
+        self._terms = [Counter(tokenize(f"{p['title']} {p['text']}")) for p in passages]
+        self._lengths = [sum(terms.values()) for terms in self._terms]
+        self._average_length = sum(self._lengths) / len(self._lengths) if passages else 0.0
+        document_frequency = Counter(term for terms in self._terms for term in terms)
+        n = len(passages)
+        self._idf = {term: math.log(1 + (n - df + 0.5) / (df + 0.5)) for term, df in document_frequency.items()}
+        # Words found nowhere weigh like the rarest ones, so off-topic questions get a low coverage
+        self._unknown_idf = math.log(1 + (n + 0.5) / 0.5)
+
+    def search(self, query, k=3):
+        """Top `k` passages as dicts with 'score' and 'coverage' (share of the query's IDF weight matched)."""
+        terms = set(tokenize(query))
+        weight = sum(self._idf.get(term, self._unknown_idf) for term in terms)
+        results = []
+        for index, passage_terms in enumerate(self._terms):
+            score = matched = 0.0
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * self._lengths[index] / (self._average_length or 1))
+            for term in terms:
+                tf = passage_terms.get(term)
+                if tf:
+                    idf = self._idf[term]
+                    score += idf * tf * (BM25_K1 + 1) / (tf + norm)
+                    matched += idf
+            if score > 0:
+                results.append(dict(self.passages[index], score=score, coverage=matched / weight,
+                                    query_terms=len(terms)))
+        results.sort(key=lambda result: result['score'], reverse=True)
+        return results[:k]
+
+    @staticmethod
+    def is_confident(result):
+        return result['coverage'] >= CONFIDENT_COVERAGE and result['score'] >= CONFIDENT_SCORE \
+            and result['query_terms'] >= MIN_CONFIDENT_TERMS
+
+
+def format_answer(results):
+    """Markdown answer quoting the best passage and where it comes from."""
+    best = results[0]
+    return f"{best['text']}\n\n*From the system documentation: {best['source']} — {best['title']}*"
+
+
+def format_snippets(results):
+    """Retrieved passages as context for the model's system prompt."""
+    return "Relevant excerpts from this system's own pages:\n\n" + "\n\n".join(
+        f"[{result['source']} — {result['title']}]\n{result['text']}" for result in results)
+
+
+def format_offline_answer(results):
+    """Reply when no model is configured and no passage is a confident match."""
+    results = [result for result in results if result['coverage'] >= OFFLINE_MIN_COVERAGE]
+    if not results:
+        return ("I couldn't find this in the system's documentation, and the AI model is not configured "
+                "to answer other questions.")
+    return ("The AI model is not configured, so here are the closest matches from the system's documentation:\n\n"
+            + "\n\n".join(f"**{result['source']} — {result['title']}**\n\n{result['text']}" for result in results))
@@ -2,28 +2,44 @@ import numpy as np
 from PIL import Image
 import time
 
+from utils.tracing import span, traced, current_span
+
 class LSBSteganography:
     def __init__(self):
         self.end_marker = '000111000111'
     
+    @traced('lsb.text_to_binary')
     def text_to_binary(self, text):
         binary = ''.join(format(ord(char), '08b') for char in text)
         return binary
     
+    @traced('lsb.binary_to_text')
     def binary_to_text(self, binary):
         chars = [binary[i:i+8] for i in range(0, len(binary), 8)]
         text = ''.join(chr(int(char, 2)) for char in chars if len(char) == 8)
         return text
     
+    def _load(self, image):
+        # Decoded RGB arrays (e.g. cached uploads) are used as they are; flatten() copies them
+        if isinstance(image, np.ndarray):
+            return image
+        with span('image.decode', path=image) as decode:
+            img = Image.open(image)
+            img = img.convert('RGB')
+            img_array = np.array(img)
+            decode.set(shape=img_array.shape)
+            decode.add_arrays(img_array)
+        return img_array
+    
+    @traced('embed')
     def embed(self, image_path, secret_data):
-        start_time = time.time()
+        start_time = time.perf_counter()
         
-        img = Image.open(image_path)
-        img = img.convert('RGB')
-        img_array = np.array(img)
+        img_array = self._load(image_path)
         
         original_shape = img_array.shape
         flat_img = img_array.flatten()
+        current_span().add_arrays(flat_img)
         
         binary_data = self.text_to_binary(secret_data)
         binary_data_with_marker = binary_data + self.end_marker
@@ -34,13 +50,17 @@ class LSBSteganography:
         if data_length > max_bytes:
             raise ValueError(f"Image too small. Need {data_length} pixels, have {max_bytes}")
         
-        for i in range(data_length):
-            flat_img[i] = (flat_img[i] & 0xFE) | int(binary_data_with_marker[i])
+        with span('lsb.embed_bits', bits=data_length):
+            for i in range(data_length):
+                flat_img[i] = (flat_img[i] & 0xFE) | int(binary_data_with_marker[i])
         
-        stego_array = flat_img.reshape(original_shape)
-        stego_img = Image.fromarray(stego_array.astype('uint8'), 'RGB')
+        with span('image.build') as build:
+            stego_array = flat_img.reshape(original_shape)
+            stego_uint8 = stego_array.astype('uint8')
+            build.add_arrays(stego_uint8)
+            stego_img = Image.fromarray(stego_uint8, 'RGB')
         
-        embedding_time = time.time() - start_time
+        embedding_time = time.perf_counter() - start_time
         
         return {
             'stego_image': stego_img,
@@ -50,27 +70,31 @@ class LSBSteganography:
             'image_size': original_shape
         }
     
+    @traced('extract')
     def extract(self, stego_image_path):
-        start_time = time.time()
+        start_time = time.perf_counter()
         
-        img = Image.open(stego_image_path)
-        img = img.convert('RGB')
-        img_array = np.array(img)
+        img_array = self._load(stego_image_path)
         
         flat_img = img_array.flatten()
+        current_span().add_arrays(flat_img)
         
-        binary_data = ''
-        for pixel_value in flat_img:
-            binary_data += str(pixel_value & 1)
-            
-            if len(binary_data) >= len(self.end_marker):
-                if binary_data[-len(self.end_marker):] == self.end_marker:
-                    binary_data = binary_data[:-len(self.end_marker)]
-                    break
+        with span('lsb.extract_bits') as scan:
+            binary_data = ''
+            for pixel_value in flat_img:
+                binary_data += str(pixel_value & 1)
+                
+                # The payload is whole 8-bit characters, so the marker can only start on a
+                # byte boundary; elsewhere its bits may just be the payload's tail
+                if len(binary_data) >= len(self.end_marker) and (len(binary_data) - len(self.end_marker)) % 8 == 0:
+                    if binary_data[-len(self.end_marker):] == self.end_marker:
+                        binary_data = binary_data[:-len(self.end_marker)]
+                        break
+            scan.set(bits=len(binary_data))
         
         secret_data = self.binary_to_text(binary_data)
         
-        extraction_time = time.time() - start_time
+        extraction_time = time.perf_counter() - start_time
         
         return {
             'extracted_data': secret_data,
@@ -1,16 +1,29 @@
 import numpy as np
 from PIL import Image
-from skimage.metrics import peak_signal_noise_ratio, structural_similarity
-import cv2
-import matplotlib.pyplot as plt
-import matplotlib
-matplotlib.use('Agg')
+from utils.tiled_metrics import TiledImageMetrics
+from utils.tracing import span, traced, current_span
 
 class ImageMetrics:
+    """Quality metrics between a cover and a stego image, given as file paths or decoded RGB arrays."""
+
+    tiled = TiledImageMetrics()
+
     @staticmethod
-    def calculate_psnr(original_image_path, stego_image_path):
-        img1 = cv2.imread(original_image_path)
-        img2 = cv2.imread(stego_image_path)
+    def _read(image):
+        import cv2
+
+        if isinstance(image, np.ndarray):
+            # OpenCV order, as cv2.imread would return it
+            return np.ascontiguousarray(image[..., ::-1]) if image.ndim == 3 else image
+        return cv2.imread(image)
+
+    @staticmethod
+    @traced('metrics.read_images')
+    def _read_pair(original_image_path, stego_image_path):
+        import cv2
+
+        img1 = ImageMetrics._read(original_image_path)
+        img2 = ImageMetrics._read(stego_image_path)
         
         if img1 is None or img2 is None:
             return None
@@ -18,25 +31,26 @@ class ImageMetrics:
         if img1.shape != img2.shape:
             img2 = cv2.resize(img2, (img1.shape[1], img1.shape[0]))
         
-        psnr_value = peak_signal_noise_ratio(img1, img2)
-        return psnr_value
+        current_span().add_arrays(img1, img2)
+        return img1, img2
+
+    @staticmethod
+    @traced('metrics.psnr')
+    def calculate_psnr(original_image_path, stego_image_path):
+        images = ImageMetrics._read_pair(original_image_path, stego_image_path)
+        if images is None:
+            return None
+        
+        return ImageMetrics.tiled.psnr(*images)
     
     @staticmethod
+    @traced('metrics.ssim')
     def calculate_ssim(original_image_path, stego_image_path):
-        img1 = cv2.imread(original_image_path)
-        img2 = cv2.imread(stego_image_path)
-        
-        if img1 is None or img2 is None:
+        images = ImageMetrics._read_pair(original_image_path, stego_image_path)
+        if images is None:
             return None
         
-        if img1.shape != img2.shape:
-            img2 = cv2.resize(img2, (img1.shape[1], img1.shape[0]))
-        
-        img1_gray = cv2.cvtColor(img1, cv2.COLOR_BGR2GRAY)
-        img2_gray = cv2.cvtColor(img2, cv2.COLOR_BGR2GRAY)
-        
-        ssim_value = structural_similarity(img1_gray, img2_gray)
-        return ssim_value
+        return ImageMetrics.tiled.ssim(*images)
     
     @staticmethod
     def get_image_info(image_path):
@@ -50,66 +64,49 @@ class ImageMetrics:
         }
     
     @staticmethod
+    @traced('metrics.heatmap')
     def create_difference_heatmap(original_image_path, stego_image_path):
-        img1 = cv2.imread(original_image_path)
-        img2 = cv2.imread(stego_image_path)
-
-        if img1 is None or img2 is None:
+        images = ImageMetrics._read_pair(original_image_path, stego_image_path)
+        if images is None:
             return None
 
-        if img1.shape != img2.shape:
-            img2 = cv2.resize(img2, (img1.shape[1], img1.shape[0]))
+        # The Figure/Agg API keeps no global pyplot state, so heatmaps can be
+        # rendered on job worker threads
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
 
-        diff = cv2.absdiff(img1, img2)
-        diff_magnitude = np.sqrt(np.sum(diff**2, axis=2))
+        diff_magnitude = ImageMetrics.tiled.difference_magnitude(*images)
 
         diff_normalized = (diff_magnitude - diff_magnitude.min()) / (diff_magnitude.max() - diff_magnitude.min() + 1e-8)
         diff_normalized = (diff_normalized * 255).astype(np.uint8)
+        current_span().add_arrays(diff_magnitude, diff_normalized)
 
-        fig, ax = plt.subplots(figsize=(10, 8))
-        im = ax.imshow(diff_normalized, cmap='hot', interpolation='nearest')
-        ax.set_title('Pixel Difference Heatmap (LSB Changes)', fontsize=14, fontweight='bold')
-        ax.axis('off')
-
-        cbar = plt.colorbar(im, ax=ax, fraction=0.046, pad=0.04)
-        cbar.set_label('Difference Magnitude', rotation=270, labelpad=20)
+        with span('heatmap.render'):
+            fig = Figure(figsize=(10, 8))
+            canvas = FigureCanvasAgg(fig)
+            ax = fig.subplots()
+            im = ax.imshow(diff_normalized, cmap='hot', interpolation='nearest')
+            ax.set_title('Pixel Difference Heatmap (LSB Changes)', fontsize=14, fontweight='bold')
+            ax.axis('off')
 
-        plt.tight_layout()
-        fig.canvas.draw()
+            cbar = fig.colorbar(im, ax=ax, fraction=0.046, pad=0.04)
+            cbar.set_label('Difference Magnitude', rotation=270, labelpad=20)
 
-        # FIXED for Matplotlib 3.8+
-        rgba = np.asarray(fig.canvas.buffer_rgba())
-        heatmap_array = rgba[..., :3]
+            fig.tight_layout()
+            canvas.draw()
 
-        plt.close(fig)
+            rgba = np.asarray(canvas.buffer_rgba())
+            heatmap_array = rgba[..., :3]
+            current_span().add_arrays(rgba)
 
         heatmap_image = Image.fromarray(heatmap_array)
         return heatmap_image
     
     @staticmethod
+    @traced('metrics.difference_stats')
     def calculate_difference_stats(original_image_path, stego_image_path):
-        img1 = cv2.imread(original_image_path)
-        img2 = cv2.imread(stego_image_path)
-        
-        if img1 is None or img2 is None:
+        images = ImageMetrics._read_pair(original_image_path, stego_image_path)
+        if images is None:
             return None
         
-        if img1.shape != img2.shape:
-            img2 = cv2.resize(img2, (img1.shape[1], img1.shape[0]))
-        
-        diff = cv2.absdiff(img1, img2)
-        
-        total_pixels = img1.shape[0] * img1.shape[1] * img1.shape[2]
-        changed_pixels = np.count_nonzero(diff)
-        change_percentage = (changed_pixels / total_pixels) * 100
-        
-        diff_magnitude = np.sqrt(np.sum(diff**2, axis=2))
-        
-        return {
-            'total_pixels': total_pixels,
-            'changed_pixels': changed_pixels,
-            'change_percentage': change_percentage,
-            'max_difference': np.max(diff_magnitude),
-            'mean_difference': np.mean(diff_magnitude),
-            'std_difference': np.std(diff_magnitude)
-        }
+        return ImageMetrics.tiled.difference_stats(*images)
@@ -0,0 +1,390 @@
+import os
+import json
+import time
+import queue
+import sqlite3
+import threading
+from collections import deque
+
+from utils.lru_cache import LRUCache
+from utils.streaming_stats import RunningStats, lttb
+
+DEFAULT_DB_PATH = os.environ.get('STEGO_METRICS_DB', os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'metrics.db'))
+DEFAULT_BATCH_SIZE = 256
+DEFAULT_FLUSH_INTERVAL = 0.5
+DEFAULT_RING_SIZE = 1000
+
+# Rollup interval lengths in seconds; charts use the finest level that
+# covers the requested range with at most MAX_ROLLUPS_PER_QUERY intervals,
+# summaries the finest with at most MAX_ROLLUPS_PER_SUMMARY
+ROLLUP_LEVELS = (60, 3600, 86400)
+MAX_ROLLUPS_PER_QUERY = 1500
+MAX_ROLLUPS_PER_SUMMARY = 200
+SESSION_CACHE_ENTRIES = 256
+DEFAULT_CHART_POINTS = 300
+
+# Traced spans whose memory is recorded per operation kind, as {span name: column prefix}
+MEMORY_STAGES = {
+    'encryption': {'encrypt': 'encrypt', 'embed': 'embed', 'metrics.psnr': 'psnr', 'metrics.ssim': 'ssim',
+                   'metrics.difference_stats': 'difference_stats', 'metrics.heatmap': 'heatmap'},
+    'decryption': {'extract': 'extract', 'decrypt': 'decrypt'},
+}
+
+
+def memory_columns(kind):
+    return tuple(f'{prefix}_{field}' for prefix in MEMORY_STAGES[kind].values()
+                 for field in ('peak_bytes', 'array_bytes'))
+
+
+# Columns recorded per operation kind, besides the id, timestamp and session
+METRIC_COLUMNS = {
+    'encryption': ('message_length', 'encryption_time', 'embedding_time', 'psnr', 'ssim',
+                   'dna_length', 'used_aes', 'queue_wait') + memory_columns('encryption'),
+    'decryption': ('message_length', 'extraction_time', 'decryption_time', 'total_time',
+                   'queue_wait') + memory_columns('decryption'),
+    # prompt_tokens is the local estimate of what was sent to the API (0 when answered from
+    # the cache, or locally from the knowledge index)
+    'chat': ('prompt_tokens', 'context_messages', 'dropped_messages', 'response_time', 'cached', 'local'),
+}
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def shared_store(path=None):
+    """Process-wide store per database file, shared by every Streamlit session."""
+    path = path or DEFAULT_DB_PATH
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = MetricsStore(path)
+        return _stores[path]
+
+
+class Rollup:
+    """Running statistics of every metric column over one time interval."""
+
+    def __init__(self, kind, stats=None):
+        self.kind = kind
+        self.stats = stats or {column: RunningStats() for column in METRIC_COLUMNS[kind]}
+        self.count = max((s.count for s in self.stats.values()), default=0)
+
+    def add(self, row):
+        self.count += 1
+        for column, stats in self.stats.items():
+            stats.add(row.get(column))
+
+    def merge(self, other):
+        self.count += other.count
+        for column, stats in other.stats.items():
+            self.stats.setdefault(column, RunningStats()).merge(stats)
+
+    def to_json(self):
+        return json.dumps({'count': self.count, 'stats': {c: s.to_dict() for c, s in self.stats.items()}})
+
+    @classmethod
+    def from_json(cls, kind, text):
+        state = json.loads(text)
+        rollup = cls(kind)
+        rollup.stats.update({c: RunningStats.from_dict(s) for c, s in state['stats'].items()})
+        rollup.count = state['count']
+        return rollup
+
+
+class MetricsStore:
+    """Append-only SQLite (WAL) store of operation metrics with incremental rollups.
+
+    `record` never touches the database: entries go to an in-memory ring
+    buffer of recent points and to a queue drained by a writer thread, which
+    inserts them in batches of up to `batch_size` rows per transaction. The
+    same transaction updates per-minute, per-hour and per-day rollups
+    (count, mean, min/max and a quantile sketch per column), so summaries
+    and charts merge a bounded number of rollups however many operations
+    are stored. Query ranges are resolved to whole rollup intervals.
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH, batch_size=DEFAULT_BATCH_SIZE,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL, ring_size=DEFAULT_RING_SIZE):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.ring_size = ring_size
+        self._queue = queue.Queue()
+        self._local = threading.local()
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._ring_lock = threading.Lock()
+        self._rollups = LRUCache(max_entries=1024)
+        self._closed_rollups = LRUCache(max_entries=4 * MAX_ROLLUPS_PER_QUERY)
+        self._sessions = LRUCache(max_entries=SESSION_CACHE_ENTRIES)
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._create_schema()
+        self._recent = {kind: deque(self._load_recent(kind), maxlen=ring_size) for kind in METRIC_COLUMNS}
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _reader(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def _create_schema(self):
+        conn = self._connect()
+        with conn:
+            for kind, columns in METRIC_COLUMNS.items():
+                conn.execute(f'CREATE TABLE IF NOT EXISTS {kind} '
+                             '(id INTEGER PRIMARY KEY, ts REAL NOT NULL, session TEXT)')
+                existing = {row['name'] for row in conn.execute(f'PRAGMA table_info({kind})')}
+                for column in columns:
+                    if column not in existing:
+                        conn.execute(f'ALTER TABLE {kind} ADD COLUMN {column} REAL')
+                conn.execute(f'CREATE INDEX IF NOT EXISTS {kind}_ts ON {kind} (ts)')
+                conn.execute(f'CREATE INDEX IF NOT EXISTS {kind}_session_ts ON {kind} (session, ts)')
+            conn.execute('CREATE TABLE IF NOT EXISTS rollups (kind TEXT NOT NULL, level INTEGER NOT NULL, '
+                         'bucket INTEGER NOT NULL, state TEXT NOT NULL, PRIMARY KEY (kind, level, bucket)) '
+                         'WITHOUT ROWID')
+
+        # Databases written before rollups existed get them built once from the raw rows
+        has_rows = any(conn.execute(f'SELECT 1 FROM {kind} LIMIT 1').fetchone() for kind in METRIC_COLUMNS)
+        has_rollups = conn.execute('SELECT 1 FROM rollups LIMIT 1').fetchone()
+        conn.close()
+        if has_rows and not has_rollups:
+            self.rebuild_rollups()
+
+    def _load_recent(self, kind):
+        rows = self._reader().execute(
+            f'SELECT * FROM {kind} ORDER BY ts DESC LIMIT ?', (self.ring_size,)).fetchall()
+        return [dict(row) for row in reversed(rows)]
+
+    def record(self, kind, entry, session=None):
+        if kind not in METRIC_COLUMNS:
+            raise ValueError(f"Unknown metric kind: {kind}")
+
+        row = {'ts': time.time(), 'session': session}
+        row.update({column: entry.get(column) for column in METRIC_COLUMNS[kind]})
+        with self._ring_lock:
+            self._recent[kind].append(row)
+        self._ensure_writer()
+        self._queue.put((kind, row))
+
+    def _ensure_writer(self):
+        with self._writer_lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._write_loop, name='metrics-writer', daemon=True)
+                self._writer.start()
+
+    def _write_loop(self):
+        conn = self._connect()
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            try:
+                with self._write_lock:
+                    self._insert(conn, batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _insert(self, conn, batch):
+        by_kind = {}
+        touched = {}
+        for kind, row in batch:
+            by_kind.setdefault(kind, []).append(row)
+            for level in ROLLUP_LEVELS:
+                key = (kind, level, int(row['ts'] // level) * level)
+                rollup = touched.get(key) or self._rollups.get(key) or self._load_rollup(conn, key)
+                rollup.add(row)
+                touched[key] = rollup
+            if row['session'] is not None:
+                self._session_rollup(row['session'], kind, int(row['ts'] // ROLLUP_LEVELS[0]) * ROLLUP_LEVELS[0]).add(row)
+
+        with conn:
+            for kind, rows in by_kind.items():
+                columns = ('ts', 'session') + METRIC_COLUMNS[kind]
+                conn.executemany(
+                    f"INSERT INTO {kind} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                    [tuple(row[column] for column in columns) for row in rows]
+                )
+            conn.executemany('INSERT OR REPLACE INTO rollups (kind, level, bucket, state) VALUES (?, ?, ?, ?)',
+                             [key + (rollup.to_json(),) for key, rollup in touched.items()])
+        for key, rollup in touched.items():
+            self._rollups.put(key, rollup)
+
+    @staticmethod
+    def _load_rollup(conn, key):
+        row = conn.execute('SELECT state FROM rollups WHERE kind = ? AND level = ? AND bucket = ?', key).fetchone()
+        return Rollup.from_json(key[0], row['state']) if row else Rollup(key[0])
+
+    def _session_rollup(self, session, kind, bucket):
+        rollups = self._sessions.get(session)
+        if rollups is None:
+            rollups = {}
+            self._sessions.put(session, rollups)
+        if (kind, bucket) not in rollups:
+            rollups[(kind, bucket)] = Rollup(kind)
+        return rollups[(kind, bucket)]
+
+    def rebuild_rollups(self, chunk_size=50000):
+        """Recompute every rollup from the raw rows (after deletions or on upgrade)."""
+        with self._write_lock:
+            conn = self._connect()
+            rebuilt = {}
+            for kind in METRIC_COLUMNS:
+                last_id = 0
+                while True:
+                    rows = conn.execute(f'SELECT * FROM {kind} WHERE id > ? ORDER BY id LIMIT ?',
+                                        (last_id, chunk_size)).fetchall()
+                    if not rows:
+                        break
+                    last_id = rows[-1]['id']
+                    for row in rows:
+                        row = dict(row)
+                        for level in ROLLUP_LEVELS:
+                            key = (kind, level, int(row['ts'] // level) * level)
+                            rebuilt.setdefault(key, Rollup(kind)).add(row)
+            with conn:
+                conn.execute('DELETE FROM rollups')
+                conn.executemany('INSERT INTO rollups (kind, level, bucket, state) VALUES (?, ?, ?, ?)',
+                                 [key + (rollup.to_json(),) for key, rollup in rebuilt.items()])
+            conn.close()
+            self._rollups.clear()
+            self._closed_rollups.clear()
+
+    def flush(self):
+        """Block until every recorded entry has been written."""
+        self._queue.join()
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def _first_bucket(self, kind):
+        row = self._reader().execute('SELECT MIN(bucket) FROM rollups WHERE kind = ? AND level = ?',
+                                     (kind, ROLLUP_LEVELS[-1])).fetchone()
+        return row[0]
+
+    def _rollups_in_range(self, kind, since, until, session, max_rollups):
+        """(interval length, [(interval start, Rollup), ...]) covering the range, oldest first."""
+        now = time.time()
+        until = now if until is None else until
+
+        if session is not None:
+            level = ROLLUP_LEVELS[0]
+            with self._write_lock:
+                rollups = dict(self._sessions.get(session) or {})
+            start = -float('inf') if since is None else since // level * level
+            return level, sorted((bucket, rollup) for (rollup_kind, bucket), rollup in rollups.items()
+                                 if rollup_kind == kind and start <= bucket <= until)
+
+        if since is None:
+            since = self._first_bucket(kind)
+            if since is None:
+                return ROLLUP_LEVELS[0], []
+        level = next((level for level in ROLLUP_LEVELS if (until - since) / level <= max_rollups),
+                     ROLLUP_LEVELS[-1])
+        params = (kind, level, int(since // level) * level, until)
+        buckets = [row[0] for row in self._reader().execute(
+            'SELECT bucket FROM rollups WHERE kind = ? AND level = ? AND bucket >= ? AND bucket <= ? '
+            'ORDER BY bucket', params)]
+
+        # Intervals that have ended no longer change, so their parsed state is reused across reruns
+        rollups = {bucket: self._closed_rollups.get((kind, level, bucket)) for bucket in buckets}
+        missing = [bucket for bucket, rollup in rollups.items() if rollup is None]
+        for start in range(0, len(missing), 500):
+            chunk = missing[start:start + 500]
+            rows = self._reader().execute(
+                f"SELECT bucket, state FROM rollups WHERE kind = ? AND level = ? "
+                f"AND bucket IN ({', '.join('?' * len(chunk))})", (kind, level, *chunk))
+            for bucket, state in rows:
+                rollups[bucket] = Rollup.from_json(kind, state)
+                if bucket + level <= now:
+                    self._closed_rollups.put((kind, level, bucket), rollups[bucket])
+        return level, [(bucket, rollups[bucket]) for bucket in buckets if rollups[bucket] is not None]
+
+    def summary(self, kind, since=None, until=None, session=None):
+        """Count plus per-column value counts, mean, std, min/max and p50/p95/p99 over a time range."""
+        self.flush()
+        total = Rollup(kind)
+        for _, rollup in self._rollups_in_range(kind, since, until, session, MAX_ROLLUPS_PER_SUMMARY)[1]:
+            total.merge(rollup)
+
+        columns = {column: stats.summary() for column, stats in total.stats.items()}
+        result = {'count': total.count, 'counts': {column: values['count'] for column, values in columns.items()}}
+        for statistic in ('mean', 'std', 'min', 'max', 'p50', 'p95', 'p99'):
+            result[statistic] = {column: values[statistic] for column, values in columns.items()}
+        return result
+
+    def timeseries(self, kind, since=None, until=None, session=None, points=DEFAULT_CHART_POINTS, primary=None):
+        """One point per rollup interval with each column's mean and p95, downsampled with LTTB.
+
+        `primary` names the column whose shape LTTB preserves (the first
+        column by default).
+        """
+        self.flush()
+        level, rollups = self._rollups_in_range(kind, since, until, session, MAX_ROLLUPS_PER_QUERY)
+        series = []
+        for bucket, rollup in rollups:
+            point = {'ts': bucket, 'interval': level, 'count': rollup.count}
+            for column, stats in rollup.stats.items():
+                point[column] = stats.mean if stats.count else None
+                point[f'{column}_p95'] = stats.quantile(0.95)
+            series.append(point)
+
+        if len(series) > points:
+            primary = primary or METRIC_COLUMNS[kind][0]
+            values = [point[primary] if point[primary] is not None else float('nan') for point in series]
+            series = [series[i] for i in lttb([point['ts'] for point in series], values, points)]
+        return series
+
+    def recent(self, kind, limit=None, session=None):
+        """Most recent entries from the in-memory ring buffer, oldest first."""
+        with self._ring_lock:
+            rows = list(self._recent[kind])
+        if session is not None:
+            rows = [row for row in rows if row['session'] == session]
+        return rows[-limit:] if limit else rows
+
+    def clear(self, session=None):
+        self.flush()
+        conn = self._connect()
+        with conn:
+            for kind in METRIC_COLUMNS:
+                if session is None:
+                    conn.execute(f'DELETE FROM {kind}')
+                else:
+                    conn.execute(f'DELETE FROM {kind} WHERE session = ?', (session,))
+            if session is None:
+                conn.execute('DELETE FROM rollups')
+        conn.close()
+
+        if session is None:
+            with self._write_lock:
+                self._rollups.clear()
+                self._closed_rollups.clear()
+                self._sessions.clear()
+        else:
+            with self._write_lock:
+                self._sessions.pop(session)
+            self.rebuild_rollups()
+
+        with self._ring_lock:
+            for kind in METRIC_COLUMNS:
+                if session is None:
+                    self._recent[kind].clear()
+                else:
+                    kept = [row for row in self._recent[kind] if row['session'] != session]
+                    self._recent[kind] = deque(kept, maxlen=self.ring_size)
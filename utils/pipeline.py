@@ -0,0 +1,127 @@
+from io import BytesIO
+
+import numpy as np
+
+from utils.dna_encryption import DNAEncryption, AES256DNAEncryption
+from utils.lsb_steganography import LSBSteganography
+from utils.metrics import ImageMetrics
+from utils.metrics_store import shared_store, MEMORY_STAGES
+from utils.result_cache import shared_result_cache
+from utils import tracing
+
+
+def make_cipher(use_aes, key=None):
+    return AES256DNAEncryption(key=key) if use_aes else DNAEncryption()
+
+
+def encrypt_embed(job, message, cover, use_aes, key=None, record_trace=False, track_memory=False):
+    """Encrypt `message`, embed it into the cover image and measure the result.
+
+    `cover` is the decoded RGB array, so nothing is re-read from disk.
+    Runs on a job worker: progress is reported between stages, which is
+    also where a cancellation takes effect. Returns everything the Encrypt
+    page renders, including the stego PNG bytes.
+
+    An identical earlier request (same cover pixels, message and options)
+    is answered from the result cache, unless the run is traced or AES
+    would use a fresh random key. Cache hits are not recorded as
+    encryption metrics, since nothing was computed.
+    """
+    cache = shared_result_cache() if not (record_trace or track_memory or (use_aes and key is None)) else None
+    if cache is not None:
+        cache_key = cache.key(cover, message, use_aes, key)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            job.update(1.0, 'Reusing the result of an identical request...')
+            return dict(cached, key=make_cipher(use_aes, key).get_key_base64() if use_aes else None,
+                        trace=None, cached=True)
+
+    trace = tracing.start('encrypt_embed', memory=track_memory) if record_trace or track_memory else None
+    try:
+        cipher = make_cipher(use_aes, key)
+        job.update(0.05, 'Encrypting message...')
+        encryption = cipher.encrypt(message, use_aes=True) if use_aes else cipher.encrypt(message)
+
+        job.update(0.15, 'Embedding into cover image...')
+        embedding = LSBSteganography().embed(cover, encryption['encrypted_dna'])
+        stego = np.asarray(embedding['stego_image'])
+
+        job.update(0.45, 'Measuring image quality...')
+        psnr = ImageMetrics.calculate_psnr(cover, stego)
+        job.update(0.55)
+        ssim = ImageMetrics.calculate_ssim(cover, stego)
+
+        job.update(0.7, 'Comparing images...')
+        diff_stats = ImageMetrics.calculate_difference_stats(cover, stego)
+        job.update(0.8, 'Rendering difference heatmap...')
+        heatmap = ImageMetrics.create_difference_heatmap(cover, stego)
+
+        job.update(0.95, 'Encoding download...')
+        with tracing.span('page.encode_download_png'):
+            buf = BytesIO()
+            embedding['stego_image'].save(buf, format='PNG')
+    finally:
+        if trace is not None:
+            tracing.stop(trace)
+
+    shared_store().record('encryption', {
+        'message_length': len(message),
+        'encryption_time': encryption['encryption_time'],
+        'embedding_time': embedding['embedding_time'],
+        'psnr': psnr if psnr else 0,
+        'ssim': ssim if ssim else 0,
+        'dna_length': encryption['dna_length'],
+        'used_aes': use_aes,
+        'queue_wait': job.wait_time(),
+        **(trace.memory_fields(MEMORY_STAGES['encryption']) if trace else {})
+    }, session=job.session)
+
+    result = {
+        'encryption': encryption,
+        'embedding': embedding,
+        'key': cipher.get_key_base64() if use_aes else None,
+        'psnr': psnr,
+        'ssim': ssim,
+        'diff_stats': diff_stats,
+        'heatmap': heatmap,
+        'png': buf.getvalue(),
+        'trace': trace if record_trace else None,
+        'cached': False
+    }
+    if cache is not None:
+        # A DNA-only stego image gives the message back without a key, so it never goes to disk
+        cache.put(cache_key, result, persist=use_aes)
+    return result
+
+
+def extract_decrypt(job, stego, use_aes, key=None, record_trace=False, track_memory=False):
+    """Extract the hidden DNA sequence from a decoded stego image and decrypt it, on a job worker."""
+    trace = tracing.start('extract_decrypt', memory=track_memory) if record_trace or track_memory else None
+    try:
+        cipher = make_cipher(use_aes, key)
+        job.update(0.1, 'Extracting hidden bits...')
+        extraction = LSBSteganography().extract(stego)
+
+        job.update(0.8, 'Decrypting...')
+        decryption = cipher.decrypt(extraction['extracted_data'], use_aes=True) if use_aes \
+            else cipher.decrypt(extraction['extracted_data'])
+    finally:
+        if trace is not None:
+            tracing.stop(trace)
+    total_time = extraction['extraction_time'] + decryption['decryption_time']
+    shared_store().record('decryption', {
+        'message_length': len(decryption['decrypted_text']),
+        'extraction_time': extraction['extraction_time'],
+        'decryption_time': decryption['decryption_time'],
+        'total_time': total_time,
+        'queue_wait': job.wait_time(),
+        **(trace.memory_fields(MEMORY_STAGES['decryption']) if trace else {})
+    }, session=job.session)
+
+    return {
+        'extraction': extraction,
+        'decryption': decryption,
+        'total_time': total_time,
+        'used_aes': use_aes,
+        'trace': trace if record_trace else None
+    }
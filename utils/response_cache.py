@@ -0,0 +1,154 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+
+from utils.lru_cache import LRUCache
+
+DEFAULT_DB_PATH = os.environ.get('STEGO_RESPONSE_CACHE_DB', os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'response_cache.db'))
+DEFAULT_MEMORY_ENTRIES = 256
+DEFAULT_MAX_DISK_BYTES = 16 * 1024 * 1024
+DEFAULT_TTL = 7 * 86400
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def shared_response_cache(path=None):
+    """Process-wide response cache per database file, shared by every Streamlit session."""
+    path = path or DEFAULT_DB_PATH
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = ResponseCache(path)
+        return _caches[path]
+
+
+def normalize_prompt(text):
+    """Fold case, Unicode forms, whitespace and trailing punctuation, so re-typed questions match."""
+    text = unicodedata.normalize('NFKC', text).casefold()
+    return ' '.join(text.split()).rstrip('?!. ')
+
+
+def cache_key(model, system_prompt, question, history=()):
+    """Hash of the model, the base system prompt and the normalized question; prompts are never stored.
+
+    A follow-up depends on the turns before it, so those (`history`,
+    without the question) are part of its key; a first question is keyed on
+    the question alone. What is derived from these, such as retrieved page
+    snippets or a summary of dropped turns, is left out, so edits to the
+    pages do not invalidate cached answers.
+    """
+    turns = [(message['role'], normalize_prompt(message['content'])) for message in history]
+    payload = [model, system_prompt, normalize_prompt(question), turns]
+    return hashlib.blake2b(json.dumps(payload).encode('utf-8'), digest_size=20).hexdigest()
+
+
+class ResponseCache:
+    """Chat responses in a memory LRU in front of a size-bounded SQLite table, both expiring after `ttl`.
+
+    Disk entries are evicted least recently used first once their total
+    size exceeds `max_disk_bytes`. With `path=None` only the memory tier
+    is used. Responses are stored unencrypted in the database (only the
+    keys are hashed), so it should live where chat transcripts may.
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH, memory_entries=DEFAULT_MEMORY_ENTRIES,
+                 max_disk_bytes=DEFAULT_MAX_DISK_BYTES, ttl=DEFAULT_TTL):
+        self.path = path
+        self.max_disk_bytes = max_disk_bytes
+        self.ttl = ttl
+        self._memory = LRUCache(max_entries=memory_entries)
+        self._lock = threading.Lock()
+        self._conn = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if path is not None:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            with self._conn:
+                self._conn.execute('CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, '
+                                   'response TEXT NOT NULL, created REAL NOT NULL, last_used REAL NOT NULL, '
+                                   'size INTEGER NOT NULL) WITHOUT ROWID')
+                self._conn.execute('CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)')
+
+    def get(self, key):
+        now = time.time()
+        entry = self._memory.get(key)
+        if entry is not None:
+            response, created = entry
+            if now - created < self.ttl:
+                self.memory_hits += 1
+                return response
+            self._memory.pop(key)
+
+        response = self._get_disk(key, now)
+        if response is None:
+            self.misses += 1
+        return response
+
+    def _get_disk(self, key, now):
+        if self._conn is None:
+            return None
+        with self._lock:
+            row = self._conn.execute('SELECT response, created FROM responses WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            response, created = row
+            with self._conn:
+                if now - created >= self.ttl:
+                    self._conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+                    return None
+                self._conn.execute('UPDATE responses SET last_used = ? WHERE key = ?', (now, key))
+            self.disk_hits += 1
+        self._memory.put(key, (response, created))
+        return response
+
+    def put(self, key, response):
+        now = time.time()
+        self._memory.put(key, (response, now))
+        if self._conn is None:
+            return
+
+        size = len(response.encode('utf-8'))
+        with self._lock, self._conn:
+            self._conn.execute('INSERT OR REPLACE INTO responses (key, response, created, last_used, size) '
+                               'VALUES (?, ?, ?, ?, ?)', (key, response, now, now, size))
+            self._conn.execute('DELETE FROM responses WHERE created <= ?', (now - self.ttl,))
+            total = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+            if total > self.max_disk_bytes:
+                excess = total - self.max_disk_bytes
+                freed = 0
+                evicted = []
+                for old_key, old_size in self._conn.execute(
+                        'SELECT key, size FROM responses ORDER BY last_used'):
+                    if freed >= excess:
+                        break
+                    evicted.append((old_key,))
+                    freed += old_size
+                self._conn.executemany('DELETE FROM responses WHERE key = ?', evicted)
+
+    def clear(self):
+        self._memory.clear()
+        if self._conn is not None:
+            with self._lock, self._conn:
+                self._conn.execute('DELETE FROM responses')
+
+    def stats(self):
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        stats = {'memory_entries': len(self._memory), 'memory_hits': self.memory_hits, 'disk_hits': self.disk_hits,
+                 'misses': self.misses, 'hit_rate': hits / lookups if lookups else 0.0}
+        if self._conn is not None:
+            with self._lock:
+                stats['disk_entries'], stats['disk_bytes'] = self._conn.execute(
+                    'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses').fetchone()
+        return stats
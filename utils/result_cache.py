@@ -0,0 +1,214 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+from utils.lru_cache import LRUCache
+
+# The disk tier is off unless STEGO_RESULT_CACHE_DB names a database file.
+# It only holds AES results: the stego PNG, the heatmap and the metrics,
+# without the DNA sequence. A DNA-only result (PNG or sequence) gives the
+# message back to anyone, since the DNA mapping needs no key, so those stay
+# in memory. Messages and AES keys are only ever hashed.
+DEFAULT_DB_PATH = os.environ.get('STEGO_RESULT_CACHE_DB') or None
+DEFAULT_MEMORY_BYTES = 256 * 1024 * 1024
+DEFAULT_MAX_DISK_BYTES = 1024 * 1024 * 1024
+DEFAULT_TTL = 86400
+# Bump when the shape of a cached result changes, so older entries are never returned
+RESULT_VERSION = 1
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def shared_result_cache(path=None):
+    """Process-wide embed result cache per database file (or memory only), shared by every session."""
+    path = path or DEFAULT_DB_PATH
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = ResultCache(path)
+        return _caches[path]
+
+
+def image_bytes(image):
+    return image.width * image.height * len(image.getbands()) if image is not None else 0
+
+
+def result_size(result):
+    """Approximate memory held by a cached result: the decoded images, the PNG and the DNA sequence."""
+    return (image_bytes(result['embedding']['stego_image']) + image_bytes(result['heatmap'])
+            + len(result['png']) + len(result['encryption'].get('encrypted_dna', '')))
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _encode_png(image):
+    if image is None:
+        return None
+    buf = BytesIO()
+    image.save(buf, format='PNG')
+    return buf.getvalue()
+
+
+def _decode_png(data):
+    if data is None:
+        return None
+    image = Image.open(BytesIO(data))
+    image.load()
+    return image
+
+
+class ResultCache:
+    """Encrypt & Embed results in a byte-bounded memory LRU, optionally backed by an SQLite table.
+
+    Entries are addressed by a keyed BLAKE2b hash of the decoded cover
+    pixels, the message and the encryption options, so identical requests
+    find the earlier result and nothing readable about the message is kept
+    in the key. The hashing secret is random per memory-only cache and
+    stored in the database otherwise. Disk entries are evicted least
+    recently used first beyond `max_disk_bytes`; both tiers expire after
+    `ttl`.
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH, memory_bytes=DEFAULT_MEMORY_BYTES,
+                 max_disk_bytes=DEFAULT_MAX_DISK_BYTES, ttl=DEFAULT_TTL):
+        self.path = path
+        self.max_disk_bytes = max_disk_bytes
+        self.ttl = ttl
+        self._memory = LRUCache(max_bytes=memory_bytes, sizeof=lambda entry: result_size(entry[0]))
+        self._lock = threading.Lock()
+        self._conn = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._secret = os.urandom(32)
+
+        if path is not None:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            with self._conn:
+                self._conn.execute('CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, png BLOB NOT NULL, '
+                                   'heatmap BLOB, fields TEXT NOT NULL, created REAL NOT NULL, '
+                                   'last_used REAL NOT NULL, size INTEGER NOT NULL) WITHOUT ROWID')
+                self._conn.execute('CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)')
+                self._conn.execute('CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value BLOB NOT NULL)')
+                self._conn.execute("INSERT OR IGNORE INTO meta (name, value) VALUES ('secret', ?)", (self._secret,))
+                self._secret = self._conn.execute("SELECT value FROM meta WHERE name = 'secret'").fetchone()[0]
+
+    def key(self, cover, message, use_aes, aes_key=None):
+        """Content address of an embed request; `cover` is the decoded RGB array."""
+        cover = np.ascontiguousarray(cover)
+        digest = hashlib.blake2b(key=self._secret, digest_size=20)
+        digest.update(json.dumps([RESULT_VERSION, cover.shape, cover.dtype.str, bool(use_aes)]).encode('utf-8'))
+        digest.update(memoryview(cover).cast('B'))
+        for part in (message.encode('utf-8'), aes_key or b''):
+            digest.update(len(part).to_bytes(8, 'little'))
+            digest.update(part)
+        return digest.hexdigest()
+
+    def get(self, key):
+        now = time.time()
+        entry = self._memory.get(key)
+        if entry is not None:
+            result, created = entry
+            if now - created < self.ttl:
+                self.memory_hits += 1
+                return result
+            self._memory.pop(key)
+
+        result = self._get_disk(key, now)
+        if result is None:
+            self.misses += 1
+        return result
+
+    def _get_disk(self, key, now):
+        if self._conn is None:
+            return None
+        with self._lock:
+            row = self._conn.execute('SELECT png, heatmap, fields, created FROM results WHERE key = ?',
+                                     (key,)).fetchone()
+            if row is None:
+                return None
+            png, heatmap, fields, created = row
+            with self._conn:
+                if now - created >= self.ttl:
+                    self._conn.execute('DELETE FROM results WHERE key = ?', (key,))
+                    return None
+                self._conn.execute('UPDATE results SET last_used = ? WHERE key = ?', (now, key))
+            self.disk_hits += 1
+
+        result = json.loads(fields)
+        result['png'] = png
+        result['heatmap'] = _decode_png(heatmap)
+        result['embedding']['stego_image'] = _decode_png(png)
+        result['embedding']['image_size'] = tuple(result['embedding']['image_size'])
+        self._memory.put(key, (result, created))
+        return result
+
+    def put(self, key, result, persist=True):
+        """Cache `result` as returned by the pipeline; its AES key and trace are left out.
+
+        With `persist=False` the result is kept in memory only. Written to
+        disk, the encrypted DNA sequence is left out and only its length
+        (already in the result) is kept.
+        """
+        now = time.time()
+        result = {name: value for name, value in result.items() if name not in ('key', 'trace', 'cached')}
+        self._memory.put(key, (result, now))
+        if self._conn is None or not persist:
+            return
+
+        fields = dict(result, embedding={name: value for name, value in result['embedding'].items()
+                                         if name != 'stego_image'},
+                      encryption={name: value for name, value in result['encryption'].items()
+                                  if name != 'encrypted_dna'})
+        del fields['png'], fields['heatmap']
+        fields = json.dumps(fields, default=_json_default)
+        heatmap = _encode_png(result['heatmap'])
+        size = len(result['png']) + len(heatmap or b'') + len(fields)
+        with self._lock, self._conn:
+            self._conn.execute('INSERT OR REPLACE INTO results (key, png, heatmap, fields, created, last_used, size) '
+                               'VALUES (?, ?, ?, ?, ?, ?, ?)', (key, result['png'], heatmap, fields, now, now, size))
+            self._conn.execute('DELETE FROM results WHERE created <= ?', (now - self.ttl,))
+            total = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM results').fetchone()[0]
+            if total > self.max_disk_bytes:
+                excess = total - self.max_disk_bytes
+                freed = 0
+                evicted = []
+                for old_key, old_size in self._conn.execute('SELECT key, size FROM results ORDER BY last_used'):
+                    if freed >= excess:
+                        break
+                    evicted.append((old_key,))
+                    freed += old_size
+                self._conn.executemany('DELETE FROM results WHERE key = ?', evicted)
+
+    def clear(self):
+        self._memory.clear()
+        if self._conn is not None:
+            with self._lock, self._conn:
+                self._conn.execute('DELETE FROM results')
+
+    def stats(self):
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        stats = {'memory_entries': len(self._memory), 'memory_bytes': self._memory.current_bytes,
+                 'memory_hits': self.memory_hits, 'disk_hits': self.disk_hits, 'misses': self.misses,
+                 'hit_rate': hits / lookups if lookups else 0.0, 'disk_entries': None, 'disk_bytes': None}
+        if self._conn is not None:
+            with self._lock:
+                stats['disk_entries'], stats['disk_bytes'] = self._conn.execute(
+                    'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results').fetchone()
+        return stats
@@ -0,0 +1,154 @@
+import os
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+DEFAULT_TILE_PIXELS = 1 << 18
+
+SSIM_WIN_SIZE = 7
+SSIM_K1 = 0.01
+SSIM_K2 = 0.03
+
+
+class TiledImageMetrics:
+    """Image-quality and difference statistics computed over row bands.
+
+    Each band is processed on a thread pool (OpenCV and NumPy release the GIL)
+    and only small partial sums are returned, so the working set is bounded by
+    a few tiles regardless of image size.
+    """
+
+    def __init__(self, tile_pixels=DEFAULT_TILE_PIXELS, max_workers=None):
+        self.tile_pixels = tile_pixels
+        self.max_workers = max_workers or os.cpu_count() or 1
+
+    def _row_bands(self, start, stop, width):
+        rows = max(1, self.tile_pixels // max(1, width))
+        return [(r, min(r + rows, stop)) for r in range(start, stop, rows)]
+
+    def _map(self, func, bands):
+        if len(bands) <= 1 or self.max_workers == 1:
+            return [func(band) for band in bands]
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(bands))) as pool:
+            return list(pool.map(func, bands))
+
+    @staticmethod
+    def _squared_magnitude(diff):
+        squared = diff.astype(np.uint32) ** 2
+        if squared.ndim == 3:
+            squared = squared.sum(axis=2, dtype=np.uint32)
+        return squared
+
+    def psnr(self, img1, img2, data_range=255):
+        import cv2
+
+        def band_sse(band):
+            r0, r1 = band
+            diff = cv2.absdiff(img1[r0:r1], img2[r0:r1])
+            return int(self._squared_magnitude(diff).sum(dtype=np.uint64))
+
+        bands = self._row_bands(0, img1.shape[0], img1.shape[1])
+        sse = sum(self._map(band_sse, bands))
+        if sse == 0:
+            return float('inf')
+
+        mse = sse / img1.size
+        return 10 * math.log10((data_range ** 2) / mse)
+
+    def ssim(self, img1, img2, data_range=255):
+        import cv2
+
+        height, width = img1.shape[:2]
+        pad = (SSIM_WIN_SIZE - 1) // 2
+        if min(height, width) < SSIM_WIN_SIZE:
+            raise ValueError(f"Image too small for SSIM. Need at least {SSIM_WIN_SIZE}x{SSIM_WIN_SIZE} pixels")
+
+        c1 = (SSIM_K1 * data_range) ** 2
+        c2 = (SSIM_K2 * data_range) ** 2
+        window = (SSIM_WIN_SIZE, SSIM_WIN_SIZE)
+        cov_norm = SSIM_WIN_SIZE ** 2 / (SSIM_WIN_SIZE ** 2 - 1)
+
+        def to_gray(block):
+            if block.ndim == 3:
+                block = cv2.cvtColor(block, cv2.COLOR_BGR2GRAY)
+            return block.astype(np.float64)
+
+        def band_sum(band):
+            r0, r1 = band
+            # Read a halo of `pad` rows so every output pixel sees a full window
+            x = to_gray(img1[r0 - pad:r1 + pad])
+            y = to_gray(img2[r0 - pad:r1 + pad])
+
+            ux = cv2.blur(x, window)
+            uy = cv2.blur(y, window)
+            vx = cov_norm * (cv2.blur(x * x, window) - ux * ux)
+            vy = cov_norm * (cv2.blur(y * y, window) - uy * uy)
+            vxy = cov_norm * (cv2.blur(x * y, window) - ux * uy)
+
+            s_map = ((2 * ux * uy + c1) * (2 * vxy + c2)) / ((ux * ux + uy * uy + c1) * (vx + vy + c2))
+            return float(s_map[pad:-pad, pad:width - pad].sum())
+
+        bands = self._row_bands(pad, height - pad, width)
+        total = math.fsum(self._map(band_sum, bands))
+        return total / ((height - 2 * pad) * (width - 2 * pad))
+
+    def difference_stats(self, img1, img2):
+        import cv2
+
+        def band_stats(band):
+            r0, r1 = band
+            diff = cv2.absdiff(img1[r0:r1], img2[r0:r1])
+            magnitude = np.sqrt(self._squared_magnitude(diff), dtype=np.float64)
+            peak = float(magnitude.max())
+            mean = float(magnitude.mean())
+            magnitude -= mean
+            return (
+                int(np.count_nonzero(diff)),
+                magnitude.size,
+                mean,
+                float(np.dot(magnitude.ravel(), magnitude.ravel())),
+                peak,
+            )
+
+        total_pixels = img1.size
+        if total_pixels == 0:
+            # No rows (so no bands) or no columns: nothing can differ
+            return {'total_pixels': 0, 'changed_pixels': 0, 'change_percentage': 0.0,
+                    'max_difference': 0.0, 'mean_difference': 0.0, 'std_difference': 0.0}
+
+        bands = self._row_bands(0, img1.shape[0], img1.shape[1])
+        partials = self._map(band_stats, bands)
+
+        # Chan et al. pairwise combination of per-band (count, mean, M2)
+        changed_pixels, count, mean_difference, m2, max_difference = partials[0]
+        for changed, n, mean, band_m2, band_max in partials[1:]:
+            total = count + n
+            delta = mean - mean_difference
+            mean_difference += delta * n / total
+            m2 += band_m2 + delta * delta * count * n / total
+            count = total
+            changed_pixels += changed
+            max_difference = max(max_difference, band_max)
+
+        return {
+            'total_pixels': total_pixels,
+            'changed_pixels': changed_pixels,
+            'change_percentage': (changed_pixels / total_pixels) * 100,
+            'max_difference': max_difference,
+            'mean_difference': mean_difference,
+            'std_difference': math.sqrt(m2 / count)
+        }
+
+    def difference_magnitude(self, img1, img2):
+        import cv2
+
+        magnitude = np.empty(img1.shape[:2], dtype=np.float32)
+
+        def band_magnitude(band):
+            r0, r1 = band
+            diff = cv2.absdiff(img1[r0:r1], img2[r0:r1])
+            np.sqrt(self._squared_magnitude(diff), out=magnitude[r0:r1], dtype=np.float32)
+
+        self._map(band_magnitude, self._row_bands(0, img1.shape[0], img1.shape[1]))
+        return magnitude
@@ -0,0 +1,294 @@
+import os
+import json
+import time
+import functools
+import threading
+import tracemalloc
+from contextlib import contextmanager
+
+# Pages record a trace (or peak memory) for every run when these are set, instead of on request
+TRACE_BY_DEFAULT = os.environ.get('STEGO_TRACE', '') not in ('', '0')
+TRACE_MEMORY_BY_DEFAULT = os.environ.get('STEGO_TRACE_MEMORY', '') not in ('', '0')
+
+class _ThreadState(threading.local):
+    # A class-level default keeps the disabled check a plain attribute read;
+    # getattr() with a default on a missing thread-local attribute raises internally
+    recorder = None
+
+
+_local = _ThreadState()
+
+# Number of recordings open on any thread; while zero, spans skip the thread-local lookup
+_active_recordings = 0
+_memory_recordings = 0
+_started_tracemalloc = False
+_active_lock = threading.Lock()
+
+
+class _NullSpan:
+    """Returned by `span` when nothing is recording; entering it costs one method call."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **args):
+        pass
+
+    def add_arrays(self, *arrays):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    def __init__(self, recorder, name, category, args):
+        self.recorder = recorder
+        self.name = name
+        self.category = category
+        self.args = args
+        self.start = None
+        self.memory_base = 0
+        self.memory_peak = 0
+
+    def __enter__(self):
+        if self.recorder.memory:
+            self.recorder.memory_enter(self)
+        self.depth = len(self.recorder.stack)
+        self.recorder.stack.append(self)
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter_ns()
+        self.recorder.stack.pop()
+        if self.recorder.memory:
+            self.recorder.memory_exit(self)
+        if exc_type is not None:
+            self.args['error'] = exc_type.__name__
+        self.recorder.add(self, end)
+        return False
+
+    def set(self, **args):
+        """Attach extra arguments (sizes, counts) shown with the span in the trace viewer."""
+        self.args.update(args)
+
+    def add_arrays(self, *arrays):
+        """Count the buffers of NumPy arrays allocated by this stage."""
+        self.args['array_bytes'] = self.args.get('array_bytes', 0) + sum(int(a.nbytes) for a in arrays)
+
+
+class TraceRecorder:
+    """Spans completed on one thread while recording, exportable as Chrome trace events."""
+
+    def __init__(self, name='trace', memory=False):
+        self.name = name
+        self.memory = memory
+        self.origin = time.perf_counter_ns()
+        self.pid = os.getpid()
+        self.tid = threading.get_ident()
+        self.stack = []
+        self.spans = []
+        self.root = None
+        self.previous = None
+
+    def add(self, span, end):
+        self.spans.append({
+            'name': span.name,
+            'cat': span.category,
+            'start_ns': span.start - self.origin,
+            'duration_ns': end - span.start,
+            'depth': span.depth,
+            'args': span.args
+        })
+
+    def memory_enter(self, span):
+        # tracemalloc keeps a single peak, so it is folded into the enclosing
+        # span and reset before each child starts measuring its own
+        current, peak = tracemalloc.get_traced_memory()
+        if self.stack:
+            self.stack[-1].memory_peak = max(self.stack[-1].memory_peak, peak)
+        tracemalloc.reset_peak()
+        span.memory_base = span.memory_peak = current
+
+    def memory_exit(self, span):
+        _, peak = tracemalloc.get_traced_memory()
+        span.memory_peak = max(span.memory_peak, peak)
+        span.args['peak_bytes'] = span.memory_peak - span.memory_base
+        if self.stack:
+            self.stack[-1].memory_peak = max(self.stack[-1].memory_peak, span.memory_peak)
+        tracemalloc.reset_peak()
+
+    def total_ns(self):
+        return max((s['start_ns'] + s['duration_ns'] for s in self.spans), default=0)
+
+    def _children(self, index):
+        # Children complete before their parent, so they precede it in `spans`
+        span = self.spans[index]
+        for child_index in range(index - 1, -1, -1):
+            child = self.spans[child_index]
+            if child['start_ns'] < span['start_ns']:
+                break
+            if child['depth'] == span['depth'] + 1:
+                yield child_index
+
+    def stage_times(self):
+        """Total and self time per span name in seconds, longest first.
+
+        With memory tracking on, entries also carry the largest tracemalloc
+        peak of any call and the NumPy bytes allocated by it and its children.
+        """
+        totals = {}
+        array_bytes = []
+        for index, span in enumerate(self.spans):
+            children = list(self._children(index))
+            array_bytes.append(span['args'].get('array_bytes', 0) + sum(array_bytes[i] for i in children))
+
+            entry = totals.setdefault(span['name'], {'name': span['name'], 'calls': 0, 'total': 0.0, 'self': 0.0})
+            entry['calls'] += 1
+            entry['total'] += span['duration_ns'] / 1e9
+            entry['self'] += (span['duration_ns'] - sum(self.spans[i]['duration_ns'] for i in children)) / 1e9
+            if self.memory:
+                entry['peak_bytes'] = max(entry.get('peak_bytes', 0), span['args'].get('peak_bytes', 0))
+                entry['array_bytes'] = max(entry.get('array_bytes', 0), array_bytes[index])
+        return sorted(totals.values(), key=lambda entry: entry['total'], reverse=True)
+
+    def memory_fields(self, stages):
+        """`{'<field>_peak_bytes': ..., '<field>_array_bytes': ...}` for the given {span name: field} pairs.
+
+        Empty unless memory was tracked, so it can be merged into history entries unconditionally.
+        """
+        if not self.memory:
+            return {}
+        by_name = {entry['name']: entry for entry in self.stage_times()}
+        fields = {}
+        for name, field in stages.items():
+            if name in by_name:
+                fields[f'{field}_peak_bytes'] = by_name[name]['peak_bytes']
+                fields[f'{field}_array_bytes'] = by_name[name]['array_bytes']
+        return fields
+
+    def to_chrome_trace(self):
+        """Trace-event JSON for chrome://tracing, Perfetto or speedscope."""
+        events = [{'name': 'thread_name', 'ph': 'M', 'pid': self.pid, 'tid': self.tid,
+                   'args': {'name': self.name}}]
+        for span in sorted(self.spans, key=lambda s: (s['start_ns'], s['depth'])):
+            events.append({
+                'name': span['name'],
+                'cat': span['cat'],
+                'ph': 'X',
+                'ts': span['start_ns'] / 1000,
+                'dur': span['duration_ns'] / 1000,
+                'pid': self.pid,
+                'tid': self.tid,
+                'args': {key: _jsonable(value) for key, value in span['args'].items()}
+            })
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def to_json(self):
+        return json.dumps(self.to_chrome_trace())
+
+
+def _jsonable(value):
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+
+def current_recorder():
+    return _local.recorder
+
+
+def current_span():
+    """Innermost open span on this thread, or a no-op span when not recording."""
+    recorder = _local.recorder if _active_recordings else None
+    if recorder is None or not recorder.stack:
+        return _NULL_SPAN
+    return recorder.stack[-1]
+
+
+def start(name='trace', memory=False):
+    """Begin recording spans opened on this thread; finish with `stop`.
+
+    With `memory`, every span also records its tracemalloc peak above the
+    memory in use when it started. tracemalloc is process-wide, so runs
+    recorded concurrently on other threads inflate each other's peaks.
+    """
+    global _active_recordings, _memory_recordings, _started_tracemalloc
+    recorder = TraceRecorder(name, memory)
+    recorder.previous = current_recorder()
+    _local.recorder = recorder
+    with _active_lock:
+        _active_recordings += 1
+        if memory:
+            _memory_recordings += 1
+            if _memory_recordings == 1 and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                _started_tracemalloc = True
+    recorder.root = Span(recorder, name, 'run', {}).__enter__()
+    return recorder
+
+
+def stop(recorder):
+    global _active_recordings, _memory_recordings, _started_tracemalloc
+    if recorder.root is None:
+        return recorder
+    recorder.root.__exit__(None, None, None)
+    recorder.root = None
+    _local.recorder = recorder.previous
+    with _active_lock:
+        _active_recordings -= 1
+        if recorder.memory:
+            _memory_recordings -= 1
+            if _memory_recordings == 0 and _started_tracemalloc:
+                tracemalloc.stop()
+                _started_tracemalloc = False
+    return recorder
+
+
+@contextmanager
+def record(name='trace', enabled=True, memory=False):
+    """Record every span opened on this thread inside the block.
+
+    Yields the TraceRecorder, or None when `enabled` is false so callers
+    can keep one code path.
+    """
+    if not enabled:
+        yield None
+        return
+
+    recorder = start(name, memory)
+    try:
+        yield recorder
+    finally:
+        stop(recorder)
+
+
+def span(name, category='app', **args):
+    if not _active_recordings:
+        return _NULL_SPAN
+    recorder = _local.recorder
+    if recorder is None:
+        return _NULL_SPAN
+    return Span(recorder, name, category, args)
+
+
+def traced(name=None, category='app'):
+    """Decorator wrapping each call in a span named after the function."""
+    def decorate(func):
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _active_recordings:
+                return func(*args, **kwargs)
+            recorder = _local.recorder
+            if recorder is None:
+                return func(*args, **kwargs)
+            with Span(recorder, label, category, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
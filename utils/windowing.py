@@ -0,0 +1,68 @@
+import numpy as np
+
+from utils.lru_cache import LRUCache
+
+# Standard CT presets as (center, width) in Hounsfield units
+WINDOW_PRESETS = {
+    'Brain': (40, 80),
+    'Subdural': (75, 215),
+    'Lung': (-600, 1500),
+    'Mediastinum': (50, 350),
+    'Abdomen': (40, 400),
+    'Liver': (60, 160),
+    'Bone': (400, 1800),
+}
+
+LUT_DTYPES = (np.dtype(np.uint8), np.dtype(np.int8), np.dtype(np.uint16), np.dtype(np.int16))
+
+
+def window_values(values, center, width):
+    """Linear VOI window from DICOM PS3.3 C.11.2.1.2, mapped to 0-255."""
+    values = np.asarray(values, dtype=np.float64)
+    width = max(float(width), 1.0)
+    scaled = ((values - (center - 0.5)) / (width - 1 if width > 1 else 1) + 0.5) * 255
+    return np.clip(scaled, 0, 255).astype(np.uint8)
+
+
+class Windowing:
+    """Window level/width through a precomputed stored-value to uint8 lookup table.
+
+    For 8- and 16-bit data the table covers every stored value (at most
+    65,536 entries) and is indexed by the value's bit pattern, so applying a
+    window costs one `np.take` per pixel. Rescale slope/intercept are folded
+    into the table, which lets presets be given in modality units (HU).
+    """
+
+    lut_cache = LRUCache(max_entries=32)
+
+    def __init__(self, slope=1.0, intercept=0.0):
+        self.slope = float(slope)
+        self.intercept = float(intercept)
+
+    @classmethod
+    def from_dataset(cls, ds):
+        return cls(slope=ds.get('RescaleSlope', 1.0) or 1.0, intercept=ds.get('RescaleIntercept', 0.0) or 0.0)
+
+    def to_modality(self, stored_value):
+        return stored_value * self.slope + self.intercept
+
+    def lut(self, dtype, center, width):
+        dtype = np.dtype(dtype)
+        if dtype not in LUT_DTYPES:
+            raise ValueError(f"No lookup table for {dtype}. Supported: {', '.join(str(d) for d in LUT_DTYPES)}")
+
+        key = (dtype.str, self.slope, self.intercept, float(center), float(width))
+        table = self.lut_cache.get(key)
+        if table is None:
+            index_dtype = np.dtype(f'u{dtype.itemsize}')
+            stored = np.arange(2 ** (8 * dtype.itemsize), dtype=index_dtype).view(dtype)
+            table = window_values(self.to_modality(stored.astype(np.float64)), center, width)
+            self.lut_cache.put(key, table)
+        return table
+
+    def apply(self, pixels, center, width):
+        if pixels.dtype not in LUT_DTYPES:
+            return window_values(self.to_modality(pixels), center, width)
+
+        table = self.lut(pixels.dtype, center, width)
+        return np.take(table, pixels.view(f'u{pixels.dtype.itemsize}'))